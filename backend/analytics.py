@@ -0,0 +1,290 @@
+# backend/analytics.py
+"""
+DuckDB query layer over the silver / gold data.
+
+Every Parquet dataset directory and CSV under DATA_ROOT/processed/{silver,gold} is
+registered as a view, e.g. silver.clinic_visits, gold.clinic_month_features. Views
+only point at the files: DuckDB scans them per query (projection and partition
+pruning included) and spills to ANALYTICS_TEMP_DIR past ANALYTICS_MEMORY_LIMIT, so
+aggregating the full clinic history never loads it into API memory.
+
+Aggregates are named, parameterized SQL (QUERIES below); parameters are always bound,
+never formatted into the SQL. Results are cached per (query, params) and tied to a
+fingerprint of the underlying files: rewriting a silver table re-registers the
+views and drops the cache on the next request.
+"""
+import os, time, json, threading
+from collections import OrderedDict
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DATA_ROOT = Path(os.getenv("DATA_ROOT", "./data"))
+ANALYTICS_LAYERS = ("silver", "gold")
+ANALYTICS_MEMORY_LIMIT = os.getenv("ANALYTICS_MEMORY_LIMIT", "512MB")
+ANALYTICS_THREADS = int(os.getenv("ANALYTICS_THREADS", "2"))
+ANALYTICS_TEMP_DIR = os.getenv("ANALYTICS_TEMP_DIR", "")          # default: DuckDB's own
+ANALYTICS_REFRESH_S = float(os.getenv("ANALYTICS_REFRESH_S", "10"))  # how often files are re-checked
+ANALYTICS_CACHE_MAX = int(os.getenv("ANALYTICS_CACHE_MAX", "256"))   # cached results (LRU)
+ANALYTICS_CACHE_TTL_S = float(os.getenv("ANALYTICS_CACHE_TTL_S", "600"))
+ANALYTICS_MAX_ROWS = int(os.getenv("ANALYTICS_MAX_ROWS", "10000"))
+
+def _ident(name: str) -> str:
+    """'silver.my table' -> "silver"."my table" (embedded quotes doubled)."""
+    return ".".join('"' + part.replace('"', '""') + '"' for part in name.split(".", 1))
+
+def _literal(value: str) -> str:
+    """Quoted string literal, for the one statement DuckDB won't prepare (CREATE VIEW)."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+class UnknownQuery(KeyError):
+    pass
+
+class MissingTable(LookupError):
+    """A query needs a view whose files aren't there."""
+
+# ---------- queries ----------
+def _month(v: Optional[str]) -> Optional[date]:
+    """'2024-03' or '2024-03-17' -> first day of that month."""
+    if v is None:
+        return None
+    parts = str(v).split("-")
+    return date(int(parts[0]), int(parts[1]) if len(parts) > 1 else 1, 1)
+
+def visits_by_state_month(views, start=None, end=None, state=None) -> Tuple[str, list]:
+    if "silver.clinic_visits" not in views:
+        raise MissingTable("silver.clinic_visits")
+    has_geo = "silver.clinic_geo_data" in views
+    sql = f"""
+        SELECT {"COALESCE(g.state, 'Unknown')" if has_geo else "'Unknown'"} AS state,
+               CAST(date_trunc('month', CAST(v.month AS DATE)) AS DATE) AS month,
+               COUNT(DISTINCT v.clinic_id) AS clinics,
+               SUM(v.total_visits) AS total_visits,
+               AVG(v.total_visits) AS avg_visits_per_clinic
+        FROM silver.clinic_visits v
+        {"LEFT JOIN (SELECT DISTINCT clinic_id, state FROM silver.clinic_geo_data) g USING (clinic_id)" if has_geo else ""}
+        WHERE (?::DATE IS NULL OR CAST(v.month AS DATE) >= ?::DATE)
+          AND (?::DATE IS NULL OR CAST(v.month AS DATE) <= ?::DATE)
+          AND (?::VARCHAR IS NULL OR {"g.state" if has_geo else "'Unknown'"} = ?::VARCHAR)
+        GROUP BY ALL
+        ORDER BY month, state
+    """
+    s, e = _month(start), _month(end)
+    return sql, [s, s, e, e, state, state]
+
+def stockout_risk(views, start=None, end=None, item=None) -> Tuple[str, list]:
+    if "silver.medicine_stock" not in views:
+        raise MissingTable("silver.medicine_stock")
+    sql = """
+        SELECT item_code, any_value(item_name) AS item_name,
+               COUNT(*) AS clinic_months,
+               AVG(stock_on_hand) AS avg_stock_on_hand,
+               AVG(CASE WHEN stock_on_hand <= reorder_level THEN 1.0 ELSE 0.0 END) AS share_below_reorder,
+               AVG(is_high_risk_stockout) AS share_high_risk
+        FROM silver.medicine_stock
+        WHERE (?::DATE IS NULL OR CAST(month AS DATE) >= ?::DATE)
+          AND (?::DATE IS NULL OR CAST(month AS DATE) <= ?::DATE)
+          AND (?::VARCHAR IS NULL OR item_code = ?::VARCHAR)
+        GROUP BY item_code
+        ORDER BY share_high_risk DESC, item_code
+    """
+    s, e = _month(start), _month(end)
+    return sql, [s, s, e, e, item, item]
+
+def prevalence_trend(views, state=None) -> Tuple[str, list]:
+    if "silver.malaria_prevalence_state_year" not in views:
+        raise MissingTable("silver.malaria_prevalence_state_year")
+    sql = """
+        SELECT year,
+               CASE WHEN ?::VARCHAR IS NULL THEN 'Nigeria' ELSE ?::VARCHAR END AS area,
+               SUM(y) AS positive, SUM(n) AS tested,
+               SUM(y) / NULLIF(SUM(n), 0) AS prevalence
+        FROM silver.malaria_prevalence_state_year
+        WHERE (?::VARCHAR IS NULL OR "State" = ?::VARCHAR)
+        GROUP BY year
+        ORDER BY year
+    """
+    return sql, [state, state, state, state]
+
+QUERIES: Dict[str, Callable[..., Tuple[str, list]]] = {
+    "visits_by_state_month": visits_by_state_month,
+    "stockout_risk": stockout_risk,
+    "prevalence_trend": prevalence_trend,
+}
+
+# ---------- cache ----------
+class QueryCache:
+    """LRU + TTL of query results, cleared whenever the data fingerprint changes."""
+    def __init__(self, max_entries: int = ANALYTICS_CACHE_MAX, ttl_s: float = ANALYTICS_CACHE_TTL_S):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_s = max(0.0, float(ttl_s))
+        self._entries: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.invalidations = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (not self.ttl_s or time.monotonic() - entry[1] <= self.ttl_s):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: dict) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+
+    def stats(self):
+        return {"entries": len(self._entries), "max_entries": self.max_entries, "ttl_s": self.ttl_s,
+                "hits": self.hits, "misses": self.misses, "invalidations": self.invalidations}
+
+# ---------- service ----------
+def _jsonable(v: Any) -> Any:
+    if isinstance(v, (date, datetime)):
+        return v.isoformat()
+    if isinstance(v, float) and v != v:
+        return None
+    if hasattr(v, "item"):          # numpy / Decimal-like scalars
+        return v.item()
+    return v
+
+class QueryService:
+    def __init__(self, data_root: Path = DATA_ROOT, memory_limit: str = ANALYTICS_MEMORY_LIMIT,
+                 threads: int = ANALYTICS_THREADS, refresh_s: float = ANALYTICS_REFRESH_S,
+                 cache: Optional[QueryCache] = None):
+        self.data_root = Path(data_root)
+        self.memory_limit = memory_limit
+        self.threads = threads
+        self.refresh_s = refresh_s
+        self.cache = cache or QueryCache()
+        self._con = None
+        self._views: Dict[str, str] = {}          # view -> source path
+        self._fingerprint: Optional[str] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()              # guards (re-)registration, not queries
+
+    def _connect(self):
+        import duckdb   # deferred like the model stack; the API imports without it
+        con = duckdb.connect(":memory:")
+        con.execute("SET memory_limit = ?", [str(self.memory_limit)])
+        con.execute("SET threads = ?", [int(self.threads)])
+        if ANALYTICS_TEMP_DIR:
+            con.execute("SET temp_directory = ?", [ANALYTICS_TEMP_DIR])
+        for layer in ANALYTICS_LAYERS:
+            con.execute(f"CREATE SCHEMA IF NOT EXISTS {_ident(layer)}")
+        return con
+
+    def _sources(self) -> Dict[str, Path]:
+        out: Dict[str, Path] = {}
+        for layer in ANALYTICS_LAYERS:
+            root = self.data_root / "processed" / layer
+            if not root.is_dir():
+                continue
+            for p in sorted(root.iterdir()):
+                if p.name.startswith("."):
+                    continue
+                if p.is_dir() and any(p.rglob("*.parquet")):
+                    out[f"{layer}.{p.name}"] = p
+                elif p.suffix == ".csv" and f"{layer}.{p.stem}" not in out:
+                    out[f"{layer}.{p.stem}"] = p
+        return out
+
+    @staticmethod
+    def _fingerprint_of(sources: Dict[str, Path]) -> str:
+        parts = []
+        for view, p in sorted(sources.items()):
+            files = sorted(p.rglob("*.parquet")) if p.is_dir() else [p]
+            for f in files:
+                st = f.stat()
+                parts.append((str(f), st.st_mtime_ns, st.st_size))
+        return json.dumps(parts)
+
+    def refresh(self, force: bool = False) -> bool:
+        """Re-register views if the files changed (checked at most every refresh_s). True if they did."""
+        now = time.monotonic()
+        if not force and self._con is not None and now - self._checked_at < self.refresh_s:
+            return False
+        with self._lock:
+            self._checked_at = now
+            sources = self._sources()
+            fp = self._fingerprint_of(sources)
+            if not force and self._con is not None and fp == self._fingerprint:
+                return False
+            con = self._con or self._connect()
+            for view in set(self._views) - set(sources):
+                con.execute(f"DROP VIEW IF EXISTS {_ident(view)}")
+            for view, p in sources.items():
+                # views can't take bound parameters, so the path goes in as an escaped literal
+                src = (f"read_parquet({_literal(p.as_posix() + '/**/*.parquet')}, hive_partitioning = true)" if p.is_dir()
+                       else f"read_csv_auto({_literal(p.as_posix())})")
+                con.execute(f"CREATE OR REPLACE VIEW {_ident(view)} AS SELECT * FROM {src}")
+            self._con, self._views, self._fingerprint = con, {v: str(p) for v, p in sources.items()}, fp
+            self.cache.clear()
+            return True
+
+    def views(self) -> Dict[str, str]:
+        self.refresh()
+        return dict(self._views)
+
+    def describe(self) -> List[dict]:
+        self.refresh()
+        cur = self._con.cursor()
+        try:
+            return [
+                {"view": v, "source": src,
+                 "columns": [{"name": r[0], "type": r[1]} for r in cur.execute(f"DESCRIBE {_ident(v)}").fetchall()]}
+                for v, src in sorted(self._views.items())
+            ]
+        finally:
+            cur.close()
+
+    def run(self, name: str, **params) -> dict:
+        """Run a named aggregate; served from the cache while the files are unchanged."""
+        if name not in QUERIES:
+            raise UnknownQuery(name)
+        self.refresh()
+        params = {k: v for k, v in params.items() if v is not None}
+        key = json.dumps([name, sorted(params.items())], default=str)
+        hit = self.cache.get(key)
+        if hit is not None:
+            return dict(hit, cached=True)
+        sql, args = QUERIES[name](self._views, **params)
+        t0 = time.perf_counter()
+        cur = self._con.cursor()        # one cursor per call: safe across request threads
+        try:
+            res = cur.execute(sql, args)
+            columns = [d[0] for d in res.description]
+            rows = res.fetchmany(ANALYTICS_MAX_ROWS + 1)
+        finally:
+            cur.close()
+        result = {
+            "query": name,
+            "params": params,
+            "columns": columns,
+            "rows": [{c: _jsonable(v) for c, v in zip(columns, r)} for r in rows[:ANALYTICS_MAX_ROWS]],
+            "truncated": len(rows) > ANALYTICS_MAX_ROWS,
+            "elapsed_ms": round((time.perf_counter() - t0) * 1000.0, 3),
+        }
+        self.cache.put(key, result)
+        return dict(result, cached=False)
+
+    def stats(self):
+        return {"views": len(self._views), "memory_limit": self.memory_limit, "threads": self.threads,
+                "refresh_s": self.refresh_s, "cache": self.cache.stats()}
+
+    def close(self) -> None:
+        if self._con is not None:
+            self._con.close()
+            self._con = None
@@ -1,11 +1,36 @@
 # backend/app.py
+import logging, time
+from contextlib import asynccontextmanager
+
+from backend import startup
+_t0 = time.perf_counter()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from backend.middleware import RequestTimingMiddleware
 from backend.routers.settings import router as health_router
+from backend.routers.metrics import router as metrics_router
+from backend.routers import analytics as analytics_routes
+from backend.routers.geo import router as geo_router
+from backend.routers import stock_risk as stock_risk_routes
+from backend.routers import forecast as forecast_routes
+from backend.routers import predict as predict_routes
 from backend.routers.predict import router as predict_router
 
-app = FastAPI(title="PHC Datathon API", version="1.0")
+startup.record("import", time.perf_counter() - _t0)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    predict_routes.startup()
+    stock_risk_routes.startup()
+    forecast_routes.startup()
+    logging.getLogger(__name__).info("startup: %s", startup.report())
+    yield
+    predict_routes.shutdown()
+    analytics_routes.SERVICE.close()
+
+app = FastAPI(title="PHC Datathon API", version="1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,5 +40,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(RequestTimingMiddleware)
+
 app.include_router(health_router, prefix="/api/v1")
+app.include_router(metrics_router, prefix="/api/v1")
+app.include_router(analytics_routes.router, prefix="/api/v1")
+app.include_router(geo_router, prefix="/api/v1")
+app.include_router(stock_risk_routes.router, prefix="/api/v1")
+app.include_router(forecast_routes.router, prefix="/api/v1")
 app.include_router(predict_router)
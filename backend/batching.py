@@ -0,0 +1,122 @@
+# backend/batching.py
+import os, time, threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Optional, Tuple
+
+import numpy as np
+
+from backend.metrics import histogram, BATCH_SIZE_BUCKETS
+
+BATCHING_ENABLED  = os.getenv("BATCHING_ENABLED", "1") == "1"
+BATCH_MAX_SIZE    = int(os.getenv("BATCH_MAX_SIZE", "512"))       # rows per merged forward pass
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "2"))    # how long the first caller may wait for company
+
+BATCH_SIZE_HIST = histogram("predict_batch_size_rows", "Rows per merged forward pass", BATCH_SIZE_BUCKETS)
+QUEUE_WAIT_HIST = histogram("predict_batch_queue_wait_ms", "Time a request waited in the batching queue (ms)")
+
+class MicroBatcher:
+    """
+    Merge concurrent predict calls into one forward pass.
+
+    Callers hand in a 2-D feature matrix and get a Future back; a single worker
+    thread collects queued matrices until `max_batch_size` rows are pending or the
+    oldest one has waited `max_wait_ms`, runs `predict_fn` once on the stacked
+    matrix and splits the outputs back to each caller in submission order.
+    """
+    def __init__(
+        self,
+        predict_fn: Callable[[np.ndarray], np.ndarray],
+        max_batch_size: int = BATCH_MAX_SIZE,
+        max_wait_ms: float = BATCH_MAX_WAIT_MS,
+        name: str = "predict-batcher",
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_s = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue: Deque[Tuple[np.ndarray, Future, float]] = deque()
+        self._pending_rows = 0
+        self._cv = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, X: np.ndarray) -> Future:
+        fut: Future = Future()
+        X = np.asarray(X)
+        if X.ndim != 2:
+            raise ValueError(f"expected a 2-D feature matrix, got shape {X.shape}")
+        if len(X) == 0:
+            fut.set_result(np.empty((0, 1)))
+            return fut
+        with self._cv:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._queue.append((X, fut, time.perf_counter()))
+            self._pending_rows += len(X)
+            self._cv.notify()
+        return fut
+
+    def predict(self, X: np.ndarray, timeout: Optional[float] = None) -> np.ndarray:
+        """Blocking convenience wrapper around submit()."""
+        return self.submit(X).result(timeout=timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Stop accepting work; whatever is already queued is still served."""
+        with self._cv:
+            self._closed = True
+            self._cv.notify()
+        self._thread.join(timeout=timeout)
+
+    def _take_batch(self):
+        with self._cv:
+            while not self._queue:
+                if self._closed:
+                    return None
+                self._cv.wait()
+            deadline = self._queue[0][2] + self.max_wait_s
+            while self._pending_rows < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cv.wait(remaining)
+
+            # Always take at least one request, even if it alone exceeds the cap
+            items, rows = [], 0
+            while self._queue and (not items or rows + len(self._queue[0][0]) <= self.max_batch_size):
+                item = self._queue.popleft()
+                items.append(item)
+                rows += len(item[0])
+            self._pending_rows -= rows
+            return items
+
+    def _run(self):
+        while True:
+            items = self._take_batch()
+            if items is None:
+                return
+            now = time.perf_counter()
+            for _, _, t_enq in items:
+                QUEUE_WAIT_HIST.observe((now - t_enq) * 1000.0)
+            sizes = [len(x) for x, _, _ in items]
+            BATCH_SIZE_HIST.observe(sum(sizes))
+            try:
+                X = items[0][0] if len(items) == 1 else np.concatenate([x for x, _, _ in items], axis=0)
+                y = np.asarray(self.predict_fn(X))
+                if len(y) != len(X):
+                    raise ValueError(f"model returned {len(y)} outputs for {len(X)} rows")
+            except Exception as e:
+                for _, fut, _ in items:
+                    fut.set_exception(e)
+                continue
+            start = 0
+            for (_, fut, _), n in zip(items, sizes):
+                fut.set_result(y[start:start + n])
+                start += n
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_s * 1000.0,
+            "queued_rows": self._pending_rows,
+        }
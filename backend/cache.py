@@ -0,0 +1,115 @@
+# backend/cache.py
+import os, time, hashlib, threading
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+CACHE_ENABLED = os.getenv("PREDICT_CACHE_ENABLED", "1") == "1"
+CACHE_MAX_ROWS = int(os.getenv("PREDICT_CACHE_MAX_ROWS", "100000"))   # LRU bound, in cached rows
+CACHE_TTL_S = float(os.getenv("PREDICT_CACHE_TTL_S", "300"))          # 0 disables expiry
+
+def row_keys(X: np.ndarray) -> List[bytes]:
+    """One digest per row of the final (scaled) feature matrix."""
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    return [hashlib.blake2b(row.tobytes(), digest_size=16).digest() for row in X]
+
+class PredictionCache:
+    """
+    LRU + TTL cache of model outputs, one entry per feature row.
+
+    Entries belong to the model version they were computed with; a lookup for a
+    different version drops everything first, so swapping the bundle invalidates the
+    cache without anyone having to remember to clear it.
+    """
+    def __init__(self, max_rows: int = CACHE_MAX_ROWS, ttl_s: float = CACHE_TTL_S):
+        self.max_rows = max(1, int(max_rows))
+        self.ttl_s = max(0.0, float(ttl_s))
+        self._entries: "OrderedDict[bytes, Tuple[np.ndarray, float]]" = OrderedDict()
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self, version: str) -> None:
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get_many(self, keys: List[bytes], version: str) -> List[Optional[np.ndarray]]:
+        now = time.monotonic()
+        out: List[Optional[np.ndarray]] = []
+        with self._lock:
+            self._check_version(version)
+            for k in keys:
+                entry = self._entries.get(k)
+                if entry is not None and (not self.ttl_s or now - entry[1] <= self.ttl_s):
+                    self._entries.move_to_end(k)
+                    out.append(entry[0])
+                    self.hits += 1
+                else:
+                    if entry is not None:
+                        del self._entries[k]    # expired
+                    out.append(None)
+                    self.misses += 1
+        return out
+
+    def put_many(self, keys: List[bytes], values: np.ndarray, version: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(version)
+            for k, v in zip(keys, values):
+                self._entries[k] = (np.array(v), now)   # copy: don't pin the whole batch output
+                self._entries.move_to_end(k)
+            while len(self._entries) > self.max_rows:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model_version": self._version,
+                "rows": len(self._entries),
+                "max_rows": self.max_rows,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+def cached_predict(
+    cache: PredictionCache,
+    X: np.ndarray,
+    version: str,
+    predict_fn: Callable[[np.ndarray], np.ndarray],
+) -> np.ndarray:
+    """Serve cached rows, run `predict_fn` on the misses only, and stitch the outputs back in order."""
+    if len(X) == 0:
+        return predict_fn(X)
+    keys = row_keys(X)
+    cached = cache.get_many(keys, version)
+    miss = [i for i, v in enumerate(cached) if v is None]
+    if not miss:
+        return np.stack(cached)
+    y_miss = np.asarray(predict_fn(X[miss] if len(miss) < len(X) else X))
+    if len(y_miss) != len(miss):
+        raise ValueError(f"model returned {len(y_miss)} outputs for {len(miss)} rows")
+    cache.put_many([keys[i] for i in miss], y_miss, version)
+    if len(miss) == len(X):
+        return y_miss
+    out = np.empty((len(X),) + y_miss.shape[1:], dtype=y_miss.dtype)
+    out[miss] = y_miss
+    hit = [i for i, v in enumerate(cached) if v is not None]
+    out[hit] = np.stack([cached[i] for i in hit])
+    return out
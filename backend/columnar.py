@@ -0,0 +1,98 @@
+# backend/columnar.py
+"""
+Columnar request/response codecs for bulk scoring.
+
+A bulk request carries one array per raw column instead of one dict per row, so a
+100k-row job is a single body. Three input encodings are accepted, picked by
+Content-Type:
+
+    application/json                      {"columns": {"Aridity_2020": [...], ...}}
+                                          (a bare {column: [...]} object also works)
+    application/vnd.apache.arrow.stream   Arrow IPC stream
+    application/vnd.apache.arrow.file     Arrow IPC file
+    application/vnd.apache.parquet        Parquet file (application/x-parquet too)
+
+pyarrow is only imported for the Arrow/Parquet encodings.
+"""
+import io, json
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+JSON_TYPES = ("application/json",)
+ARROW_STREAM_TYPES = ("application/vnd.apache.arrow.stream",)
+ARROW_FILE_TYPES = ("application/vnd.apache.arrow.file", "application/x-arrow")
+PARQUET_TYPES = ("application/vnd.apache.parquet", "application/x-parquet", "application/parquet")
+
+ARROW_STREAM = ARROW_STREAM_TYPES[0]
+
+class UnsupportedFormat(ValueError):
+    """Body encoding we don't know how to read (or whose optional dependency is missing)."""
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc, pyarrow.parquet  # noqa: F401  (submodules used below)
+    except ImportError as e:
+        raise UnsupportedFormat("Arrow/Parquet bodies need pyarrow installed on the server") from e
+    return pyarrow
+
+def _media_type(content_type: Optional[str]) -> str:
+    return (content_type or "application/json").split(";")[0].strip().lower()
+
+def read_columnar_json(body: bytes) -> pd.DataFrame:
+    obj = json.loads(body)
+    if isinstance(obj, dict) and isinstance(obj.get("columns"), dict):
+        obj = obj["columns"]
+    if not isinstance(obj, dict) or not all(isinstance(v, list) for v in obj.values()):
+        raise ValueError('expected {"columns": {name: [values, ...]}}')
+    lengths = {len(v) for v in obj.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"all columns must have the same length, got lengths {sorted(lengths)}")
+    return pd.DataFrame(obj)
+
+def read_arrow(body: bytes, stream: bool = True) -> pd.DataFrame:
+    pa = _pyarrow()
+    buf = pa.py_buffer(body)
+    reader = pa.ipc.open_stream(buf) if stream else pa.ipc.open_file(buf)
+    return reader.read_all().to_pandas()
+
+def read_parquet(body: bytes) -> pd.DataFrame:
+    pa = _pyarrow()
+    return pa.parquet.read_table(pa.BufferReader(body)).to_pandas()
+
+def read_frame(body: bytes, content_type: Optional[str]) -> pd.DataFrame:
+    """Decode a bulk body into a raw (unprojected) DataFrame according to its Content-Type."""
+    mt = _media_type(content_type)
+    if mt in JSON_TYPES:
+        return read_columnar_json(body)
+    if mt in ARROW_STREAM_TYPES:
+        return read_arrow(body, stream=True)
+    if mt in ARROW_FILE_TYPES:
+        return read_arrow(body, stream=False)
+    if mt in PARQUET_TYPES:
+        return read_parquet(body)
+    raise UnsupportedFormat(f"unsupported Content-Type '{mt}'")
+
+def wants_arrow(accept: Optional[str]) -> bool:
+    return ARROW_STREAM in (accept or "").lower()
+
+def preds_to_json(preds: np.ndarray, model_version: str) -> bytes:
+    """Compact JSON: a flat float array plus enough metadata to interpret it."""
+    preds = np.asarray(preds, dtype=np.float64).reshape(-1)
+    return json.dumps({
+        "preds": preds.tolist(),
+        "n_rows": int(len(preds)),
+        "model_version": model_version,
+    }).encode("utf-8")
+
+def preds_to_arrow(preds: np.ndarray, model_version: str) -> bytes:
+    """Single-column ("pred", float32) Arrow IPC stream; model version in the schema metadata."""
+    pa = _pyarrow()
+    preds = np.asarray(preds, dtype=np.float32).reshape(-1)
+    table = pa.table({"pred": preds}).replace_schema_metadata({"model_version": model_version})
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
@@ -0,0 +1,62 @@
+# backend/executor.py
+import os, asyncio, functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from backend.metrics import histogram
+
+# Threads are enough: NumPy matmuls and TF ops release the GIL, and a process pool
+# would have to pickle every feature matrix and hold its own copy of the model.
+INFERENCE_THREADS      = int(os.getenv("INFERENCE_THREADS", str(min(32, (os.cpu_count() or 1) + 4))))
+INFERENCE_MAX_INFLIGHT = int(os.getenv("INFERENCE_MAX_INFLIGHT", str(4 * INFERENCE_THREADS)))  # running + queued
+
+INFLIGHT_HIST = histogram(
+    "inference_inflight", "Requests running or queued on the inference executor at admission",
+    (1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+class Overloaded(RuntimeError):
+    """Admission refused: the executor already has max_inflight requests."""
+
+class InferenceExecutor:
+    """
+    Dedicated pool for CPU-bound predict work, kept apart from FastAPI's default threadpool.
+
+    `run()` is awaited on the event loop. It admits at most `max_inflight` calls at a
+    time (running or waiting for a thread); past that it raises Overloaded right
+    away, so a burst gets fast 503s instead of everyone's latency growing. Admission
+    is only checked on the event loop thread, so the counter needs no lock.
+    """
+    def __init__(self, threads: int = INFERENCE_THREADS, max_inflight: int = INFERENCE_MAX_INFLIGHT):
+        self.threads = max(1, int(threads))
+        self.max_inflight = max(1, int(max_inflight))
+        self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="inference")
+        self.inflight = 0
+        self.completed = 0
+        self.shed = 0
+
+    async def run(self, fn: Callable[..., Any], *args, shed: bool = True, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the pool. With shed=False the call waits instead of failing fast."""
+        if shed and self.inflight >= self.max_inflight:
+            self.shed += 1
+            raise Overloaded(f"{self.inflight} inference calls in flight (limit {self.max_inflight})")
+        self.inflight += 1
+        INFLIGHT_HIST.observe(self.inflight)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+        finally:
+            self.inflight -= 1
+            self.completed += 1
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False)
+
+    def stats(self):
+        return {
+            "threads": self.threads,
+            "max_inflight": self.max_inflight,
+            "inflight": self.inflight,
+            "completed": self.completed,
+            "shed": self.shed,
+        }
@@ -0,0 +1,331 @@
+# backend/feature_store.py
+"""
+Precomputed history features (prev_lag1 / prev_roll3 and friends), looked up by
+entity key at predict time.
+
+A store holds one series, e.g. malaria prevalence per State per survey year, or
+total visits per clinic per month. For every stored period it keeps, per entity,
+
+    lag1  = the entity's latest observed value up to and including that period
+    rollW = mean of its last W observed values (W = window, default 3)
+
+i.e. the features to use when predicting any later period. As in training
+(notebooks/Longitudinal_model.ipynb) the lag is the previous *observation*, not
+the previous calendar period, so survey gaps are fine. Training's rolling mean
+also included the target year; at serving time that value is unknown, so the
+window ends at the last observed period.
+
+On disk, one directory per store under FEATURE_STORE_DIR:
+
+    manifest.json   entity / period fields, feature names, window, periods, entity keys,
+                    digest of the source rows stored so far
+    features.npy    float32 (periods, entities, 2), memory-mapped by the API
+    state.npy       float32 (entities, window): last W observations, newest last
+
+New periods are appended from state.npy, so adding a month costs one pass over
+the entities, not a recompute of the history. Appending is only done while the
+source rows up to the last stored period still hash to the manifest's digest; a
+corrected value, a back-filled or a dropped period rebuilds the store. Lookups are a dict hit for the
+entity plus a binary search over the (few) periods, then one read from the map.
+
+    update_store(path, df, "State", "year", "prevalence", ("prev_lag1", "prev_roll3"))
+    store = FeatureStore.open(path)
+    store.lookup("Kano", 2024)          # -> {"prev_lag1": ..., "prev_roll3": ...}
+"""
+import bisect, json, os, threading, time, warnings
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from backend.fsutil import staging_dir, swap_dir
+
+DATA_ROOT = Path(os.getenv("DATA_ROOT", "./data"))
+FEATURE_STORE_DIR = Path(os.getenv("FEATURE_STORE_DIR", str(DATA_ROOT / "processed" / "features")))
+FEATURE_STORE_REFRESH_S = float(os.getenv("FEATURE_STORE_REFRESH_S", "10"))   # how often manifests are re-checked
+WINDOW = 3
+
+def period_key(v, width: Optional[int] = None) -> str:
+    """'2021', '2024-03' from years, month strings, dates or timestamps."""
+    if isinstance(v, (float, np.floating)) and float(v).is_integer():
+        v = int(v)
+    s = str(v)
+    return s[:width] if width else s
+
+# ---------- building ----------
+def _roll(state: np.ndarray, values: np.ndarray) -> None:
+    """Push this period's values into the per-entity windows; NaN = not observed, window unchanged."""
+    obs = ~np.isnan(values)
+    state[obs, :-1] = state[obs, 1:]
+    state[obs, -1] = values[obs]
+
+def _features(state: np.ndarray) -> np.ndarray:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)       # entities with no observation yet: NaN
+        roll = np.nanmean(state, axis=1)
+    # windows fill from the right, so the last slot is the newest observation
+    return np.stack([state[:, -1], roll], axis=1).astype(np.float32)
+
+def _digest(entity: np.ndarray, key: np.ndarray, vals: np.ndarray) -> np.ndarray:
+    """Per-row uint64 hashes of (entity, period key, value); their sum doesn't depend on row order."""
+    e_codes, e_uniques = pd.factorize(entity)
+    h = pd.util.hash_array(np.asarray(e_uniques.astype(str), dtype=object))[e_codes]
+    for a in (key, vals):
+        h = h * np.uint64(1000003) ^ pd.util.hash_array(a)
+    return h
+
+def _read(path: Path):
+    with open(path / "manifest.json", "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    return manifest, np.load(path / "features.npy"), np.load(path / "state.npy")
+
+def _write(path: Path, manifest: dict, feats: np.ndarray, state: np.ndarray) -> None:
+    # the API memory-maps features.npy; its open maps keep the swapped-out files alive
+    tmp = staging_dir(path)
+    np.save(tmp / "features.npy", np.ascontiguousarray(feats, dtype=np.float32))
+    np.save(tmp / "state.npy", np.ascontiguousarray(state, dtype=np.float32))
+    with open(tmp / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    swap_dir(tmp, path)
+
+def update_store(path, df: pd.DataFrame, entity_field: str, period_field: str, value: str,
+                 features: Sequence[str] = ("prev_lag1", "prev_roll3"), window: int = WINDOW,
+                 period_width: Optional[int] = None, rebuild: bool = False) -> dict:
+    """
+    Bring the store at `path` up to date with df (one row per entity and period).
+    Periods after the last stored one are appended; anything else (first build, a
+    changed, back-filled or dropped row up to the last stored period, different
+    settings, rebuild=True) rebuilds from scratch.
+    period_width trims period keys, e.g. 7 keeps '2024-03' of '2024-03-01'.
+    Returns {"mode": "built" | "appended" | "unchanged", "periods_added", "entities", "periods"}.
+    """
+    path = Path(path)
+    vals = pd.to_numeric(df[value], errors="coerce").to_numpy(dtype=np.float64)
+    # rows without an entity or period can't be placed (factorize would code them -1)
+    ok = ~np.isnan(vals) & df[entity_field].notna().to_numpy() & df[period_field].notna().to_numpy()
+    # period keys: one parse per distinct value
+    p_codes, p_uniques = pd.factorize(df[period_field].to_numpy()[ok])
+    keys = np.array([period_key(p, period_width) for p in p_uniques], dtype=object)
+    row_hash = _digest(df[entity_field].to_numpy()[ok], keys[p_codes], vals[ok])
+    config = {"entity_field": entity_field, "period_field": period_field, "value": value,
+              "features": list(features), "window": int(window), "period_width": period_width}
+
+    manifest = None
+    if not rebuild and (path / "manifest.json").exists():
+        manifest, feats, state = _read(path)
+        if any(manifest.get(k) != v for k, v in config.items()):
+            manifest = None
+    periods_src = sorted(set(keys))
+    if manifest is not None and manifest["periods"]:
+        # the source rows the store already covers must be exactly the ones it was built from
+        last = manifest["periods"][-1]
+        covered = np.array([k <= last for k in keys], dtype=bool)[p_codes]
+        if str(int(row_hash[covered].sum(dtype=np.uint64))) != manifest.get("digest"):
+            manifest = None                                   # history changed: rebuild
+    if manifest is None:
+        entities: List[str] = []
+        feats = np.empty((0, 0, 2), dtype=np.float32)
+        state = np.empty((0, window), dtype=np.float32)
+        periods: List[str] = []
+        mode = "built"
+    else:
+        entities, periods = list(manifest["entities"]), list(manifest["periods"])
+        mode = "appended"
+    new_periods = [p for p in periods_src if not periods or p > periods[-1]]
+    if manifest is not None and not new_periods:
+        return {"mode": "unchanged", "periods_added": 0, "entities": len(entities), "periods": len(periods)}
+
+    # only the rows of new periods from here on
+    per_of_unique = pd.Index(new_periods).get_indexer(keys)
+    per_pos = per_of_unique[p_codes]
+    rows = per_pos >= 0
+    per_pos = per_pos[rows]
+    e_codes, e_uniques = pd.factorize(df[entity_field].to_numpy()[ok][rows])
+    e_uniques = np.asarray(e_uniques).astype(str)
+    known = pd.Index(entities)
+    added = sorted(set(e_uniques) - set(entities))
+    entities += added
+    if added:
+        state = np.vstack([state, np.full((len(added), window), np.nan, dtype=np.float32)])
+        feats = np.concatenate([feats, np.full((len(periods), len(added), 2), np.nan, dtype=np.float32)], axis=1)
+    ent_pos = (known.append(pd.Index(added)) if len(known) else pd.Index(added)).get_indexer(e_uniques)[e_codes]
+
+    # (new periods x entities) matrix of observations (mean of duplicates), NaN where an entity has none
+    cells = per_pos.astype(np.int64) * len(entities) + ent_pos
+    size = len(new_periods) * len(entities)
+    sums = np.bincount(cells, weights=vals[ok][rows], minlength=size)
+    counts = np.bincount(cells, minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        obs = (sums / counts).astype(np.float32).reshape(len(new_periods), len(entities))
+
+    state = state.astype(np.float32, copy=True)
+    slabs = []
+    for row in obs:
+        _roll(state, row)
+        slabs.append(_features(state))
+    feats = np.concatenate([feats.reshape(len(periods), len(entities), 2), np.stack(slabs)], axis=0)
+    periods += new_periods
+
+    manifest = {**config, "periods": periods, "entities": entities,
+                "digest": str(int(row_hash.sum(dtype=np.uint64))),
+                "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    _write(path, manifest, feats, state)
+    return {"mode": mode, "periods_added": len(new_periods), "entities": len(entities), "periods": len(periods)}
+
+# ---------- serving ----------
+class FeatureStore:
+    """One store, memory-mapped read-only."""
+    def __init__(self, path: Path, manifest: dict, features: np.ndarray):
+        self.path = Path(path)
+        self.name = self.path.name
+        self.entity_field = manifest["entity_field"]
+        self.period_field = manifest["period_field"]
+        self.features: List[str] = list(manifest["features"])
+        self.periods: List[str] = list(manifest["periods"])
+        self.width = manifest.get("period_width")
+        self.entities: Dict[str, int] = {e: i for i, e in enumerate(manifest["entities"])}
+        self.updated_at = manifest.get("updated_at")
+        self.values = features                      # (periods, entities, 2)
+
+    @classmethod
+    def open(cls, path) -> "FeatureStore":
+        path = Path(path)
+        with open(path / "manifest.json", "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        return cls(path, manifest, np.load(path / "features.npy", mmap_mode="r"))
+
+    def row_for(self, period=None) -> int:
+        """Stored-period row whose features apply to `period` (-1 if nothing was observed before it)."""
+        if period is None or (isinstance(period, float) and np.isnan(period)):
+            return len(self.periods) - 1
+        return bisect.bisect_left(self.periods, period_key(period, self.width)) - 1
+
+    def lookup(self, entity, period=None) -> Optional[Dict[str, float]]:
+        """Features for `entity` when predicting `period` (default: the period after the last one stored)."""
+        col = self.entities.get(str(entity))
+        row = self.row_for(period)
+        if col is None or row < 0:
+            return None
+        v = self.values[row, col]
+        return {f: float(x) for f, x in zip(self.features, v) if not np.isnan(x)} or None
+
+    def gather(self, entities: Sequence, periods: Optional[Sequence] = None) -> np.ndarray:
+        """(n, 2) features for aligned entity / period arrays; NaN where unknown."""
+        cols = pd.Index(list(self.entities)).get_indexer(pd.Index([str(e) for e in entities]))
+        if periods is None:
+            rows = np.full(len(cols), len(self.periods) - 1)
+        else:
+            keys = [period_key(p, self.width) for p in periods]
+            rows = np.searchsorted(np.asarray(self.periods), keys, side="left") - 1
+        out = np.full((len(cols), 2), np.nan, dtype=np.float32)
+        ok = (cols >= 0) & (rows >= 0)
+        out[ok] = self.values[rows[ok], cols[ok]]
+        return out
+
+    def describe(self) -> dict:
+        return {
+            "entity_field": self.entity_field, "period_field": self.period_field, "features": self.features,
+            "entities": len(self.entities), "periods": [self.periods[0], self.periods[-1]] if self.periods else [],
+            "updated_at": self.updated_at,
+        }
+
+def _missing(v) -> bool:
+    return v is None or (isinstance(v, float) and np.isnan(v))
+
+class FeatureStores:
+    """
+    Every store under a directory. Re-opened when a manifest changes (checked at
+    most every refresh_s seconds), so a pipeline run shows up without a restart.
+    """
+    def __init__(self, root: Path = FEATURE_STORE_DIR, refresh_s: float = FEATURE_STORE_REFRESH_S):
+        self.root = Path(root)
+        self.refresh_s = refresh_s
+        self.stores: Dict[str, FeatureStore] = {}
+        self._mtimes: Dict[str, float] = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.filled = self.unresolved = 0
+
+    def _scan(self) -> Dict[str, float]:
+        if not self.root.is_dir():
+            return {}
+        out = {}
+        for p in self.root.iterdir():
+            if not p.name.startswith(".") and (p / "manifest.json").exists():
+                out[p.name] = (p / "manifest.json").stat().st_mtime
+        return out
+
+    def refresh(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.refresh_s:
+            return
+        with self._lock:
+            self._checked_at = now
+            mtimes = self._scan()
+            if mtimes == self._mtimes and not force:
+                return
+            stores = {}
+            for name in mtimes:
+                try:
+                    stores[name] = FeatureStore.open(self.root / name)
+                except (OSError, ValueError, KeyError):
+                    continue                      # half-written or foreign directory; next scan
+            self.stores, self._mtimes = stores, mtimes
+
+    def for_features(self, wanted: Sequence[str]) -> List[FeatureStore]:
+        self.refresh()
+        wanted = set(wanted)
+        return [s for s in self.stores.values() if wanted.intersection(s.features)]
+
+    def fill_records(self, records: List[Dict[str, Any]], wanted: Sequence[str]) -> List[Dict[str, Any]]:
+        """
+        Records with the store's history features filled in where the caller left
+        them out (or null) and sent the entity key. Values the caller sent win.
+        Returns the same list when nothing changed, otherwise a list where only the
+        filled records are copies.
+        """
+        stores = self.for_features(wanted)
+        if not stores:
+            return records
+        out = records
+        for store in stores:
+            for i, rec in enumerate(out):
+                if not any(_missing(rec.get(f)) for f in store.features):
+                    continue
+                entity = rec.get(store.entity_field)
+                if entity is None:
+                    continue
+                vals = store.lookup(entity, rec.get(store.period_field))
+                if vals is None:
+                    self.unresolved += 1
+                    continue
+                if out is records:
+                    out = list(records)
+                out[i] = {**rec, **{f: v for f, v in vals.items() if _missing(rec.get(f))}}
+                self.filled += 1
+        return out
+
+    def fill_frame(self, df: pd.DataFrame, wanted: Sequence[str]) -> pd.DataFrame:
+        """fill_records() for a columnar frame."""
+        for store in self.for_features(wanted):
+            if store.entity_field not in df.columns:
+                continue
+            periods = df[store.period_field].tolist() if store.period_field in df.columns else None
+            vals = store.gather(df[store.entity_field].tolist(), periods)
+            df = df.copy()
+            gaps = np.zeros(len(df), dtype=bool)
+            for j, f in enumerate(store.features):
+                have = pd.to_numeric(df[f], errors="coerce").to_numpy(dtype=np.float64) if f in df.columns \
+                    else np.full(len(df), np.nan)
+                gaps |= np.isnan(have)
+                df[f] = np.where(np.isnan(have), vals[:, j], have)
+            known = ~np.isnan(vals).all(axis=1)
+            self.filled += int((gaps & known).sum())
+            self.unresolved += int((gaps & ~known & df[store.entity_field].notna().to_numpy()).sum())
+        return df
+
+    def stats(self) -> dict:
+        self.refresh()
+        return {"root": str(self.root), "stores": {n: s.describe() for n, s in self.stores.items()},
+                "filled": self.filled, "unresolved": self.unresolved}
@@ -0,0 +1,276 @@
+# backend/forecast.py
+"""
+Visit-volume forecasts, 1..FORECAST_HORIZON months ahead, for every clinic.
+
+Model: one ridge regression per horizon h ("direct" multi-horizon), shared by all
+clinics. Inputs at the forecast origin t are the clinic's last WINDOW months of
+total_visits divided by its level (their mean), the 3-month mean on the same
+scale, and the calendar month of t + h; the target is visits at t + h over the
+same level. Working relative to the level lets a 40-visit dispensary and a
+2000-visit hospital share the seasonal and momentum weights. Months a clinic
+didn't report count as "at level". The interval is point ± FORECAST_INTERVAL_Z ×
+the horizon's in-sample relative RMSE × level.
+
+`build_forecasts` fits the model on the last FORECAST_TRAIN_ORIGINS origins of
+the visit history, then forecasts every clinic from the newest month in one
+matrix product per call. The result is a keyed columnar table in one directory
+(swapped in atomically, like the feature stores):
+
+    manifest.json   clinic keys, origin month, horizon, model version, fit stats
+    forecasts.npy   float32 (clinics, 3, horizon): point, lower, upper
+    history.npy     float32 (clinics, WINDOW): the inputs, for on-demand recomputes
+    model.npz       weights (horizon, features), relative RMSE per horizon
+
+`ForecastTable.open` loads the arrays (30,000 clinics are ~6 MB); a read is a dict
+hit for the clinic and one row slice, about 10 µs. `recompute` reruns the model for one clinic, e.g. with a
+month the batch hasn't seen yet.
+
+    build_forecasts(FORECAST_DIR, read_table("clinic_visits"))
+    table = ForecastTable.open(FORECAST_DIR)
+    table.get("NGA-041701", horizon=6)
+    table.recompute("NGA-041701", {"2025-01": 212})
+"""
+import hashlib, json, os, time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.fsutil import staging_dir, swap_dir
+from backend.visit_features import HISTORY as WINDOW, keyed, month_index, month_label
+
+DATA_ROOT = Path(os.getenv("DATA_ROOT", "./data"))
+FORECAST_DIR = Path(os.getenv("FORECAST_DIR", str(DATA_ROOT / "processed" / "forecasts" / "visits")))
+FORECAST_HORIZON = int(os.getenv("FORECAST_HORIZON", "12"))
+FORECAST_TRAIN_ORIGINS = int(os.getenv("FORECAST_TRAIN_ORIGINS", "36"))
+FORECAST_RIDGE = float(os.getenv("FORECAST_RIDGE", "1.0"))
+FORECAST_INTERVAL_Z = float(os.getenv("FORECAST_INTERVAL_Z", "1.2816"))    # 80% band
+
+# ---------- model ----------
+def visit_grid(df: pd.DataFrame) -> Tuple[np.ndarray, int, np.ndarray]:
+    """(sorted clinic ids, first month_index, total_visits as a dense clinics × months grid, NaN = not reported)."""
+    df = keyed(df)
+    c_codes, clinics = pd.factorize(df["clinic_id"], sort=True)
+    m_idx = month_index(df["month"])
+    t0 = int(m_idx.min()) if len(m_idx) else 0
+    T = int(m_idx.max()) - t0 + 1 if len(m_idx) else 0
+    grid = np.full((len(clinics), T), np.nan)
+    grid[c_codes, m_idx - t0] = pd.to_numeric(df["total_visits"], errors="coerce").to_numpy(dtype=np.float64)
+    return np.asarray(clinics.astype(str), dtype=object), t0, grid
+
+def _base(hist: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Horizon-independent inputs from (n, WINDOW) histories, oldest first -> (X, level)."""
+    ok = ~np.isnan(hist)
+    n = ok.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        level = np.where(n > 0, np.where(ok, hist, 0.0).sum(axis=1) / n, np.nan)
+        rel = np.where(ok, hist / level[:, None], 1.0)
+        rel = np.where(np.isfinite(rel), rel, 1.0)          # level 0: a clinic with no visits stays flat
+    roll3 = rel[:, -3:].mean(axis=1)
+    X = np.column_stack([np.ones(len(hist)), rel[:, ::-1], roll3])
+    return X, level
+
+def _season(target: np.ndarray) -> np.ndarray:
+    a = 2 * np.pi * (np.asarray(target) % 12) / 12.0
+    return np.column_stack([np.sin(a), np.cos(a), np.sin(2 * a), np.cos(2 * a)])
+
+N_FEATURES = 1 + WINDOW + 1 + 4
+
+@dataclass
+class VisitForecaster:
+    weights: np.ndarray      # (horizon, N_FEATURES)
+    rel_rmse: np.ndarray     # (horizon,)
+    rows: np.ndarray         # training rows per horizon
+
+    @property
+    def horizon(self) -> int:
+        return len(self.weights)
+
+    @property
+    def version(self) -> str:
+        return "visits-ridge-" + hashlib.sha256(np.ascontiguousarray(self.weights).tobytes()).hexdigest()[:10]
+
+    @classmethod
+    def fit(cls, grid: np.ndarray, t0: int, horizon: int = FORECAST_HORIZON,
+            origins: int = FORECAST_TRAIN_ORIGINS, ridge: float = FORECAST_RIDGE) -> "VisitForecaster":
+        """Ridge per horizon on the last `origins` forecast origins of the grid (normal equations, accumulated per origin)."""
+        C, T = grid.shape
+        padded = np.concatenate([np.full((C, WINDOW - 1), np.nan), grid], axis=1)
+        xtx = np.zeros((horizon, N_FEATURES, N_FEATURES))
+        xty = np.zeros((horizon, N_FEATURES))
+        yty = np.zeros(horizon)
+        rows = np.zeros(horizon, dtype=np.int64)
+        for t in range(max(0, T - 1 - origins), T - 1):
+            base, level = _base(padded[:, t:t + WINDOW])
+            for h in range(1, min(horizon, T - 1 - t) + 1):
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    y = grid[:, t + h] / level
+                keep = np.isfinite(y)
+                if not keep.any():
+                    continue
+                X = np.column_stack([base[keep], np.broadcast_to(_season([t0 + t + h]), (int(keep.sum()), 4))])
+                xtx[h - 1] += X.T @ X
+                xty[h - 1] += X.T @ y[keep]
+                yty[h - 1] += y[keep] @ y[keep]
+                rows[h - 1] += int(keep.sum())
+        penalty = ridge * np.eye(N_FEATURES)
+        penalty[0, 0] = 0.0                                   # intercept is not shrunk
+        weights = np.zeros((horizon, N_FEATURES))
+        rel_rmse = np.full(horizon, np.nan)
+        for i in range(horizon):
+            if rows[i] == 0:
+                weights[i, 0] = 1.0                           # no data that far ahead: stay at level
+                continue
+            w = np.linalg.solve(xtx[i] + penalty, xty[i])
+            rss = yty[i] - 2 * w @ xty[i] + w @ xtx[i] @ w
+            weights[i], rel_rmse[i] = w, np.sqrt(max(rss, 0.0) / rows[i])
+        return cls(weights, rel_rmse, rows)
+
+    def predict(self, hist: np.ndarray, origin, horizon: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Forecasts from (n, WINDOW) histories ending at `origin` (month_index, scalar or
+        per row) -> {"point", "lower", "upper"}, each (n, horizon). NaN without history.
+        """
+        H = min(horizon or self.horizon, self.horizon)
+        base, level = _base(np.asarray(hist, dtype=np.float64))
+        origin = np.broadcast_to(np.asarray(origin, dtype=np.int64), (len(base),))
+        # base part is shared by every horizon: one product for all of them
+        rel = base @ self.weights[:H, :-4].T
+        for h in range(1, H + 1):
+            rel[:, h - 1] += _season(origin + h) @ self.weights[h - 1, -4:]
+        point = np.clip(rel, 0.0, None) * level[:, None]
+        band = FORECAST_INTERVAL_Z * np.nan_to_num(self.rel_rmse[:H])[None, :] * level[:, None]
+        return {"point": point, "lower": np.clip(point - band, 0.0, None), "upper": point + band}
+
+    def save(self, path: Path) -> None:
+        np.savez(path, weights=self.weights, rel_rmse=self.rel_rmse, rows=self.rows, window=WINDOW)
+
+    @classmethod
+    def load(cls, path: Path) -> "VisitForecaster":
+        with np.load(path) as z:
+            if int(z["window"]) != WINDOW or z["weights"].shape[1] != N_FEATURES:
+                raise ValueError(f"{path} was fitted with different inputs; rebuild the forecasts")
+            return cls(z["weights"].copy(), z["rel_rmse"].copy(), z["rows"].copy())
+
+# ---------- batch build ----------
+BANDS = ("point", "lower", "upper")
+
+def _write(path: Path, manifest: dict, arrays: Dict[str, np.ndarray], model: VisitForecaster) -> None:
+    # ForecastTable.open reads the arrays into memory, so a table that is already open
+    # doesn't depend on the files; the API reopens the new one when the manifest changes
+    tmp = staging_dir(path)
+    for name, arr in arrays.items():
+        np.save(tmp / f"{name}.npy", np.ascontiguousarray(arr, dtype=np.float32))
+    model.save(tmp / "model.npz")
+    with open(tmp / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    swap_dir(tmp, path)
+
+def build_forecasts(path, df: pd.DataFrame, horizon: int = FORECAST_HORIZON,
+                    origins: int = FORECAST_TRAIN_ORIGINS, ridge: float = FORECAST_RIDGE) -> dict:
+    """Fit on clinic_visits rows (clinic_id, month, total_visits), forecast every clinic, write the table at path."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    t_start = time.perf_counter()
+    clinics, t0, grid = visit_grid(df)
+    if grid.shape[1] < 2:
+        raise ValueError("need at least two months of visits to fit a forecast")
+    model = VisitForecaster.fit(grid, t0, horizon, origins, ridge)
+    fit_s = time.perf_counter() - t_start
+    hist = np.concatenate([np.full((len(clinics), WINDOW), np.nan), grid], axis=1)[:, -WINDOW:]
+    origin = t0 + grid.shape[1] - 1
+    out = model.predict(hist, origin)
+    manifest = {
+        "clinics": clinics.tolist(),
+        "origin": month_label([origin])[0],
+        "horizon": model.horizon,
+        "window": WINDOW,
+        "model_version": model.version,
+        "rel_rmse": [None if np.isnan(v) else round(float(v), 4) for v in model.rel_rmse],
+        "train_rows": int(model.rows.sum()),
+        "fit_s": round(fit_s, 3),
+        "predict_s": round(time.perf_counter() - t_start - fit_s, 3),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    _write(path, manifest, {"forecasts": np.stack([out[b] for b in BANDS], axis=1), "history": hist}, model)
+    return {k: v for k, v in manifest.items() if k != "clinics"} | {"clinics": len(clinics)}
+
+# ---------- serving ----------
+def _lists(values: np.ndarray) -> list:
+    """(3, H) forecasts as JSON-ready lists, 1 decimal, None for NaN."""
+    values = np.round(values.astype(np.float64), 1)
+    if np.isnan(values).any():
+        return [[None if x != x else x for x in row] for row in values.tolist()]
+    return values.tolist()
+
+class ForecastTable:
+    """The batch forecasts of one build, keyed by clinic_id."""
+
+    def __init__(self, path: Path, manifest: dict, arrays: Dict[str, np.ndarray], model: VisitForecaster):
+        self.path = path
+        self.manifest = manifest
+        self.arrays = arrays
+        self.model = model
+        self.positions = {c: i for i, c in enumerate(manifest["clinics"])}
+        self.origin = int(month_index([manifest["origin"]])[0])
+        self.horizon = int(manifest["horizon"])
+        self.version = manifest["model_version"]
+        self._origin_label = manifest["origin"]
+        self._months = month_label(self.origin + np.arange(1, self.horizon + 1)).tolist()
+
+    @classmethod
+    def open(cls, path=FORECAST_DIR) -> "ForecastTable":
+        path = Path(path)
+        with open(path / "manifest.json", "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        arrays = {name: np.load(path / f"{name}.npy") for name in ("forecasts", "history")}
+        return cls(path, manifest, arrays, VisitForecaster.load(path / "model.npz"))
+
+    def __contains__(self, clinic_id: str) -> bool:
+        return clinic_id in self.positions
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def _result(self, clinic_id: str, origin: str, months, values: np.ndarray) -> Dict[str, Any]:
+        point, lower, upper = _lists(values)
+        return {"clinic_id": clinic_id, "origin": origin, "model_version": self.version, "months": months,
+                "visits": point, "lower": lower, "upper": upper}
+
+    def get(self, clinic_id: str, horizon: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """The stored forecast for one clinic (first `horizon` months), or None if it isn't in the table."""
+        i = self.positions.get(clinic_id)
+        if i is None:
+            return None
+        H = min(horizon or self.horizon, self.horizon)
+        return self._result(clinic_id, self._origin_label, self._months[:H], self.arrays["forecasts"][i, :, :H])
+
+    def recompute(self, clinic_id: str, history: Optional[Dict[str, float]] = None,
+                  horizon: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Rerun the model for one clinic: its stored inputs overlaid with `history`
+        ({'YYYY-MM': total_visits}); the origin moves to the newest month given.
+        Nothing is written back to the table.
+        """
+        known: Dict[int, float] = {}
+        i = self.positions.get(clinic_id)
+        if i is not None:
+            row = self.arrays["history"][i]
+            known = {self.origin - WINDOW + 1 + j: float(v) for j, v in enumerate(row) if v == v}
+        if history:
+            months = month_index(list(history.keys()))
+            known.update({int(m): float(v) if v is not None else np.nan for m, v in zip(months, history.values())})
+        if not known:
+            raise KeyError(clinic_id)
+        origin = max(max(known), self.origin) if i is not None else max(known)
+        hist = np.array([[known.get(origin - WINDOW + 1 + j, np.nan) for j in range(WINDOW)]])
+        out = self.model.predict(hist, origin, horizon)
+        H = out["point"].shape[1]
+        months = month_label(origin + np.arange(1, H + 1)).tolist()
+        return self._result(clinic_id, month_label([origin])[0], months, np.stack([out[b][0] for b in BANDS]))
+
+    def stats(self) -> Dict[str, Any]:
+        m = self.manifest
+        return {"path": str(self.path), "clinics": len(self), **{k: m[k] for k in m if k != "clinics"}}
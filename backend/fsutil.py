@@ -0,0 +1,24 @@
+# backend/fsutil.py
+"""
+Atomic replacement of the directory tables the batch scripts write for the API
+(feature stores, visit forecasts). Write everything into `staging_dir(path)`, then
+`swap_dir(tmp, path)`: readers see either the old directory or the new one, never
+a half-written mix.
+"""
+import os, shutil, uuid
+from pathlib import Path
+
+def staging_dir(path: Path) -> Path:
+    """A new, empty directory next to `path` (same filesystem, so the swap is a rename)."""
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    tmp.mkdir(parents=True)
+    return tmp
+
+def swap_dir(tmp: Path, path: Path) -> None:
+    """Put `tmp` in place of `path`; the previous directory is moved aside, then deleted."""
+    old = path.with_name(f".{path.name}.old")
+    if path.exists():
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
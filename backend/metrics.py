@@ -0,0 +1,116 @@
+# backend/metrics.py
+import math, threading, time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Default buckets (milliseconds) for latency-style histograms
+LATENCY_MS_BUCKETS = (0.5, 1, 2, 5, 10, 20, 50, 100, 250, 500, 1000, 2500)
+# Default buckets (rows) for batch-size histograms
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+# Default buckets (bytes) for payload-size histograms
+PAYLOAD_BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+class Histogram:
+    """Cumulative bucket histogram, safe to observe from several threads."""
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labels: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.help = help
+        self.labels = dict(labels or {})
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)   # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative, running = {}, 0
+        for le, c in zip(list(self.buckets) + ["+Inf"], counts):
+            running += c
+            cumulative[str(le)] = running
+        return {"buckets": cumulative, "count": count, "sum": total}
+
+REGISTRY: Dict[str, Histogram] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+def _label_str(labels: Optional[Dict[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())) + "}"
+
+def histogram(
+    name: str, help: str = "", buckets: Optional[Sequence[float]] = None, labels: Optional[Dict[str, str]] = None,
+) -> Histogram:
+    """Get-or-create a histogram in the process-wide registry (one per name + label set)."""
+    key = name + _label_str(labels)
+    with _REGISTRY_LOCK:
+        h = REGISTRY.get(key)
+        if h is None:
+            h = Histogram(name, help, buckets or LATENCY_MS_BUCKETS, labels)
+            REGISTRY[key] = h
+        return h
+
+def snapshot(names: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """Keyed by name (plus labels); `names` filters on the bare name."""
+    return {k: h.snapshot() for k, h in REGISTRY.items() if names is None or h.name in names}
+
+@contextmanager
+def timed(name: str, help: str = "", **labels: str):
+    """Observe the block's wall time (ms) into histogram `name` with `labels`."""
+    h = histogram(name, help, labels=labels)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        h.observe((time.perf_counter() - t0) * 1000.0)
+
+# ---------- Prometheus text exposition ----------
+# A collector returns (name, type, help, labels, value) samples read at scrape time,
+# for counters/gauges that live on other objects (executor, caches, ...).
+Sample = Tuple[str, str, str, Dict[str, str], float]
+COLLECTORS: List[Callable[[], Iterable[Sample]]] = []
+
+def register_collector(fn: Callable[[], Iterable[Sample]]) -> None:
+    COLLECTORS.append(fn)
+
+def _fmt(v: float) -> str:
+    v = float(v)
+    if not math.isfinite(v):
+        return "NaN" if math.isnan(v) else ("+Inf" if v > 0 else "-Inf")    # Prometheus text spellings
+    return repr(v) if v != int(v) else str(int(v))
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    families: Dict[str, List[Histogram]] = {}
+    for h in list(REGISTRY.values()):
+        families.setdefault(h.name, []).append(h)
+    for name in sorted(families):
+        hs = families[name]
+        lines.append(f"# HELP {name} {hs[0].help}")
+        lines.append(f"# TYPE {name} histogram")
+        for h in hs:
+            snap = h.snapshot()
+            for le, c in snap["buckets"].items():
+                lines.append(f"{name}_bucket{_label_str(dict(h.labels, le=le))} {c}")
+            lines.append(f"{name}_sum{_label_str(h.labels)} {_fmt(snap['sum'])}")
+            lines.append(f"{name}_count{_label_str(h.labels)} {snap['count']}")
+    seen = set()
+    for fn in COLLECTORS:
+        for name, kind, help, labels, value in fn():
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name}{_label_str(labels)} {_fmt(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,49 @@
+# backend/middleware.py
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.metrics import histogram
+
+def _route_template(scope: Scope):
+    """Path template of the matched route, e.g. /api/v1/stock_risk/{clinic_id}; None if nothing matched."""
+    # newer FastAPI keeps included routers' routes unprefixed and records the full path here
+    effective = (scope.get("fastapi") or {}).get("effective_route_context")
+    if getattr(effective, "path", None):
+        return effective.path
+    return getattr(scope.get("route"), "path", None)
+
+class RequestTimingMiddleware:
+    """
+    Stamps `request.state.t_start` and records http_request_ms{method, route, status}, route being the matched
+    route's path template.
+
+    Plain ASGI rather than BaseHTTPMiddleware so streaming request and response
+    bodies pass through untouched. The time runs until the last body chunk is sent.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        t0 = time.perf_counter()
+        scope.setdefault("state", {})["t_start"] = t0
+        status = {"code": 500}
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                # route template (/stock_risk/{clinic_id}), not the raw path, so ids don't each get
+                # a series; 404s share one label so scanners can't grow the set either
+                template = _route_template(scope) if status["code"] != 404 else None
+                histogram("http_request_ms", "Request latency until the last body byte (ms)", labels={
+                    "method": scope["method"],
+                    "route": template or "unmatched",
+                    "status": str(status["code"]),
+                }).observe((time.perf_counter() - t0) * 1000.0)
+
+        await self.app(scope, receive, send_wrapper)
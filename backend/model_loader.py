@@ -1,24 +1,38 @@
 # backend/model_loader.py
-import os, json, pickle, joblib
+import os, sys, json, time, pickle, shutil, hashlib
 import numpy as np
 import pandas as pd
 
-from typing import List, Optional, Tuple
-from sklearn.preprocessing import StandardScaler
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-try:
-    import tensorflow as tf  # needed for Keras models (even when pickled)
-    from tensorflow.keras.models import load_model as keras_load_model
-except Exception:
-    tf = None
-    keras_load_model = None
+if TYPE_CHECKING:   # sklearn costs ~1s to import; only pulled in when a scaler is actually built
+    from sklearn.preprocessing import StandardScaler
+
+from backend.numpy_mlp import NumpyMLP, from_pickle as numpy_mlp_from_pickle
+
+# "keras" unpickles the model (imports TensorFlow); "numpy" serves the exported .npz weights;
+# "mmap" is the numpy engine with weights memory-mapped from MODEL_MMAP_DIR, shared by all workers
+MODEL_ENGINE = os.getenv("MODEL_ENGINE", "keras")
+MODEL_MMAP_DIR = os.getenv("MODEL_MMAP_DIR", "backend/models/mmap")
+
+def _keras_load_model():
+    # Imported lazily so the numpy engine never pays the TensorFlow import
+    try:
+        from tensorflow.keras.models import load_model as keras_load_model
+    except Exception:
+        keras_load_model = None
+    return keras_load_model
 
 class ModelBundle:
-    def __init__(self, model, scaler: Optional[StandardScaler], features: List[str], version: str):
+    def __init__(self, model, scaler: Optional["StandardScaler"], features: List[str], version: str):
         self.model = model
         self.scaler = scaler
         self.features = features
         self.version = version
+        # compiled once here so requests don't rescan raw columns per feature
+        self.plan = ProjectionPlan(features) if features else None
+        # scaler constants as float32, applied in place by prepare_records
+        self.fast_scaler = fold_scaler(scaler)
 
 def _load_meta(meta_path: str) -> Tuple[List[str], Optional[np.ndarray], Optional[np.ndarray]]:
     with open(meta_path, "r", encoding="utf-8") as f:
@@ -28,7 +42,8 @@ def _load_meta(meta_path: str) -> Tuple[List[str], Optional[np.ndarray], Optiona
     scale = np.array(meta["scaler_scale"]) if "scaler_scale" in meta else None
     return features, mean, scale
 
-def _reconstruct_scaler(mean: np.ndarray, scale: np.ndarray, n_features: int) -> StandardScaler:
+def _reconstruct_scaler(mean: np.ndarray, scale: np.ndarray, n_features: int) -> "StandardScaler":
+    from sklearn.preprocessing import StandardScaler
     sc = StandardScaler()
     sc.mean_ = mean
     sc.scale_ = scale
@@ -36,15 +51,65 @@ def _reconstruct_scaler(mean: np.ndarray, scale: np.ndarray, n_features: int) ->
     sc.n_features_in_ = n_features
     return sc
 
+def _load_numpy_model(model_path: str, npz_path: Optional[str]) -> Tuple[NumpyMLP, str]:
+    """
+    Serve from the .npz export when there is one, else convert the pickle in memory.
+    Loading never writes files; `python -m backend.numpy_mlp export` produces the .npz.
+    """
+    base, ext = os.path.splitext(model_path)
+    if ext == ".npz":
+        return NumpyMLP.from_npz(model_path), model_path
+    npz_path = npz_path or base + ".npz"
+    if os.path.exists(npz_path):
+        return NumpyMLP.from_npz(npz_path), npz_path
+    return numpy_mlp_from_pickle(model_path), model_path
+
+def _load_mmap_model(model_path: str, npz_path: Optional[str], mmap_dir: str) -> Tuple[NumpyMLP, str]:
+    """
+    Map the weights read-only from <mmap_dir>/<source hash>/, exporting them there first.
+
+    The directory is named after the source file's content, so every worker of a
+    deployment maps the same files (one copy in the page cache) and a new model gets
+    a new directory instead of overwriting pages that running workers still map.
+    """
+    base, ext = os.path.splitext(model_path)
+    npz_path = npz_path or base + ".npz"
+    src = model_path if ext == ".npz" or not os.path.exists(npz_path) else npz_path
+    with open(src, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:12]
+    target = os.path.join(mmap_dir, digest)
+    if not os.path.exists(os.path.join(target, "layers.json")):
+        mlp, _ = _load_numpy_model(model_path, npz_path)
+        tmp = f"{target}.tmp{os.getpid()}"
+        try:
+            mlp.save_npy_dir(tmp)
+            os.rename(tmp, target)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)    # another worker won the race, or read-only fs
+            if not os.path.exists(os.path.join(target, "layers.json")):
+                return mlp, src
+    return NumpyMLP.from_npy_dir(target, mmap=True), target
+
 def load_bundle(
     model_path: str,
     scaler_path: Optional[str] = None,
-    meta_path: Optional[str] = None
+    meta_path: Optional[str] = None,
+    engine: Optional[str] = None,
+    npz_path: Optional[str] = None,
+    mmap_dir: Optional[str] = None,
 ) -> ModelBundle:
+    engine = engine or MODEL_ENGINE
     # Prefer .keras / SavedModel if present
     base, ext = os.path.splitext(model_path)
     keras_candidate = base + ".keras"
-    if os.path.exists(keras_candidate) and keras_load_model:
+    keras_load_model = _keras_load_model() if engine not in ("numpy", "mmap") and os.path.exists(keras_candidate) else None
+    if engine == "numpy":
+        model, src = _load_numpy_model(model_path, npz_path)
+        version = f"numpy::{os.path.basename(src)}"
+    elif engine == "mmap":
+        model, src = _load_mmap_model(model_path, npz_path, mmap_dir or MODEL_MMAP_DIR)
+        version = f"mmap::{os.path.basename(src)}"
+    elif keras_load_model:
         model = keras_load_model(keras_candidate, compile=False)
         version = "keras_savedmodel"
     else:
@@ -57,63 +122,118 @@ def load_bundle(
     features: List[str] = []
 
     if scaler_path and os.path.exists(scaler_path):
+        import joblib
         scaler = joblib.load(scaler_path)
 
     if meta_path and os.path.exists(meta_path):
         feats, mean, scale = _load_meta(meta_path)
         features = feats or features
         if scaler is None and mean is not None and scale is not None:
-            scaler = _reconstruct_scaler(mean, scale, len(features))
+            if engine == "mmap":
+                # two constant vectors; skips the ~70 MB per-worker sklearn import
+                scaler = FoldedScaler(mean, scale)
+            else:
+                scaler = _reconstruct_scaler(mean, scale, len(features))
 
     return ModelBundle(model=model, scaler=scaler, features=features, version=version)
 
-def project_to_canonical(df_raw: pd.DataFrame) -> pd.DataFrame:
+# Year suffixes present in the raw DHS covariate exports, latest first
+CANONICAL_YEARS = [2020, 2015, 2010, 2005, 2000]
+# These come from history and are never year-suffixed (can't infer them from one row)
+HISTORY_FEATURES = ("prev_lag1", "prev_roll3")
+CANONICAL_FEATURES = [
+    "All_Population_Count", "Aridity", "Day_Land_Surface_Temp", "Diurnal_Temperature_Range",
+    "Enhanced_Vegetation_Index", "Frost_Days", "ITN_Coverage", "Land_Surface_Temperature",
+    "Malaria_Incidence", "Maximum_Temperature", "Mean_Temperature", "Minimum_Temperature",
+    "Night_Land_Surface_Temp", "PET", "Precipitation", "Rainfall", "U5_Population",
+    "UN_Population_Count", "UN_Population_Density", "Wet_Days", "prev_lag1", "prev_roll3",
+]
+
+def _to_float(value) -> float:
+    """Scalar twin of pd.to_numeric(errors="coerce"): anything unparseable becomes NaN."""
+    if value is None:
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError, OverflowError):     # OverflowError: an int too big for a float
+        return np.nan
+
+def _numeric_block(df: pd.DataFrame) -> np.ndarray:
+    """float32 view of a raw frame; non-numeric cells become NaN."""
+    try:
+        return df.to_numpy(dtype=np.float32, na_value=np.nan)
+    except (TypeError, ValueError):
+        return df.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float32, na_value=np.nan)
+
+class ProjectionPlan:
+    """
+    Raw-column candidates for each canonical feature, compiled once from the feature list.
+
+    Candidates are in priority order: the canonical name itself, then the year-suffixed
+    columns from latest to oldest. Applying the plan gathers every candidate into one
+    (rows x features x candidates) block and keeps, per row, the first non-null value,
+    i.e. the latest year actually reported for that row.
+    """
+    def __init__(self, features: List[str], years: List[int] = CANONICAL_YEARS):
+        self.features = list(features)
+        self.candidates = [
+            [f] if f in HISTORY_FEATURES else [f] + [f"{f}_{y}" for y in years]
+            for f in self.features
+        ]
+        self.columns: List[str] = []
+        pos = {}
+        for cands in self.candidates:
+            for c in cands:
+                if c not in pos:
+                    pos[c] = len(self.columns)
+                    self.columns.append(c)
+        self.column_pos = pos
+        # Ragged candidate lists are padded with a sentinel slot that is always NaN
+        width = max((len(c) for c in self.candidates), default=1)
+        self.index = np.full((len(self.features), width), len(self.columns), dtype=np.intp)
+        for j, cands in enumerate(self.candidates):
+            self.index[j, :len(cands)] = [pos[c] for c in cands]
+
+    def gather(self, df_raw: pd.DataFrame) -> np.ndarray:
+        """(n_rows, n_features) float32 matrix; NaN where no candidate has a value."""
+        raw = np.full((len(df_raw), len(self.columns) + 1), np.nan, dtype=np.float32)
+        present = [c for c in self.columns if c in df_raw.columns]
+        if present:
+            raw[:, [self.column_pos[c] for c in present]] = _numeric_block(df_raw[present])
+        return self._select(raw)
+
+    def gather_records(self, records: List[Dict[str, Any]]) -> np.ndarray:
+        """Same as gather(), read straight from JSON-style dicts without building a DataFrame."""
+        raw = np.full((len(records), len(self.columns) + 1), np.nan, dtype=np.float32)
+        pos = self.column_pos
+        for i, rec in enumerate(records):
+            row = raw[i]
+            for key, value in rec.items():
+                j = pos.get(key)
+                if j is not None:
+                    row[j] = _to_float(value)
+        return self._select(raw)
+
+    def _select(self, raw: np.ndarray) -> np.ndarray:
+        block = raw[:, self.index]                      # single fancy-index gather
+        first = np.isnan(block).argmin(axis=2)          # first non-null candidate (0 if none)
+        return np.take_along_axis(block, first[..., None], axis=2)[..., 0]
+
+    def apply(self, df_raw: pd.DataFrame) -> pd.DataFrame:
+        return pd.DataFrame(self.gather(df_raw), index=df_raw.index, columns=self.features)
+
+_DEFAULT_PLAN = ProjectionPlan(CANONICAL_FEATURES)
+
+def project_to_canonical(df_raw: pd.DataFrame, plan: Optional[ProjectionPlan] = None) -> pd.DataFrame:
     """
     Map year-suffixed raw columns to canonical 22 features expected by the model_meta.
-    Customize the strategy as needed (by year, latest, rolling, etc.).
+    Pass the bundle's compiled plan to follow its feature order; each feature takes the
+    latest non-null year per row (see ProjectionPlan).
     """
-    df = pd.DataFrame(index=df_raw.index)
-
-    # Example: pick “latest” year present from a fixed set
-    YEARS = [2020, 2015, 2010, 2005, 2000]
-    def pick_latest(prefix):
-        for y in YEARS:
-            col = f"{prefix}_{y}"
-            if col in df_raw.columns:
-                return df_raw[col]
-        return np.nan  # will be filled later
-
-    df["All_Population_Count"]   = pick_latest("All_Population_Count")
-    df["Aridity"]                = pick_latest("Aridity")
-    df["Day_Land_Surface_Temp"]  = pick_latest("Day_Land_Surface_Temp")
-    df["Diurnal_Temperature_Range"] = pick_latest("Diurnal_Temperature_Range")
-    df["Enhanced_Vegetation_Index"] = pick_latest("Enhanced_Vegetation_Index")
-    df["Frost_Days"]             = pick_latest("Frost_Days")
-    df["ITN_Coverage"]           = pick_latest("ITN_Coverage")
-    df["Land_Surface_Temperature"] = pick_latest("Land_Surface_Temperature")
-    df["Malaria_Incidence"]      = pick_latest("Malaria_Incidence")
-    df["Maximum_Temperature"]    = pick_latest("Maximum_Temperature")
-    df["Mean_Temperature"]       = pick_latest("Mean_Temperature")
-    df["Minimum_Temperature"]    = pick_latest("Minimum_Temperature")
-    df["Night_Land_Surface_Temp"] = pick_latest("Night_Land_Surface_Temp")
-    df["PET"]                    = pick_latest("PET")
-    df["Precipitation"]          = pick_latest("Precipitation")
-    df["Rainfall"]               = pick_latest("Rainfall")
-    df["U5_Population"]          = pick_latest("U5_Population")
-    df["UN_Population_Count"]    = pick_latest("UN_Population_Count")
-    df["UN_Population_Density"]  = pick_latest("UN_Population_Density")
-    df["Wet_Days"]               = pick_latest("Wet_Days")
-
-    # You still need to supply these two from history (can’t infer from one row)
-    if "prev_lag1" in df_raw.columns: df["prev_lag1"] = df_raw["prev_lag1"]
-    else: df["prev_lag1"] = np.nan
-    if "prev_roll3" in df_raw.columns: df["prev_roll3"] = df_raw["prev_roll3"]
-    else: df["prev_roll3"] = np.nan
-
-    return df
-
-
-def prepare_features(df_in: pd.DataFrame, features: List[str], scaler: Optional[StandardScaler]) -> np.ndarray:
+    return (plan or _DEFAULT_PLAN).apply(df_raw)
+
+
+def prepare_features(df_in: pd.DataFrame, features: List[str], scaler: Optional["StandardScaler"]) -> np.ndarray:
     df = df_in.copy()
 
     # Ensure every expected column exists
@@ -131,3 +251,55 @@ def prepare_features(df_in: pd.DataFrame, features: List[str], scaler: Optional[
     if scaler is not None:
         X = scaler.transform(X)
     return X
+
+
+class FoldedScaler:
+    """StandardScaler.transform reduced to float32 `(x - mean_) / scale_`."""
+    def __init__(self, mean: np.ndarray, scale: np.ndarray):
+        self.mean = np.ascontiguousarray(mean, dtype=np.float32)
+        self.scale = np.ascontiguousarray(scale, dtype=np.float32)
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """New array, like StandardScaler.transform; X is left alone (it may be read-only)."""
+        return self.transform_inplace(np.array(X, dtype=np.float32))
+
+    def transform_inplace(self, X: np.ndarray) -> np.ndarray:
+        """Scale a float32 buffer the caller owns, without allocating."""
+        np.subtract(X, self.mean, out=X)
+        np.divide(X, self.scale, out=X)
+        return X
+
+def fold_scaler(scaler):
+    """FoldedScaler for a fitted StandardScaler; any other scaler is returned unchanged."""
+    sk = sys.modules.get("sklearn.preprocessing")   # a StandardScaler instance implies it's imported
+    if sk is None or not isinstance(scaler, sk.StandardScaler):
+        return scaler
+    n = getattr(scaler, "n_features_in_", None)
+    mean = scaler.mean_ if scaler.with_mean and scaler.mean_ is not None else np.zeros(n)
+    scale = scaler.scale_ if scaler.with_std and scaler.scale_ is not None else np.ones(n)
+    return FoldedScaler(mean, scale)
+
+def prepare_records(
+    records: List[Dict[str, Any]], plan: ProjectionPlan, scaler=None, timings: Optional[Dict[str, float]] = None,
+) -> np.ndarray:
+    """
+    DataFrame-free equivalent of project_to_canonical + prepare_features for request records.
+
+    Returns a contiguous float32 matrix in `plan.features` order; missing values are
+    filled with 0.0 before scaling, as in prepare_features. Pass the bundle's
+    `fast_scaler` so the scaler runs in place on that matrix (it's ours). If `timings` is given,
+    seconds spent in "project", "prepare" and "scale" are added to it.
+    """
+    t0 = time.perf_counter()
+    X = plan.gather_records(records)
+    t1 = time.perf_counter()
+    np.copyto(X, 0.0, where=np.isnan(X))
+    t2 = time.perf_counter()
+    if scaler is not None:
+        X = scaler.transform_inplace(X) if isinstance(scaler, FoldedScaler) else scaler.transform(X)
+    if timings is not None:
+        t3 = time.perf_counter()
+        timings["project"] = timings.get("project", 0.0) + (t1 - t0)
+        timings["prepare"] = timings.get("prepare", 0.0) + (t2 - t1)
+        timings["scale"] = timings.get("scale", 0.0) + (t3 - t2)
+    return X
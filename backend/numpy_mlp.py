@@ -0,0 +1,222 @@
+# backend/numpy_mlp.py
+"""
+Pure-NumPy inference for the dense malaria MLP.
+
+The pickled Keras model (docs/malaria_mlp_model.pkl) is a plain stack of
+Dense -> BatchNormalization -> Dropout blocks. At inference time Dropout is the
+identity and BatchNormalization is a fixed affine map, so the whole network
+collapses to a few matmuls. This module pulls the weights out once (straight
+from the `.keras` archive embedded in the pickle, no TensorFlow needed),
+folds every BatchNormalization into the following Dense layer and stores the
+result as a small `.npz`.
+
+CLI:
+    python -m backend.numpy_mlp export --model docs/malaria_mlp_model.pkl --out backend/models/malaria_mlp.npz
+    python -m backend.numpy_mlp parity --model docs/malaria_mlp_model.pkl --npz backend/models/malaria_mlp.npz
+"""
+import io, os, json, pickletools, re, zipfile, argparse
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+LEAKY_RELU_SLOPE = 0.2      # Keras 3 default negative_slope for "leaky_relu"
+PARITY_ATOL = 1e-4          # max abs diff tolerated against the Keras outputs
+
+def _relu(x): return np.maximum(x, 0, out=x)
+def _leaky_relu(x): return np.where(x > 0, x, x * LEAKY_RELU_SLOPE)
+def _sigmoid(x): return 1.0 / (1.0 + np.exp(-x))
+def _linear(x): return x
+
+ACTIVATIONS = {
+    "linear": _linear,
+    "relu": _relu,
+    "leaky_relu": _leaky_relu,
+    "sigmoid": _sigmoid,
+    "tanh": np.tanh,
+}
+
+class NumpyMLP:
+    """Dense layers only: y = act_k(... act_1(x @ W_1 + b_1) ... @ W_k + b_k)."""
+    def __init__(self, weights: List[np.ndarray], biases: List[np.ndarray], activations: List[str]):
+        if not (len(weights) == len(biases) == len(activations)):
+            raise ValueError("weights, biases and activations must have the same length")
+        for act in activations:
+            if act not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation '{act}'")
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.ascontiguousarray(b, dtype=np.float32) for b in biases]
+        self.activations = list(activations)
+        self._fns = [ACTIVATIONS[a] for a in self.activations]
+
+    @property
+    def n_features(self) -> int:
+        return self.weights[0].shape[0]
+
+    def predict(self, X, verbose: int = 0, batch_size: Optional[int] = None) -> np.ndarray:
+        """Drop-in for keras `Model.predict`; extra arguments are accepted and ignored."""
+        h = np.asarray(X, dtype=np.float32)
+        if h.ndim == 1:
+            h = h.reshape(1, -1)
+        for W, b, fn in zip(self.weights, self.biases, self._fns):
+            h = h @ W
+            h += b
+            h = fn(h)
+        return h
+
+    def save_npz(self, path: str) -> None:
+        arrays = {}
+        for i, (W, b) in enumerate(zip(self.weights, self.biases)):
+            arrays[f"W{i}"] = W
+            arrays[f"b{i}"] = b
+        arrays["activations"] = np.array(self.activations)
+        np.savez_compressed(path, **arrays)
+
+    def save_npy_dir(self, path: str) -> None:
+        """One uncompressed .npy per array so workers can np.load(..., mmap_mode="r") them."""
+        os.makedirs(path, exist_ok=True)
+        for i, (W, b) in enumerate(zip(self.weights, self.biases)):
+            np.save(os.path.join(path, f"W{i}.npy"), W)
+            np.save(os.path.join(path, f"b{i}.npy"), b)
+        with open(os.path.join(path, "layers.json"), "w", encoding="utf-8") as f:
+            json.dump({"activations": self.activations}, f)
+
+    @classmethod
+    def from_npy_dir(cls, path: str, mmap: bool = True) -> "NumpyMLP":
+        """Read-only memory maps: every process mapping the same files shares their pages."""
+        with open(os.path.join(path, "layers.json"), "r", encoding="utf-8") as f:
+            acts = json.load(f)["activations"]
+        mode = "r" if mmap else None
+        weights = [np.load(os.path.join(path, f"W{i}.npy"), mmap_mode=mode) for i in range(len(acts))]
+        biases = [np.load(os.path.join(path, f"b{i}.npy"), mmap_mode=mode) for i in range(len(acts))]
+        return cls(weights, biases, acts)
+
+    @classmethod
+    def from_npz(cls, path: str) -> "NumpyMLP":
+        with np.load(path, allow_pickle=False) as z:
+            acts = [str(a) for a in z["activations"]]
+            weights = [z[f"W{i}"] for i in range(len(acts))]
+            biases = [z[f"b{i}"] for i in range(len(acts))]
+        return cls(weights, biases, acts)
+
+
+# ---------- extraction ----------
+def _snake(name: str) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+def _fold_layers(layers: List[Tuple[str, dict, List[np.ndarray]]]) -> NumpyMLP:
+    """
+    layers: (class_name, config, [weights...]) in forward order.
+    BatchNormalization (gamma, beta, moving_mean, moving_var) is folded into the next Dense.
+    """
+    weights, biases, acts = [], [], []
+    pending_scale, pending_shift = None, None
+    for cls_name, cfg, w in layers:
+        if cls_name in ("InputLayer", "Dropout"):
+            continue
+        if cls_name == "Dense":
+            W = np.asarray(w[0], dtype=np.float64)
+            b = np.asarray(w[1], dtype=np.float64) if cfg.get("use_bias", True) else np.zeros(W.shape[1])
+            if pending_scale is not None:
+                # (a*s + t) @ W + b == a @ (s[:,None]*W) + (t @ W + b)
+                b = pending_shift @ W + b
+                W = pending_scale[:, None] * W
+                pending_scale, pending_shift = None, None
+            act = cfg.get("activation", "linear")
+            if isinstance(act, dict):
+                act = act.get("config", {}).get("name", act.get("class_name", "linear"))
+            weights.append(W); biases.append(b); acts.append(act)
+        elif cls_name == "BatchNormalization":
+            gamma, beta, mean, var = [np.asarray(a, dtype=np.float64) for a in w]
+            if not cfg.get("scale", True): gamma = np.ones_like(mean)
+            if not cfg.get("center", True): beta = np.zeros_like(mean)
+            s = gamma / np.sqrt(var + cfg.get("epsilon", 1e-3))
+            t = beta - mean * s
+            if pending_scale is not None:       # two BNs in a row compose
+                s, t = pending_scale * s, pending_shift * s + t
+            pending_scale, pending_shift = s, t
+        else:
+            raise ValueError(f"Unsupported layer type '{cls_name}' for NumPy inference")
+    if pending_scale is not None:
+        raise ValueError("Trailing BatchNormalization without a following Dense layer")
+    return NumpyMLP(weights, biases, acts)
+
+def extract_keras_archive(pickle_path: str) -> bytes:
+    """Return the `.keras` zip bytes embedded in a pickled Keras 3 model, without unpickling it."""
+    with open(pickle_path, "rb") as f:
+        data = f.read()
+    for opcode, arg, _pos in pickletools.genops(data):
+        if isinstance(arg, (bytes, bytearray)) and arg[:4] == b"PK\x03\x04":
+            return bytes(arg)
+    raise ValueError(f"No embedded .keras archive found in {pickle_path}")
+
+def from_keras_archive(archive: bytes) -> NumpyMLP:
+    """Read config.json + model.weights.h5 from a `.keras` zip."""
+    import h5py
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        config = json.loads(zf.read("config.json"))
+        h5_bytes = zf.read("model.weights.h5")
+
+    layer_cfgs = config["config"]["layers"]
+    counters = {}
+    layers = []
+    with h5py.File(io.BytesIO(h5_bytes), "r") as h5:
+        for lc in layer_cfgs:
+            # weights are stored under generic per-class names: dense, dense_1, ...
+            base = _snake(lc["class_name"])
+            n = counters.get(base, 0)
+            counters[base] = n + 1
+            key = f"layers/{base}" if n == 0 else f"layers/{base}_{n}"
+            w = []
+            if key in h5 and "vars" in h5[key]:
+                vars_grp = h5[key]["vars"]
+                w = [vars_grp[str(i)][()] for i in range(len(vars_grp))]
+            layers.append((lc["class_name"], lc["config"], w))
+    return _fold_layers(layers)
+
+def from_keras_model(model) -> NumpyMLP:
+    """Build from a live keras model (needs TensorFlow/Keras installed)."""
+    layers = [(type(l).__name__, l.get_config(), l.get_weights()) for l in model.layers]
+    return _fold_layers(layers)
+
+def from_pickle(pickle_path: str) -> NumpyMLP:
+    return from_keras_archive(extract_keras_archive(pickle_path))
+
+def parity_check(keras_model, mlp: NumpyMLP, X: np.ndarray, atol: float = PARITY_ATOL) -> float:
+    """Max abs difference between Keras and NumPy outputs; raises if above `atol`."""
+    ref = np.asarray(keras_model.predict(X, verbose=0)).reshape(len(X), -1)
+    got = mlp.predict(X).reshape(len(X), -1)
+    diff = float(np.max(np.abs(ref - got))) if len(X) else 0.0
+    if diff > atol:
+        raise AssertionError(f"NumPy/Keras parity failed: max abs diff {diff:.3g} > {atol:.3g}")
+    return diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export / verify the NumPy MLP engine.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_exp = sub.add_parser("export", help="Extract weights from the pickled model into an .npz")
+    p_exp.add_argument("--model", default="docs/malaria_mlp_model.pkl")
+    p_exp.add_argument("--out", default="backend/models/malaria_mlp.npz")
+    p_par = sub.add_parser("parity", help="Compare NumPy outputs against Keras (needs TensorFlow)")
+    p_par.add_argument("--model", default="docs/malaria_mlp_model.pkl")
+    p_par.add_argument("--npz", default="backend/models/malaria_mlp.npz")
+    p_par.add_argument("--rows", type=int, default=2048)
+    p_par.add_argument("--atol", type=float, default=PARITY_ATOL)
+    args = parser.parse_args()
+
+    if args.cmd == "export":
+        mlp = from_pickle(args.model)
+        mlp.save_npz(args.out)
+        shapes = " -> ".join(str(W.shape[1]) for W in mlp.weights)
+        print(f"[OK] wrote {args.out} ({mlp.n_features} -> {shapes}, activations={mlp.activations})")
+    else:
+        import pickle
+        with open(args.model, "rb") as f:
+            keras_model = pickle.load(f)
+        mlp = NumpyMLP.from_npz(args.npz)
+        X = np.random.default_rng(0).normal(size=(args.rows, mlp.n_features)).astype(np.float32)
+        diff = parity_check(keras_model, mlp, X, atol=args.atol)
+        print(f"[OK] parity within {args.atol:g} (max abs diff {diff:.3g} over {args.rows} rows)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# backend/profiling.py
+"""
+Opt-in sampling profiler for slow requests.
+
+While enabled, code wrapped in `sampled(name)` registers its thread with one
+background sampler that reads that thread's stack every PROFILE_INTERVAL_MS
+(sys._current_frames, no tracing hooks). When the block took at least
+PROFILE_SLOW_MS, its samples are written to PROFILE_DIR as collapsed stacks
+(`frame;frame;frame count` per line), the input format of flamegraph.pl and
+speedscope. Fast blocks are thrown away, so the cost when nothing is slow is the
+sampler thread alone.
+
+Toggle with PROFILE_SLOW_REQUESTS=1 or at runtime via POST /api/v1/metrics/profiling.
+"""
+import os, sys, time, threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+ENABLED = os.getenv("PROFILE_SLOW_REQUESTS", "0") == "1"
+SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "250"))
+INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "reports/profiles")
+
+_lock = threading.Lock()
+_active: Dict[int, Counter] = {}        # thread id -> folded stack counts
+_sampler: Optional[threading.Thread] = None
+_dumped = 0
+
+def _fold(frame) -> str:
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+def _sample_loop():
+    while True:
+        time.sleep(INTERVAL_MS / 1000.0)
+        with _lock:
+            if not _active:
+                continue
+            frames = sys._current_frames()
+            for tid, counts in _active.items():
+                frame = frames.get(tid)
+                if frame is not None:
+                    counts[_fold(frame)] += 1
+
+def _ensure_sampler():
+    global _sampler
+    if _sampler is None:
+        _sampler = threading.Thread(target=_sample_loop, name="slow-request-sampler", daemon=True)
+        _sampler.start()
+
+def configure(enabled: Optional[bool] = None, slow_ms: Optional[float] = None):
+    global ENABLED, SLOW_MS
+    if enabled is not None:
+        ENABLED = bool(enabled)
+    if slow_ms is not None:
+        SLOW_MS = float(slow_ms)
+    return status()
+
+def status():
+    return {"enabled": ENABLED, "slow_ms": SLOW_MS, "interval_ms": INTERVAL_MS, "dir": PROFILE_DIR, "dumped": _dumped}
+
+def _dump(name: str, counts: Counter, elapsed_ms: float) -> Optional[str]:
+    global _dumped
+    if not counts:
+        return None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{int(elapsed_ms)}ms-{threading.get_ident()}.folded")
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, n in counts.most_common():
+            f.write(f"{stack} {n}\n")
+    _dumped += 1
+    return path
+
+@contextmanager
+def sampled(name: str):
+    """Profile the current thread for the duration of the block if profiling is on."""
+    if not ENABLED:
+        yield
+        return
+    _ensure_sampler()
+    tid = threading.get_ident()
+    counts: Counter = Counter()
+    with _lock:
+        _active[tid] = counts
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - t0) * 1000.0
+        with _lock:
+            _active.pop(tid, None)
+        if elapsed_ms >= SLOW_MS:
+            try:
+                _dump(name, counts, elapsed_ms)
+            except OSError:
+                pass    # never fail a request over a profile dump
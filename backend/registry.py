@@ -0,0 +1,285 @@
+# backend/registry.py
+"""
+Named, hot-reloadable model bundles.
+
+Every served model is a `LoadedModel`: a ModelBundle plus its own micro-batcher and
+prediction cache. The registry maps names to LoadedModels; the name given by
+MODEL_NAME (default "default") is built from MODEL_PATH / MODEL_META_PATH / ...,
+extra names come from MODEL_VARIANTS, a JSON object such as
+
+    {"candidate": {"model_path": "docs/malaria_mlp_v2.pkl", "meta_path": "backend/models/model_meta_v2.json"}}
+
+A watcher thread polls the source files of every model. When one changes, the
+bundle is loaded and warmed with a dummy batch in the background and then swapped
+in with a single dict assignment. Requests that already picked up the old
+LoadedModel finish on it; a failed load or warm-up keeps the old one serving.
+
+Registering a model doesn't load it: that happens on the first `get()` (or in
+the background, see MODEL_PRELOAD in backend/routers/predict.py).
+"""
+import os, json, time, hashlib, logging, threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.model_loader import ModelBundle, load_bundle, prepare_records, MODEL_ENGINE
+from backend.batching import MicroBatcher, BATCHING_ENABLED
+from backend.cache import PredictionCache, cached_predict, CACHE_ENABLED
+from backend.metrics import histogram
+from backend import startup
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MODEL_NAME = os.getenv("MODEL_NAME", "default")
+RELOAD_POLL_S = float(os.getenv("MODEL_RELOAD_POLL_S", "5"))     # 0 disables the file watcher
+WARMUP_ROWS = int(os.getenv("MODEL_WARMUP_ROWS", "8"))
+
+SHADOW_DIFF_HIST = histogram(
+    "predict_shadow_abs_diff", "Mean |primary - shadow| prediction per request",
+    (1e-6, 1e-4, 1e-3, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+@dataclass(frozen=True)
+class ModelSpec:
+    model_path: str
+    scaler_path: Optional[str] = None
+    meta_path: Optional[str] = None
+    npz_path: Optional[str] = None
+    engine: str = MODEL_ENGINE
+    mmap_dir: Optional[str] = None
+
+    def source_files(self) -> List[str]:
+        paths = [self.model_path, self.scaler_path, self.meta_path]
+        if self.engine in ("numpy", "mmap"):
+            paths.append(self.npz_path)
+        return [p for p in paths if p]
+
+    def fingerprint(self) -> Tuple:
+        """(path, mtime, size) of every source file; a change means the model must be reloaded."""
+        out = []
+        for p in self.source_files():
+            try:
+                st = os.stat(p)
+                out.append((p, st.st_mtime_ns, st.st_size))
+            except OSError:
+                out.append((p, None, None))
+        return tuple(out)
+
+def _revision(fingerprint: Tuple) -> str:
+    return hashlib.sha1(repr(fingerprint).encode()).hexdigest()[:8]
+
+class LoadedModel:
+    """A bundle ready to serve: its own batcher and cache, so named versions never share either."""
+    def __init__(self, name: str, spec: ModelSpec, bundle: ModelBundle, fingerprint: Tuple):
+        self.name = name
+        self.spec = spec
+        self.bundle = bundle
+        self.fingerprint = fingerprint
+        self.loaded_at = time.time()
+        self.load_s: Optional[float] = None
+        self.warmup_s: Optional[float] = None
+        self.batcher = MicroBatcher(self.forward, name=f"predict-batcher-{name}") if BATCHING_ENABLED else None
+        self.cache = PredictionCache() if CACHE_ENABLED else None
+
+    @property
+    def version(self) -> str:
+        return self.bundle.version
+
+    def forward(self, X: np.ndarray) -> np.ndarray:
+        return self.bundle.model.predict(X, verbose=0)
+
+    def batched_forward(self, X: np.ndarray) -> np.ndarray:
+        if self.batcher is not None:
+            try:
+                return self.batcher.predict(X)
+            except RuntimeError:
+                pass    # swapped out and closed while this request was in flight
+        return self.forward(X)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Cache, then micro-batcher, then model."""
+        if self.cache is None:
+            return self.batched_forward(X)
+        return cached_predict(self.cache, X, self.version, self.batched_forward)
+
+    def warm_up(self, rows: int = WARMUP_ROWS) -> None:
+        n = len(self.bundle.features)
+        if self.bundle.model is None or not n or rows <= 0:
+            return
+        y = np.asarray(self.forward(np.zeros((rows, n), dtype=np.float32)))
+        if len(y) != rows:
+            raise ValueError(f"warm-up returned {len(y)} outputs for {rows} rows")
+
+    def close(self) -> None:
+        if self.batcher is not None:
+            self.batcher.close()
+
+    def describe(self):
+        return {
+            "name": self.name,
+            "model_version": self.version,
+            "loaded": True,
+            "loaded_at": self.loaded_at,
+            "load_s": self.load_s,
+            "warmup_s": self.warmup_s,
+            "n_features": len(self.bundle.features),
+            "uses_scaler": self.bundle.scaler is not None,
+            "spec": asdict(self.spec),
+        }
+
+class ModelRegistry:
+    def __init__(self, default_name: str = DEFAULT_MODEL_NAME, poll_s: float = RELOAD_POLL_S):
+        self.default_name = default_name
+        self.poll_s = poll_s
+        self._specs: Dict[str, ModelSpec] = {}
+        self._models: Dict[str, LoadedModel] = {}
+        self._lock = threading.Lock()           # serializes loads, never held by readers
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._shadow_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="predict-shadow")
+
+    # ---------- loading ----------
+    def register(self, name: str, spec: ModelSpec, load: bool = False) -> Optional[LoadedModel]:
+        self._specs[name] = spec
+        return self.reload(name) if load else None
+
+    def reload(self, name: str, force: bool = True) -> Optional[LoadedModel]:
+        """Load, warm and swap in `name`. Returns the new LoadedModel, or None if nothing changed."""
+        spec = self._specs[name]
+        with self._lock:
+            fp = spec.fingerprint()
+            current = self._models.get(name)
+            if current is not None and not force and current.fingerprint == fp:
+                return None
+            t0 = time.perf_counter()
+            bundle = load_bundle(spec.model_path, spec.scaler_path, spec.meta_path,
+                                 engine=spec.engine, npz_path=spec.npz_path, mmap_dir=spec.mmap_dir)
+            # same file path != same weights; the revision keeps cache keys and clients honest
+            bundle.version = f"{bundle.version}@{_revision(fp)}"
+            new = LoadedModel(name, spec, bundle, fp)
+            t1 = time.perf_counter()
+            try:
+                new.warm_up()
+            except Exception:
+                new.close()
+                raise
+            new.load_s, new.warmup_s = t1 - t0, time.perf_counter() - t1
+            if current is None:
+                startup.record(f"load:{name}", new.load_s)
+                startup.record(f"warmup:{name}", new.warmup_s)
+            self._models[name] = new            # atomic swap
+        if current is not None:
+            current.close()                     # queued work is still served by the old model
+        log.info("model %r now serving %s", name, new.version)
+        return new
+
+    def get(self, name: Optional[str] = None) -> LoadedModel:
+        """The current LoadedModel for `name`; loaded on first use (concurrent callers share one load)."""
+        name = name or self.default_name
+        m = self._models.get(name)
+        if m is None:
+            if name not in self._specs:
+                raise KeyError(f"unknown model '{name}' (registered: {self.names()})")
+            self.reload(name, force=False)
+            m = self._models[name]
+        return m
+
+    def is_loaded(self, name: Optional[str] = None) -> bool:
+        return (name or self.default_name) in self._models
+
+    def names(self) -> List[str]:
+        return sorted(self._specs)
+
+    def features(self, name: Optional[str] = None) -> List[str]:
+        """Feature list straight from the meta JSON, without loading the model."""
+        name = name or self.default_name
+        if name in self._models:
+            return self._models[name].bundle.features
+        spec = self._specs[name]
+        if not spec.meta_path or not os.path.exists(spec.meta_path):
+            return []
+        with open(spec.meta_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("features", [])
+
+    def load_all(self) -> None:
+        for name in self.names():
+            try:
+                self.get(name)
+            except Exception:
+                log.exception("loading model %r failed", name)
+
+    def load_in_background(self) -> threading.Thread:
+        t = threading.Thread(target=self.load_all, name="model-preload", daemon=True)
+        t.start()
+        return t
+
+    def describe(self):
+        models = []
+        for n in self.names():
+            m = self._models.get(n)
+            d = m.describe() if m is not None else {"name": n, "loaded": False, "spec": asdict(self._specs[n])}
+            models.append(dict(d, default=(n == self.default_name)))
+        return {"default": self.default_name, "watch_poll_s": self.poll_s, "models": models}
+
+    # ---------- shadow scoring ----------
+    def shadow(self, name: str, records: List[Dict[str, Any]], primary: np.ndarray,
+               fill: Optional[Callable[[List[Dict[str, Any]], List[str]], List[Dict[str, Any]]]] = None) -> None:
+        """
+        Score the request's raw records on `name` off the request path and record how
+        far it lands from `primary`. The shadow builds its own matrix (its feature
+        order, its scaler, `fill` for its history features): the primary's X only fits
+        a bundle that shares its meta and scaler.
+        """
+        def run():
+            try:
+                m = self.get(name)
+                recs = fill(records, m.bundle.features) if fill is not None else records
+                X = prepare_records(recs, m.bundle.plan, m.bundle.fast_scaler)
+                if not m.bundle.features or X.shape != (len(records), len(m.bundle.features)):
+                    raise ValueError(f"built {X.shape} for {len(m.bundle.features)} features")
+            except Exception as e:
+                log.warning("shadow %r skipped: its input doesn't fit the records (%s)", name, e)
+                return
+            try:
+                y = np.asarray(m.forward(X), dtype=np.float64).reshape(len(X), -1)
+                SHADOW_DIFF_HIST.observe(float(np.mean(np.abs(y - np.asarray(primary).reshape(len(X), -1)))))
+            except Exception:
+                log.exception("shadow scoring on %r failed", name)
+        self._shadow_pool.submit(run)
+
+    # ---------- watching ----------
+    def start_watching(self) -> None:
+        if self.poll_s <= 0 or self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        for m in list(self._models.values()):
+            m.close()
+        self._shadow_pool.shutdown(wait=False)
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_s):
+            for name in list(self._models):     # never-used models stay unloaded
+                try:
+                    self.reload(name, force=False)
+                except Exception:
+                    log.exception("reloading model %r failed; still serving the previous version", name)
+
+def specs_from_env() -> Dict[str, ModelSpec]:
+    """MODEL_* env vars for the default model plus any extra names from MODEL_VARIANTS."""
+    specs = {
+        DEFAULT_MODEL_NAME: ModelSpec(
+            model_path=os.getenv("MODEL_PATH", "docs/malaria_mlp_model.pkl"),
+            scaler_path=os.getenv("SCALER_PATH", "backend/models/scaler_site_year.joblib"),   # optional
+            meta_path=os.getenv("MODEL_META_PATH", "backend/models/model_meta.json"),        # optional
+            npz_path=os.getenv("MODEL_NPZ_PATH", "backend/models/malaria_mlp.npz"),          # MODEL_ENGINE=numpy/mmap only
+        )
+    }
+    for name, cfg in json.loads(os.getenv("MODEL_VARIANTS", "{}")).items():
+        specs[name] = ModelSpec(**cfg)
+    return specs
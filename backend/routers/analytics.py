@@ -0,0 +1,54 @@
+# backend/routers/analytics.py
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+
+from backend.analytics import QueryService, UnknownQuery, MissingTable
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+# One DuckDB connection per process; views over DATA_ROOT/processed (see backend/analytics.py)
+SERVICE = QueryService()
+
+MONTH = r"^\d{4}-\d{2}(-\d{2})?$"
+
+def _run(name: str, **params):
+    try:
+        return SERVICE.run(name, **params)
+    except UnknownQuery:
+        raise HTTPException(status_code=404, detail=f"unknown query '{name}'")
+    except MissingTable as e:
+        raise HTTPException(status_code=404, detail=f"data not available: {e.args[0]} has no files under {SERVICE.data_root}/processed")
+    except ImportError as e:
+        raise HTTPException(status_code=503, detail=f"analytics unavailable: {e}")
+
+@router.get("/tables")
+def tables():
+    """Registered views with their source files and columns."""
+    try:
+        return {"views": SERVICE.describe()}
+    except ImportError as e:
+        raise HTTPException(status_code=503, detail=f"analytics unavailable: {e}")
+
+@router.get("/visits_by_state_month")
+def visits_by_state_month(start: Optional[str] = Query(None, pattern=MONTH), end: Optional[str] = Query(None, pattern=MONTH),
+                          state: Optional[str] = None):
+    return _run("visits_by_state_month", start=start, end=end, state=state)
+
+@router.get("/stockout_risk")
+def stockout_risk(start: Optional[str] = Query(None, pattern=MONTH), end: Optional[str] = Query(None, pattern=MONTH),
+                  item: Optional[str] = None):
+    return _run("stockout_risk", start=start, end=end, item=item)
+
+@router.get("/prevalence_trend")
+def prevalence_trend(state: Optional[str] = None):
+    return _run("prevalence_trend", state=state)
+
+@router.get("/stats")
+def stats():
+    return SERVICE.stats()
+
+@router.post("/refresh")
+def refresh():
+    """Re-scan the silver/gold files now instead of waiting for ANALYTICS_REFRESH_S."""
+    changed = SERVICE.refresh(force=True)
+    return {"refreshed": changed, "views": sorted(SERVICE.views())}
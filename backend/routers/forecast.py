@@ -0,0 +1,99 @@
+# backend/routers/forecast.py
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+import logging, os, threading, time
+
+from backend import startup as startup_times
+from backend.forecast import FORECAST_DIR, ForecastTable
+
+router = APIRouter(prefix="/forecast", tags=["forecast"])
+log = logging.getLogger(__name__)
+
+FORECAST_REFRESH_S = float(os.getenv("FORECAST_REFRESH_S", "10"))   # how often the manifest is re-checked
+FORECAST_MAX_CLINICS = 500
+
+# Built by scripts/build_visit_forecasts.py; reopened when its manifest changes
+_table: Optional[ForecastTable] = None
+_error: Optional[str] = None
+_mtime: Optional[float] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+def _manifest_mtime() -> Optional[float]:
+    try:
+        return (FORECAST_DIR / "manifest.json").stat().st_mtime
+    except OSError:
+        return None
+
+def load() -> None:
+    global _table, _error, _mtime, _checked_at
+    t0 = time.perf_counter()
+    mtime = _manifest_mtime()
+    try:
+        table = ForecastTable.open(FORECAST_DIR)
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        with _lock:
+            _error, _mtime, _checked_at = str(e), mtime, time.monotonic()
+        log.warning("visit forecasts not loaded: %s", e)
+        return
+    with _lock:
+        _table, _error, _mtime, _checked_at = table, None, mtime, time.monotonic()
+    startup_times.record("load:forecast", time.perf_counter() - t0)
+
+def startup():
+    """Called from the app lifespan hook."""
+    load()
+
+def _get_table() -> ForecastTable:
+    global _checked_at
+    if time.monotonic() - _checked_at >= FORECAST_REFRESH_S:
+        _checked_at = time.monotonic()
+        if _manifest_mtime() != _mtime:
+            load()
+    if _table is None:
+        raise HTTPException(status_code=503, detail=f"visit forecasts not loaded: {_error or 'not loaded yet'}")
+    return _table
+
+@router.get("/visits")
+def visits(clinic_id: List[str] = Query(..., min_length=1), horizon: Optional[int] = Query(None, ge=1, le=120)):
+    """Precomputed visit forecasts (months 1..horizon after the newest data) for one or more clinics."""
+    if len(clinic_id) > FORECAST_MAX_CLINICS:
+        raise HTTPException(status_code=413, detail=f"at most {FORECAST_MAX_CLINICS} clinics per request")
+    table = _get_table()
+    found = [table.get(c, horizon) for c in clinic_id]
+    unknown = [c for c, f in zip(clinic_id, found) if f is None]
+    if len(clinic_id) == 1:
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"no forecast for clinic '{clinic_id[0]}'")
+        return found[0]
+    return {"forecasts": [f for f in found if f is not None], "unknown": unknown}
+
+class RecomputeRequest(BaseModel):
+    clinic_id: str
+    # recent total_visits by month ('YYYY-MM'), on top of what the batch used
+    history: Dict[str, Optional[float]] = Field(default_factory=dict)
+    horizon: Optional[int] = Field(None, ge=1)
+
+@router.post("/visits/recompute")
+def recompute(req: RecomputeRequest):
+    """Forecast one clinic now, e.g. with a month the batch hasn't seen. Not stored."""
+    if len(req.history) > 120:
+        raise HTTPException(status_code=413, detail="at most 120 months of history")
+    try:
+        return _get_table().recompute(req.clinic_id, req.history, req.horizon)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"unknown clinic '{req.clinic_id}' and no history given")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@router.get("/visits/stats")
+def stats():
+    if _table is None:
+        return {"loaded": False, "error": _error}
+    return {"loaded": True, **_table.stats()}
+
+@router.post("/visits/reload")
+def reload():
+    load()
+    return stats()
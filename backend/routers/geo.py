@@ -0,0 +1,67 @@
+# backend/routers/geo.py
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+from typing import List, Optional
+import os, threading
+
+from backend.spatial import ClusterIndex, load_clusters, DHS_GPS_PATH
+
+router = APIRouter(prefix="/geo", tags=["geo"])
+
+GEO_MAX_K = int(os.getenv("GEO_MAX_K", "50"))
+
+# Built on first use from DHS_GPS_PATH; rebuilt when the file changes
+_index: Optional[ClusterIndex] = None
+_index_mtime: Optional[float] = None
+_lock = threading.Lock()
+
+def _get_index() -> ClusterIndex:
+    global _index, _index_mtime
+    try:
+        mtime = os.stat(DHS_GPS_PATH).st_mtime
+    except OSError:
+        raise HTTPException(status_code=503, detail=f"DHS cluster coordinates not found at {DHS_GPS_PATH}")
+    if _index is None or mtime != _index_mtime:
+        with _lock:
+            if _index is None or mtime != _index_mtime:
+                try:
+                    _index = ClusterIndex.from_frame(load_clusters(DHS_GPS_PATH))
+                except (KeyError, ValueError) as e:
+                    raise HTTPException(status_code=503, detail=str(e))
+                _index_mtime = mtime
+    return _index
+
+def _matches(index: ClusterIndex, dist_row, pos_row):
+    return [
+        {"DHSID": index.ids[p], "lat": float(index.lat[p]), "lon": float(index.lon[p]), "distance_km": round(float(d), 3)}
+        for d, p in zip(dist_row, pos_row) if p >= 0
+    ]
+
+@router.get("/nearest_cluster")
+def nearest_cluster(lat: float = Query(..., ge=-90, le=90), lon: float = Query(..., ge=-180, le=180),
+                    k: int = Query(1, ge=1), max_km: Optional[float] = Query(None, gt=0)):
+    """The k DHS clusters closest to (lat, lon), optionally only those within max_km."""
+    index = _get_index()
+    dist, pos = index.query([lat], [lon], k=min(k, GEO_MAX_K), max_km=max_km)
+    return {"lat": lat, "lon": lon, "clusters": _matches(index, dist[0], pos[0])}
+
+class Point(BaseModel):
+    lat: float
+    lon: float
+
+class NearestRequest(BaseModel):
+    points: List[Point]
+    k: int = 1
+    max_km: Optional[float] = None
+
+@router.post("/nearest_cluster")
+def nearest_cluster_batch(req: NearestRequest):
+    """Same as the GET route for many locations in one call."""
+    index = _get_index()
+    dist, pos = index.query([p.lat for p in req.points], [p.lon for p in req.points],
+                            k=min(max(1, req.k), GEO_MAX_K), max_km=req.max_km)
+    return {"results": [_matches(index, d, p) for d, p in zip(dist, pos)]}
+
+@router.get("/stats")
+def stats():
+    return {"source": DHS_GPS_PATH, "loaded": _index is not None, "clusters": len(_index) if _index is not None else 0}
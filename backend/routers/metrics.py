@@ -0,0 +1,21 @@
+# backend/routers/metrics.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+
+from backend import metrics, profiling
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@router.get("/metrics/profiling")
+def profiling_status():
+    return profiling.status()
+
+@router.post("/metrics/profiling")
+def profiling_toggle(enabled: Optional[bool] = None, slow_ms: Optional[float] = None):
+    """Turn the slow-request sampling profiler on/off; folded stacks land in PROFILE_DIR."""
+    return profiling.configure(enabled=enabled, slow_ms=slow_ms)
@@ -1,20 +1,102 @@
 # backend/routers/predict.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Request, Response
 from pydantic import BaseModel
-from typing import List, Dict, Any
-import os, pandas as pd, numpy as np
+from typing import List, Dict, Any, Optional
+import os, time, numpy as np
 
 from . import settings
-from backend.model_loader import load_bundle, prepare_features
+from backend.model_loader import prepare_features, prepare_records, project_to_canonical
+from backend import columnar, streaming
+from backend.registry import ModelRegistry, LoadedModel, specs_from_env
+from backend.executor import InferenceExecutor, Overloaded
+from backend import metrics, profiling
+from backend.feature_store import FeatureStores
 
 router = APIRouter(prefix="/api/v1", tags=["predict"])
 
-# Load on import (process start)
-MODEL_PATH = os.getenv("MODEL_PATH", "docs/malaria_mlp_model.pkl")
-SCALER_PATH = os.getenv("SCALER_PATH", "backend/models/scaler_site_year.joblib")   # optional
-META_PATH   = os.getenv("MODEL_META_PATH", "backend/models/model_meta.json")       # optional
+# Models are registered here but loaded on first use, or earlier depending on
+# MODEL_PRELOAD (see startup() below); the registry then watches the files and
+# hot-swaps new versions (see backend/registry.py). Pick a named model per request
+# with ?model=<name> or the X-Model header, and mirror traffic with ?shadow=<name>.
+REGISTRY = ModelRegistry()
+for _name, _spec in specs_from_env().items():
+    REGISTRY.register(_name, _spec)
+SHADOW_MODEL = os.getenv("MODEL_SHADOW") or None   # shadow every request on this model by default
+# Predict work runs here, not on FastAPI's shared threadpool (see backend/executor.py)
+INFERENCE = InferenceExecutor()
+# "background": load + warm while already serving, "blocking": before serving, "lazy": on first predict
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "background")
+# prev_lag1 / prev_roll3 a record leaves out are looked up by its entity key (see backend/feature_store.py)
+FEATURES = FeatureStores()
 
-BUNDLE = load_bundle(MODEL_PATH, SCALER_PATH, META_PATH)
+def _collect_samples():
+    st = INFERENCE.stats()
+    yield ("inference_inflight_requests", "gauge", "Predict calls running or queued on the inference pool", {}, st["inflight"])
+    yield ("inference_completed_total", "counter", "Predict calls finished on the inference pool", {}, st["completed"])
+    yield ("inference_shed_total", "counter", "Predict calls refused with 503 (pool full)", {}, st["shed"])
+    for name in REGISTRY.names():
+        if not REGISTRY.is_loaded(name) or REGISTRY.get(name).cache is None:
+            continue
+        cs = REGISTRY.get(name).cache.stats()
+        yield ("predict_cache_hits_total", "counter", "Prediction cache hits (rows)", {"model": name}, cs["hits"])
+        yield ("predict_cache_misses_total", "counter", "Prediction cache misses (rows)", {"model": name}, cs["misses"])
+        yield ("predict_cache_rows", "gauge", "Rows held in the prediction cache", {"model": name}, cs["rows"])
+
+metrics.register_collector(_collect_samples)
+
+def startup():
+    """Called from the app lifespan hook."""
+    FEATURES.refresh(force=True)
+    if MODEL_PRELOAD == "blocking":
+        REGISTRY.load_all()
+    elif MODEL_PRELOAD == "background":
+        REGISTRY.load_in_background()
+    REGISTRY.start_watching()
+
+def shutdown():
+    REGISTRY.stop()
+    INFERENCE.shutdown()
+
+def _resolve(model: Optional[str] = None, x_model: Optional[str] = None) -> LoadedModel:
+    try:
+        return REGISTRY.get(model or x_model)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Model not loaded: {e}")
+
+async def _selected(request: Request) -> LoadedModel:
+    """Model picked by ?model= / X-Model; a first-use load runs on the executor, not the event loop."""
+    name = request.query_params.get("model") or request.headers.get("x-model")
+    if REGISTRY.is_loaded(name):
+        m = _resolve(name)
+    else:
+        m = await INFERENCE.run(_resolve, name, shed=False)
+    _require_model(m)
+    return m
+
+# Per-stage timings: predict_stage_ms{route=..., stage=...}; request shape histograms per route
+def _observe_stage(route: str, stage: str, seconds: float) -> None:
+    metrics.histogram("predict_stage_ms", "Time per predict stage (ms)", labels={"route": route, "stage": stage}) \
+        .observe(seconds * 1000.0)
+
+def _observe_request(route: str, request: Request, rows: Optional[int] = None) -> None:
+    t_start = getattr(request.state, "t_start", None)      # set by RequestTimingMiddleware
+    if t_start is not None:
+        _observe_stage(route, "parse", time.perf_counter() - t_start)
+    size = request.headers.get("content-length")
+    if size and size.isdigit():
+        metrics.histogram("predict_request_bytes", "Request body size (bytes)", metrics.PAYLOAD_BYTES_BUCKETS,
+                          labels={"route": route}).observe(int(size))
+    if rows is not None:
+        _observe_rows(route, rows)
+
+def _observe_rows(route: str, rows: int) -> None:
+    metrics.histogram("predict_request_rows", "Rows per request", metrics.BATCH_SIZE_BUCKETS,
+                      labels={"route": route}).observe(rows)
+
+def _overloaded(e: Overloaded) -> HTTPException:
+    return HTTPException(status_code=503, detail=f"Overloaded: {e}", headers={"Retry-After": "1"})
 
 class PredictRequest(BaseModel):
     records: List[Dict[str, Any]]
@@ -26,30 +108,131 @@ class PredictResponse(BaseModel):
     used_scaler: bool
 
 @router.get("/model_meta")
-def model_meta():
+def model_meta(model: Optional[str] = None, x_model: Optional[str] = Header(None)):
+    # Answered from the meta JSON until the model has been loaded; never triggers a load
+    name = model or x_model or REGISTRY.default_name
+    if name not in REGISTRY.names():
+        raise HTTPException(status_code=404, detail=f"unknown model '{name}'")
+    if not REGISTRY.is_loaded(name):
+        return {"model_version": None, "features": REGISTRY.features(name) or None, "uses_scaler": None, "loaded": False}
+    m = REGISTRY.get(name)
     return {
-        "model_version": BUNDLE.version,
-        "features": BUNDLE.features or None,
-        "uses_scaler": BUNDLE.scaler is not None
+        "model_version": m.version,
+        "features": m.bundle.features or None,
+        "uses_scaler": m.bundle.scaler is not None,
+        "loaded": True,
     }
 
-@router.post("/predict", response_model=PredictResponse)
-def predict(payload: PredictRequest):
-    if BUNDLE.model is None:
+@router.get("/models")
+def list_models():
+    return REGISTRY.describe()
+
+@router.post("/models/{name}/reload")
+def reload_model(name: str):
+    if name not in REGISTRY.names():
+        raise HTTPException(status_code=404, detail=f"unknown model '{name}'")
+    try:
+        m = REGISTRY.reload(name)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed, previous version still serving: {e}")
+    return m.describe()
+
+@router.get("/batching/stats")
+def batching_stats(model: Optional[str] = None, x_model: Optional[str] = Header(None)):
+    m = _resolve(model, x_model)
+    return {
+        "enabled": m.batcher is not None,
+        "config": m.batcher.stats() if m.batcher is not None else None,
+        "histograms": metrics.snapshot(["predict_batch_size_rows", "predict_batch_queue_wait_ms"]),
+    }
+
+@router.get("/cache/stats")
+def cache_stats(model: Optional[str] = None, x_model: Optional[str] = Header(None)):
+    m = _resolve(model, x_model)
+    return {"enabled": m.cache is not None, **(m.cache.stats() if m.cache is not None else {})}
+
+@router.get("/inference/stats")
+def inference_stats():
+    return {**INFERENCE.stats(), "histograms": metrics.snapshot(["inference_inflight"])}
+
+@router.get("/features/stats")
+def features_stats():
+    return FEATURES.stats()
+
+@router.get("/features/{store}/{entity}")
+def features_lookup(store: str, entity: str, period: Optional[str] = None):
+    """History features stored for one entity, as /predict would fill them for `period` (default: next period)."""
+    FEATURES.refresh()
+    st = FEATURES.stores.get(store)
+    if st is None:
+        raise HTTPException(status_code=404, detail=f"unknown feature store '{store}'")
+    vals = st.lookup(entity, period)
+    if vals is None:
+        raise HTTPException(status_code=404, detail=f"no history for {st.entity_field}={entity!r} before {period or 'now'}")
+    return {"store": store, st.entity_field: entity, st.period_field: period, "features": vals}
+
+@router.get("/stream/stats")
+def stream_stats():
+    return {
+        "config": {"chunk_rows": streaming.STREAM_CHUNK_ROWS, "max_line_bytes": streaming.STREAM_MAX_LINE_BYTES},
+        "histograms": metrics.snapshot(["predict_stream_rows_per_sec", "predict_stream_rows"]),
+    }
+
+def _require_model(m: LoadedModel):
+    if m.bundle.model is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
 
-    if not BUNDLE.features:
+    if not m.bundle.features:
         raise HTTPException(
             status_code=500,
             detail="Model features are undefined. Ensure MODEL_META_PATH points to a JSON with a 'features' list."
         )
 
-    df_raw = pd.DataFrame(payload.records)
-    df_canon = project_to_canonical(df_raw)
+@router.post("/predict", response_model=PredictResponse)
+async def predict(
+    request: Request,
+    payload: PredictRequest,
+    model: Optional[str] = None,
+    shadow: Optional[str] = None,
+    x_model: Optional[str] = Header(None),
+):
+    # Body parsing/validation happened on the event loop; the rest goes to the inference pool
+    _observe_request("predict", request, len(payload.records))
+    try:
+        resp = await INFERENCE.run(_predict_records, payload.records, model or x_model, shadow)
+    except Overloaded as e:
+        raise _overloaded(e)
+    t0 = time.perf_counter()
+    body = resp.model_dump_json()
+    _observe_stage("predict", "serialize", time.perf_counter() - t0)
+    return Response(body, media_type="application/json")
+
+def _predict_records(records: List[Dict[str, Any]], model: Optional[str], shadow: Optional[str]) -> PredictResponse:
+    # Hold on to this LoadedModel for the whole request; a hot swap won't affect it
+    m = _resolve(model)
+    bundle = m.bundle
+    _require_model(m)
+    shadow = shadow or SHADOW_MODEL
+    if shadow and shadow not in REGISTRY.names():
+        raise HTTPException(status_code=404, detail=f"unknown shadow model '{shadow}'")
+
+    timings: Dict[str, float] = {}
     try:
-        X = prepare_features(df_canon, BUNDLE.features, BUNDLE.scaler)
-        yhat = BUNDLE.model.predict(X, verbose=0)
+        with profiling.sampled("predict"):
+            t0 = time.perf_counter()
+            raw = records
+            records = FEATURES.fill_records(records, bundle.features)
+            timings["features"] = time.perf_counter() - t0
+            # Records -> float32 matrix in one pass; project_to_canonical + prepare_features is the reference path
+            X = prepare_records(records, bundle.plan, bundle.fast_scaler, timings)
+            t0 = time.perf_counter()
+            yhat = m.predict(X)
+            timings["forward"] = time.perf_counter() - t0
+        if shadow and shadow != m.name and len(X):
+            REGISTRY.shadow(shadow, raw, yhat, FEATURES.fill_records)
         yhat = np.asarray(yhat).reshape(-1).astype(float).tolist()
+        for stage, secs in timings.items():
+            _observe_stage("predict", stage, secs)
     except Exception as e:
         # Return the actual error so you see it in the client while testing
         raise HTTPException(status_code=400, detail=f"Inference error: {e}")
@@ -61,7 +244,93 @@ def predict(payload: PredictRequest):
         preds=yhat,
         labels=labels,
         threshold=THRESHOLD,
-        model_version=BUNDLE.version,
-        n_features=len(BUNDLE.features),
-        used_scaler=BUNDLE.scaler is not None
+        model_version=m.version,
+        n_features=len(bundle.features),
+        used_scaler=bundle.scaler is not None
+    )
+
+
+def _score_bulk(m: LoadedModel, body: bytes, content_type: str, accept: str) -> Response:
+    with profiling.sampled("bulk"):
+        return _score_bulk_timed(m, body, content_type, accept)
+
+def _score_bulk_timed(m: LoadedModel, body: bytes, content_type: str, accept: str) -> Response:
+    t0 = time.perf_counter()
+    try:
+        df_raw = columnar.read_frame(body, content_type)
+    except columnar.UnsupportedFormat as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not decode body: {e}")
+    t1 = time.perf_counter()
+    _observe_stage("bulk", "decode", t1 - t0)
+    _observe_rows("bulk", len(df_raw))
+    try:
+        df_raw = FEATURES.fill_frame(df_raw, m.bundle.features)
+        df_canon = project_to_canonical(df_raw, m.bundle.plan)
+        t2 = time.perf_counter()
+        X = prepare_features(df_canon, m.bundle.features, m.bundle.scaler)    # includes the scaler
+        t3 = time.perf_counter()
+        # Already one big matrix, so it skips the micro-batcher
+        yhat = m.forward(X) if len(X) else np.empty(0)
+        t4 = time.perf_counter()
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Inference error: {e}")
+    if columnar.wants_arrow(accept):
+        resp = Response(columnar.preds_to_arrow(yhat, m.version), media_type=columnar.ARROW_STREAM)
+    else:
+        resp = Response(columnar.preds_to_json(yhat, m.version), media_type="application/json")
+    for stage, secs in (("project", t2 - t1), ("prepare", t3 - t2), ("forward", t4 - t3),
+                        ("serialize", time.perf_counter() - t4)):
+        _observe_stage("bulk", stage, secs)
+    return resp
+
+@router.post("/predict/bulk")
+async def predict_bulk(request: Request):
+    """
+    Score a whole table in one request. The body is columnar (see backend/columnar.py);
+    send `Accept: application/vnd.apache.arrow.stream` to get the predictions back as Arrow.
+    """
+    m = await _selected(request)
+    body = await request.body()
+    _observe_request("bulk", request)
+    try:
+        return await INFERENCE.run(
+            _score_bulk, m, body, request.headers.get("content-type"), request.headers.get("accept"),
+        )
+    except Overloaded as e:
+        raise _overloaded(e)
+
+def _score_records(m: LoadedModel, records):
+    timings: Dict[str, float] = {}
+    try:
+        records = FEATURES.fill_records(records, m.bundle.features)
+        X = prepare_records(records, m.bundle.plan, m.bundle.fast_scaler, timings)
+        t0 = time.perf_counter()
+        y = m.forward(X)
+        timings["forward"] = time.perf_counter() - t0
+    except Exception as e:
+        raise streaming.StreamError(f"Inference error: {e}")
+    for stage, secs in timings.items():
+        _observe_stage("stream", stage, secs)
+    return y
+
+@router.post("/predict/stream")
+async def predict_stream(request: Request):
+    """
+    NDJSON in (one record per line, same keys as /predict), NDJSON out (one
+    `{"pred": p}` line per record, in order). Records are scored STREAM_CHUNK_ROWS
+    at a time, so memory stays flat however long the stream is.
+    """
+    m = await _selected(request)
+    if INFERENCE.inflight >= INFERENCE.max_inflight:
+        raise _overloaded(Overloaded("inference pool is full"))
+
+    async def score_chunk(records):
+        # a stream that was admitted is never cut off mid-way; its chunks wait for a thread
+        return await INFERENCE.run(_score_records, m, records, shed=False)
+
+    return streaming.BodyStreamingResponse(
+        streaming.score_ndjson(request.stream(), score_chunk),
+        media_type="application/x-ndjson",
     )
@@ -1,8 +1,15 @@
 # backend/routers/settings.py
 from fastapi import APIRouter
 
+from backend import startup
+
 router = APIRouter()
 
 @router.get("/health")
 def health():
     return {"status": "ok"}
+
+@router.get("/startup")
+def startup_report():
+    """Import / model load / warm-up timings for this process (see backend/startup.py)."""
+    return startup.report()
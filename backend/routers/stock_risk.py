@@ -0,0 +1,95 @@
+# backend/routers/stock_risk.py
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+from typing import List, Optional
+import logging, threading, time
+
+from backend import startup as startup_times
+from backend.stock_risk import StockIndex, load_stock, records, score, SCORE_COLUMNS
+
+router = APIRouter(prefix="/stock_risk", tags=["stock_risk"])
+log = logging.getLogger(__name__)
+
+MONTH = r"^\d{4}-\d{2}(-\d{2})?$"
+STOCK_RISK_MAX_ROWS = 5000
+
+# Loaded once at startup (and on POST /stock_risk/reload); queries only slice it
+_index: Optional[StockIndex] = None
+_error: Optional[str] = None
+_lock = threading.Lock()
+
+def load() -> None:
+    global _index, _error
+    t0 = time.perf_counter()
+    try:
+        index = StockIndex.from_frame(load_stock())
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        _error = str(e)
+        log.warning("stock risk index not loaded: %s", e)
+        return
+    with _lock:
+        _index, _error = index, None
+    startup_times.record("load:stock_risk", time.perf_counter() - t0)
+
+def startup():
+    """Called from the app lifespan hook."""
+    load()
+
+def _get_index() -> StockIndex:
+    if _index is None:
+        raise HTTPException(status_code=503, detail=f"stock data not loaded: {_error or 'not loaded yet'}")
+    return _index
+
+@router.get("/top")
+def top(month: Optional[str] = Query(None, pattern=MONTH), item: Optional[str] = None,
+        limit: int = Query(20, ge=1, le=STOCK_RISK_MAX_ROWS), min_score: float = Query(0.0, ge=0, le=1)):
+    """Highest-risk clinic-items in a month (default: the newest month loaded)."""
+    return {"rows": records(_get_index().top(month=month, item=item, limit=limit, min_score=min_score))}
+
+@router.get("/stats")
+def stats():
+    if _index is None:
+        return {"loaded": False, "error": _error}
+    return {"loaded": True, **_index.stats()}
+
+@router.post("/reload")
+def reload():
+    load()
+    return stats()
+
+class StockRow(BaseModel):
+    stock_on_hand: float
+    reorder_level: float
+    lead_time_days: float
+    monthly_use: Optional[float] = None   # default: reorder_level / STOCK_REORDER_COVER
+
+class ScoreRequest(BaseModel):
+    rows: List[StockRow]
+
+@router.post("/score")
+def score_rows(req: ScoreRequest):
+    """Score stock positions that aren't in the loaded table (e.g. today's count)."""
+    if len(req.rows) > STOCK_RISK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"at most {STOCK_RISK_MAX_ROWS} rows per request")
+    cols = score([r.stock_on_hand for r in req.rows], [r.reorder_level for r in req.rows],
+                 [r.lead_time_days for r in req.rows],
+                 [r.monthly_use if r.monthly_use is not None else float("nan") for r in req.rows])
+    return {"rows": records({c: cols[c] for c in SCORE_COLUMNS})}
+
+@router.get("/{clinic_id}")
+def clinic_rows(clinic_id: str, item: Optional[str] = None,
+                start: Optional[str] = Query(None, pattern=MONTH), end: Optional[str] = Query(None, pattern=MONTH)):
+    """Scored stock history of one clinic (optionally one item, between start and end)."""
+    index = _get_index()
+    if clinic_id not in index:
+        raise HTTPException(status_code=404, detail=f"unknown clinic '{clinic_id}'")
+    cols = index.rows(clinic_id, item=item, start=start, end=end)
+    return {"clinic_id": clinic_id, "rows": records({k: v[-STOCK_RISK_MAX_ROWS:] for k, v in cols.items()})}
+
+@router.get("/{clinic_id}/latest")
+def clinic_latest(clinic_id: str):
+    """Newest month of every item at one clinic."""
+    index = _get_index()
+    if clinic_id not in index:
+        raise HTTPException(status_code=404, detail=f"unknown clinic '{clinic_id}'")
+    return {"clinic_id": clinic_id, "rows": records(index.latest(clinic_id))}
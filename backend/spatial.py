@@ -0,0 +1,111 @@
+# backend/spatial.py
+"""
+Nearest-neighbour lookups from locations to DHS clusters.
+
+`ClusterIndex` puts every cluster on the unit sphere as an (x, y, z) vector and
+builds one KD-tree over them. Straight-line (chord) distance between unit vectors
+grows with the great-circle angle, so the tree's nearest neighbours are exactly
+the haversine nearest neighbours. A radius in km becomes a chord length before
+the query, and chord lengths come back converted to km. Queries take
+O(log M) per location instead of scanning every cluster.
+
+    index = ClusterIndex.from_frame(clusters)                 # DHSID, lat, lon
+    index.nearest(lat, lon, max_km=50)                        # DHSID per point (None past 50 km)
+    dist_km, pos = index.query(lat, lon, k=3)                 # 3 nearest
+    index.within(lat, lon, radius_km=10)                      # all clusters within 10 km
+
+Used by scripts/enrich_visits_with_dhs.py and GET /api/v1/geo/nearest_cluster.
+"""
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0
+DHS_GPS_PATH = os.getenv("DHS_GPS_PATH", "data/raw/dhs/dhs_clusters_gps.csv")
+
+LAT_COLUMNS = ("lat", "latitude", "latnum")
+LON_COLUMNS = ("lon", "longitude", "longnum", "lonnum")
+
+def to_unit_xyz(lat, lon) -> np.ndarray:
+    """(n, 3) unit vectors for degrees lat/lon."""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+def chord_to_km(chord) -> np.ndarray:
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2.0, 0.0, 1.0))
+
+def km_to_chord(km: float) -> float:
+    return float(2.0 * np.sin(min(km / EARTH_RADIUS_KM, np.pi) / 2.0))
+
+class ClusterIndex:
+    def __init__(self, lat: Sequence[float], lon: Sequence[float], ids: Optional[Sequence] = None):
+        from scipy.spatial import cKDTree   # scipy comes with scikit-learn
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        ok = np.isfinite(lat) & np.isfinite(lon)
+        self.lat, self.lon = lat[ok], lon[ok]
+        self.ids = np.asarray(ids if ids is not None else np.arange(len(ok)), dtype=object)[ok]
+        if not len(self.lat):
+            raise ValueError("no clusters with valid coordinates")
+        self._tree = cKDTree(to_unit_xyz(self.lat, self.lon))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, lat: str = "lat", lon: str = "lon", id_col: str = "DHSID") -> "ClusterIndex":
+        return cls(df[lat].to_numpy(float), df[lon].to_numpy(float), df[id_col].to_numpy())
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def query(self, lat, lon, k: int = 1, max_km: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        k nearest clusters per location: (dist_km, pos), both (n, k). pos indexes
+        self.ids; -1 (with distance inf) past max_km, past the number of clusters,
+        or for a location without coordinates.
+        """
+        xyz = to_unit_xyz(lat, lon).reshape(-1, 3)
+        n, k = len(xyz), max(1, int(k))
+        dist = np.full((n, k), np.inf)
+        pos = np.full((n, k), -1, dtype=np.int64)
+        ok = np.isfinite(xyz).all(axis=1)
+        if ok.any():
+            bound = km_to_chord(max_km) if max_km is not None else np.inf
+            d, i = self._tree.query(xyz[ok], k=k, distance_upper_bound=bound)
+            d, i = d.reshape(-1, k), i.reshape(-1, k)
+            found = i < len(self.ids)           # cKDTree marks "nothing found" with i == n
+            pos[ok] = np.where(found, i, -1)
+            dist[ok] = np.where(found, chord_to_km(np.where(found, d, 0.0)), np.inf)
+        return dist, pos
+
+    def nearest(self, lat, lon, max_km: Optional[float] = None) -> np.ndarray:
+        """Id of the nearest cluster per location (None when nothing is within max_km)."""
+        _, pos = self.query(lat, lon, k=1, max_km=max_km)
+        pos = pos[:, 0]
+        out = np.full(len(pos), None, dtype=object)
+        out[pos >= 0] = self.ids[pos[pos >= 0]]
+        return out
+
+    def within(self, lat, lon, radius_km: float) -> List[np.ndarray]:
+        """Per location, positions of every cluster within radius_km, nearest first."""
+        xyz = to_unit_xyz(lat, lon).reshape(-1, 3)
+        out: List[np.ndarray] = []
+        # a location without coordinates is moved far off the sphere, where nothing is in range
+        hits = self._tree.query_ball_point(np.nan_to_num(xyz, nan=9.0), r=km_to_chord(radius_km))
+        for p, h in zip(xyz, hits):
+            h = np.asarray(h, dtype=np.int64)
+            if len(h):
+                h = h[np.argsort(np.linalg.norm(self._tree.data[h] - p, axis=1))]
+            out.append(h)
+        return out
+
+def load_clusters(path: str = DHS_GPS_PATH) -> pd.DataFrame:
+    """DHSID / lat / lon from a DHS GPS CSV, whatever the lat/lon columns are called."""
+    gps = pd.read_csv(path)
+    lat_col = next((c for c in gps.columns if c.lower() in LAT_COLUMNS), None)
+    lon_col = next((c for c in gps.columns if c.lower() in LON_COLUMNS), None)
+    if not (lat_col and lon_col and "DHSID" in gps.columns):
+        raise KeyError(f"{path} needs DHSID plus latitude/longitude columns")
+    return gps[["DHSID", lat_col, lon_col]].rename(columns={lat_col: "lat", lon_col: "lon"})
@@ -0,0 +1,24 @@
+# backend/startup.py
+import time, threading
+from typing import Dict
+
+PROCESS_T0 = time.perf_counter()   # as close to interpreter start as the backend package gets
+
+_lock = threading.Lock()
+_phases: Dict[str, float] = {}
+
+def record(phase: str, seconds: float) -> None:
+    """Store how long a startup phase took, e.g. "import", "load:default", "warmup:default"."""
+    with _lock:
+        _phases[phase] = round(float(seconds), 4)
+
+def report() -> Dict:
+    with _lock:
+        phases = dict(_phases)
+    return {
+        "phases_s": phases,
+        "import_s": phases.get("import"),
+        "load_s": round(sum(v for k, v in phases.items() if k.startswith("load:")), 4),
+        "warmup_s": round(sum(v for k, v in phases.items() if k.startswith("warmup:")), 4),
+        "uptime_s": round(time.perf_counter() - PROCESS_T0, 3),
+    }
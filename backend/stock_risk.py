@@ -0,0 +1,230 @@
+# backend/stock_risk.py
+"""
+Stock-out risk scoring over medicine_stock (clinic × item × month).
+
+Per row, with the monthly use implied by the reorder policy
+(reorder_level = STOCK_REORDER_COVER × expected monthly consumption, see
+scripts/generate_medicine_stock_synthetic.py):
+
+    daily_use        = reorder_level / STOCK_REORDER_COVER / 30
+    days_of_cover    = stock_on_hand / daily_use
+    cover_needed     = lead_time_days + STOCK_SAFETY_DAYS
+    reorder_breach   = stock_on_hand <= reorder_level
+    lead_time_breach = days_of_cover < cover_needed     (an order placed today arrives too late)
+    risk_score       = clip(1 - days_of_cover / cover_needed, 0, 1)
+
+`StockIndex` loads the table once, sorts it by (clinic_id, item_code, month),
+scores every row in one vectorized pass and keeps the columns as NumPy arrays with
+row ranges per clinic and per (clinic, item). A query is a dict lookup plus an
+array slice, not a scan of the file; results come back as {column: array}.
+
+    index = StockIndex.from_frame(load_stock())
+    index.rows("NG-0001", item="ACT", start="2024-01")
+    index.latest("NG-0001")                        # newest month per item
+    index.top(month="2024-06", limit=20)           # highest risk across clinics
+"""
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+DATA_ROOT = Path(os.getenv("DATA_ROOT", "./data"))
+STOCK_RISK_PATH = os.getenv("STOCK_RISK_PATH", "")        # default: silver table, then the raw CSV
+STOCK_REORDER_COVER = float(os.getenv("STOCK_REORDER_COVER", "1.2"))
+STOCK_SAFETY_DAYS = float(os.getenv("STOCK_SAFETY_DAYS", "7"))
+STOCK_RISK_HIGH = float(os.getenv("STOCK_RISK_HIGH", "0.5"))
+
+COLUMNS = ["clinic_id", "month", "item_code", "item_name", "stock_on_hand", "reorder_level", "lead_time_days"]
+SCORE_COLUMNS = ["days_of_cover", "cover_needed_days", "reorder_breach", "lead_time_breach", "risk_score", "risk_band"]
+
+def default_sources() -> List[Path]:
+    silver = DATA_ROOT / "processed" / "silver"
+    return [silver / "medicine_stock", silver / "medicine_stock.csv", DATA_ROOT / "raw" / "_manual" / "medicine_stock.csv"]
+
+def load_stock(path: Optional[str] = None) -> pd.DataFrame:
+    """medicine_stock from a Parquet dataset directory or a CSV (first that exists, unless path is given)."""
+    candidates = [Path(path)] if path else ([Path(STOCK_RISK_PATH)] if STOCK_RISK_PATH else default_sources())
+    for p in candidates:
+        if p.is_dir():
+            import pyarrow.dataset as ds
+            d = ds.dataset(p, format="parquet", partitioning="hive")
+            return d.to_table(columns=[c for c in COLUMNS if c in d.schema.names]).to_pandas()
+        if p.is_file():
+            return pd.read_csv(p, usecols=lambda c: c in COLUMNS)
+    raise FileNotFoundError(f"no medicine_stock data (looked in {', '.join(map(str, candidates))})")
+
+def to_month(v) -> np.ndarray:
+    """
+    Months as datetime64[M] from 'YYYY-MM' strings, dates or timestamps (each distinct
+    value parsed once). Missing or unparseable values are NaT.
+    """
+    codes, uniques = pd.factorize(np.asarray(v, dtype=object))
+    parsed = pd.to_datetime(pd.Series(uniques).astype(str).str[:7], format="%Y-%m", errors="coerce")
+    parsed = np.append(parsed.to_numpy().astype("datetime64[M]"), np.datetime64("NaT", "M"))
+    return parsed[codes]                # code -1 (missing) picks the NaT at the end
+
+def _month(v) -> np.datetime64:
+    return np.datetime64(str(v)[:7], "M")
+
+def score(stock_on_hand, reorder_level, lead_time_days, monthly_use=None) -> Dict[str, np.ndarray]:
+    """Risk columns (SCORE_COLUMNS) for aligned arrays; monthly_use (missing / NaN) defaults to the reorder-policy estimate."""
+    soh = np.asarray(stock_on_hand, dtype=np.float64)
+    rl = np.asarray(reorder_level, dtype=np.float64)
+    lead = np.asarray(lead_time_days, dtype=np.float64)
+    use = rl / STOCK_REORDER_COVER
+    if monthly_use is not None:
+        given = np.asarray(monthly_use, dtype=np.float64)
+        use = np.where(np.isnan(given), use, given)
+    daily = np.maximum(use, 0.0) / 30.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cover = np.where(daily > 0, soh / daily, np.where(soh > 0, np.inf, 0.0))
+    needed = lead + STOCK_SAFETY_DAYS
+    with np.errstate(divide="ignore", invalid="ignore"):
+        risk = np.clip(1.0 - cover / needed, 0.0, 1.0)
+    risk = np.where(needed > 0, risk, 0.0)
+    band = np.where(risk >= STOCK_RISK_HIGH, "high", np.where(risk > 0, "medium", "low"))
+    return {
+        "days_of_cover": cover,
+        "cover_needed_days": needed,
+        "reorder_breach": soh <= rl,
+        "lead_time_breach": cover < needed,
+        "risk_score": risk,
+        "risk_band": band,
+    }
+
+def _bounds(key: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start / end of each run of equal values in a sorted array."""
+    if not len(key):
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    return starts, np.r_[starts[1:], len(key)].astype(np.int64)
+
+class StockIndex:
+    def __init__(self, clinic_id, item_code, month, stock_on_hand, reorder_level, lead_time_days, item_name=None):
+        # rows without a month, clinic or item can't be placed: drop them rather than fail the load
+        month = to_month(month)
+        clinic_id, item_code = np.asarray(clinic_id, dtype=object), np.asarray(item_code, dtype=object)
+        ok = ~np.isnat(month) & pd.notna(clinic_id) & pd.notna(item_code)
+        if not ok.all():
+            clinic_id, item_code, month = clinic_id[ok], item_code[ok], month[ok]
+            stock_on_hand, reorder_level, lead_time_days = (np.asarray(v)[ok] for v in
+                                                            (stock_on_hand, reorder_level, lead_time_days))
+            item_name = np.asarray(item_name, dtype=object)[ok] if item_name is not None else None
+        c_codes, clinics = pd.factorize(np.asarray(clinic_id, dtype=object), sort=True)
+        i_codes, items = pd.factorize(np.asarray(item_code, dtype=object), sort=True)
+        clinics, items = np.asarray(clinics.astype(str), dtype=object), np.asarray(items.astype(str), dtype=object)
+        order = np.lexsort((month, i_codes, c_codes))
+
+        c_sorted = c_codes[order]
+        self.clinic_id = clinics[c_sorted]
+        self.item_code = items[i_codes[order]]
+        self.item_name = (np.asarray(item_name, dtype=object)[order] if item_name is not None
+                          else np.full(len(order), None, dtype=object))
+        self.month = month[order]
+        self.stock_on_hand = np.asarray(stock_on_hand, dtype=np.float64)[order]
+        self.reorder_level = np.asarray(reorder_level, dtype=np.float64)[order]
+        self.lead_time_days = np.asarray(lead_time_days, dtype=np.float64)[order]
+        self.scores = score(self.stock_on_hand, self.reorder_level, self.lead_time_days)
+
+        pair = c_sorted.astype(np.int64) * max(len(items), 1) + i_codes[order]
+        self._clinic: Dict[str, Tuple[int, int]] = {
+            clinics[c_sorted[s]]: (int(s), int(e)) for s, e in zip(*_bounds(c_sorted))
+        }
+        self._pair: Dict[Tuple[str, str], Tuple[int, int]] = {
+            (self.clinic_id[s], self.item_code[s]): (int(s), int(e)) for s, e in zip(*_bounds(pair))
+        }
+        self.items = list(items)
+        self.months = (str(self.month.min()), str(self.month.max())) if len(order) else (None, None)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "StockIndex":
+        return cls(df["clinic_id"], df["item_code"], df["month"], df["stock_on_hand"], df["reorder_level"],
+                   df["lead_time_days"], df["item_name"] if "item_name" in df.columns else None)
+
+    def __len__(self) -> int:
+        return len(self.month)
+
+    def __contains__(self, clinic_id: str) -> bool:
+        return clinic_id in self._clinic
+
+    @property
+    def n_clinics(self) -> int:
+        return len(self._clinic)
+
+    def _take(self, idx) -> Dict[str, np.ndarray]:
+        out = {
+            "clinic_id": self.clinic_id[idx],
+            "month": self.month[idx].astype(str),
+            "item_code": self.item_code[idx],
+            "item_name": self.item_name[idx],
+            "stock_on_hand": self.stock_on_hand[idx],
+            "reorder_level": self.reorder_level[idx],
+            "lead_time_days": self.lead_time_days[idx],
+        }
+        for col in SCORE_COLUMNS:
+            out[col] = self.scores[col][idx]
+        return out
+
+    def rows(self, clinic_id: str, item: Optional[str] = None, start=None, end=None) -> Dict[str, np.ndarray]:
+        """A clinic's rows (one item, or all) between start and end months inclusive; empty if unknown."""
+        lo = _month(start) if start is not None else None
+        hi = _month(end) if end is not None else None
+        if item is not None:
+            # months are sorted within a (clinic, item) run: narrow the slice by binary search
+            s, e = self._pair.get((clinic_id, item), (0, 0))
+            m = self.month[s:e]
+            lo_i = int(np.searchsorted(m, lo, "left")) if lo is not None else 0
+            hi_i = int(np.searchsorted(m, hi, "right")) if hi is not None else e - s
+            return self._take(slice(s + lo_i, s + max(lo_i, hi_i)))
+        s, e = self._clinic.get(clinic_id, (0, 0))
+        keep = np.ones(e - s, dtype=bool)
+        if lo is not None:
+            keep &= self.month[s:e] >= lo
+        if hi is not None:
+            keep &= self.month[s:e] <= hi
+        return self._take(s + np.flatnonzero(keep))
+
+    def latest(self, clinic_id: str) -> Dict[str, np.ndarray]:
+        """Newest month of every item the clinic stocks."""
+        s, e = self._clinic.get(clinic_id, (0, 0))
+        _, ends = _bounds(self.item_code[s:e])
+        return self._take(s + ends - 1)
+
+    def top(self, month=None, item: Optional[str] = None, limit: int = 20, min_score: float = 0.0) -> Dict[str, np.ndarray]:
+        """The `limit` highest-risk clinic-items in one month (default: the newest), riskiest first."""
+        if not len(self):
+            return self._take(np.array([], dtype=np.int64))
+        m = _month(month) if month is not None else self.month.max()
+        keep = self.month == m
+        if item is not None:
+            keep &= self.item_code == item
+        if min_score > 0:
+            keep &= self.scores["risk_score"] >= min_score
+        idx = np.flatnonzero(keep)
+        if len(idx) > limit:
+            idx = idx[np.argpartition(-self.scores["risk_score"][idx], limit - 1)[:limit]]
+        # riskiest first; ties by least cover
+        idx = idx[np.lexsort((self.scores["days_of_cover"][idx], -self.scores["risk_score"][idx]))]
+        return self._take(idx)
+
+    def stats(self) -> dict:
+        high = self.scores["risk_band"] == "high"
+        return {
+            "rows": len(self), "clinics": self.n_clinics, "items": self.items,
+            "months": list(self.months), "high_risk_rows": int(high.sum()),
+        }
+
+def records(cols: Dict[str, np.ndarray]) -> List[dict]:
+    """JSON-safe rows: non-finite floats (e.g. infinite cover when nothing is used) and missing values become None."""
+    lists = []
+    for v in cols.values():
+        v = np.asarray(v)
+        if v.dtype.kind == "f":
+            lists.append([round(x, 4) if np.isfinite(x) else None for x in v.tolist()])
+        elif v.dtype.kind == "O":
+            lists.append([None if pd.isna(x) else x for x in v.tolist()])
+        else:
+            lists.append(v.tolist())
+    return [dict(zip(cols, row)) for row in zip(*lists)]
@@ -0,0 +1,108 @@
+# backend/streaming.py
+"""
+NDJSON in, NDJSON out, in fixed-size chunks.
+
+The request body is read incrementally and split into lines; every `chunk_rows`
+records are scored and written back before more input is read. Because the
+response generator is what pulls the request body, a slow client reader stalls
+input consumption too (backpressure reaches the sender through TCP), and the
+server only ever holds one chunk of records plus one partial line.
+"""
+import json, math, os, time
+from typing import Any, AsyncIterator, Callable, Dict, List
+
+import numpy as np
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from backend.metrics import histogram
+
+STREAM_CHUNK_ROWS     = int(os.getenv("STREAM_CHUNK_ROWS", "1024"))          # records scored per model call
+STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", str(1 << 20)))  # longest accepted input line
+
+ROWS_PER_SEC_BUCKETS = (100, 500, 1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1_000_000)
+STREAM_ROWS_PER_SEC = histogram("predict_stream_rows_per_sec", "Rows/sec over a whole NDJSON stream", ROWS_PER_SEC_BUCKETS)
+STREAM_ROWS = histogram("predict_stream_rows", "Rows per NDJSON stream", (1_000, 10_000, 100_000, 1_000_000, 10_000_000))
+
+class StreamError(ValueError):
+    """Malformed input in the middle of a stream; reported as a final `{"error": ...}` line."""
+
+async def iter_record_chunks(
+    body: AsyncIterator[bytes],
+    chunk_rows: int = STREAM_CHUNK_ROWS,
+    max_line_bytes: int = STREAM_MAX_LINE_BYTES,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Group an NDJSON byte stream into lists of at most `chunk_rows` records (blank lines skipped)."""
+    chunk: List[Dict[str, Any]] = []
+    pending = b""
+    line_no = 0
+
+    def parse(line: bytes):
+        nonlocal line_no
+        line_no += 1
+        line = line.strip()
+        if not line:
+            return
+        try:
+            rec = json.loads(line)
+        except ValueError as e:
+            raise StreamError(f"line {line_no}: invalid JSON ({e})")
+        if not isinstance(rec, dict):
+            raise StreamError(f"line {line_no}: expected a JSON object")
+        chunk.append(rec)
+
+    async for data in body:
+        pending += data
+        *lines, pending = pending.split(b"\n")
+        if len(pending) > max_line_bytes:
+            raise StreamError(f"line {line_no + len(lines) + 1}: longer than {max_line_bytes} bytes")
+        for line in lines:
+            parse(line)
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+    parse(pending)
+    if chunk:
+        yield chunk
+
+def encode_preds(preds: np.ndarray) -> bytes:
+    """One {"pred": p} line per value; NaN / inf become null, as in the JSON endpoints."""
+    return b"".join(b'{"pred":%r}\n' % p if math.isfinite(p) else b'{"pred":null}\n'
+                    for p in np.asarray(preds, dtype=np.float64).reshape(-1).tolist())
+
+async def score_ndjson(
+    body: AsyncIterator[bytes],
+    score_chunk: Callable[[List[Dict[str, Any]]], Any],
+    chunk_rows: int = STREAM_CHUNK_ROWS,
+) -> AsyncIterator[bytes]:
+    """
+    Yield one `{"pred": p}` line per input record, chunk by chunk. `score_chunk` is
+    awaited per chunk and returns that chunk's predictions. Bad input ends the
+    stream with a single `{"error": ..., "rows_scored": n}` line.
+    """
+    rows, t0 = 0, time.perf_counter()
+    try:
+        async for records in iter_record_chunks(body, chunk_rows):
+            preds = await score_chunk(records)
+            rows += len(records)
+            yield encode_preds(preds)
+    except StreamError as e:
+        yield json.dumps({"error": str(e), "rows_scored": rows}).encode("utf-8") + b"\n"
+    finally:
+        elapsed = time.perf_counter() - t0
+        STREAM_ROWS.observe(rows)
+        if rows and elapsed > 0:
+            STREAM_ROWS_PER_SEC.observe(rows / elapsed)
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose generator reads the request body itself.
+
+    Starlette normally runs a disconnect listener on `receive` next to the body
+    generator; here that listener would swallow request body messages, so it is
+    skipped. A disconnect still surfaces through `request.stream()`.
+    """
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
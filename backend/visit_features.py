@@ -0,0 +1,246 @@
+# backend/visit_features.py
+"""
+Clinic × month features for visit forecasting, shared by training (the
+clinic_month_features gold table) and serving.
+
+For the row of clinic c in month t:
+
+    visits_lag{k}        total_visits of c in month t-k                (LAGS)
+    visits_roll{w}       mean total_visits of c over months t-w .. t-1  (ROLL_WINDOWS; missing months skipped)
+    month_of_year, month_sin, month_cos
+    rainfall_mm, avg_temperature_c, rain_roll3 (mean rain over t-2 .. t)
+    available_doctors, available_nurses, available_beds, power_availability_days
+
+Lags are calendar months, so a month a clinic didn't report is NaN, not the
+previous report. Nothing from month t's own visits leaks into its features.
+
+`build_features` puts the history on a dense (clinics × months) grid and reads
+every lag and window for all rows at once with gathers into it: no per-clinic
+Python loop, no groupby. It also returns a `FeatureState` holding the last
+HISTORY months per clinic; `append_month` computes the next month's features from
+that state alone and rolls it forward, so adding a month never touches history.
+The state also keeps a `history_digest` of the rows it has seen, so a caller can
+tell whether history changed underneath it before appending.
+
+    feats, state = build_features(visits)
+    state.save(path)
+    ...
+    new_feats = append_month(state, next_month_rows)     # same values a full rebuild gives
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+LAGS = (1, 2, 3, 6, 12)
+ROLL_WINDOWS = (3, 6, 12)
+RAIN_WINDOW = 3
+HISTORY = max(max(LAGS), max(ROLL_WINDOWS), RAIN_WINDOW)
+EXOGENOUS = ("rainfall_mm", "avg_temperature_c", "available_doctors", "available_nurses",
+             "available_beds", "power_availability_days")
+
+FEATURES = (
+    [f"visits_lag{k}" for k in LAGS]
+    + [f"visits_roll{w}" for w in ROLL_WINDOWS]
+    + ["month_of_year", "month_sin", "month_cos", "rain_roll3"]
+    + list(EXOGENOUS)
+)
+
+def month_index(months) -> np.ndarray:
+    """year * 12 + (month - 1) from 'YYYY-MM' strings, dates or timestamps (each distinct value parsed once)."""
+    codes, uniques = pd.factorize(months if isinstance(months, pd.Series) else np.asarray(months, dtype=object))
+    ts = pd.to_datetime(pd.Series(uniques).astype(str).str[:7], format="%Y-%m")
+    idx = (ts.dt.year * 12 + ts.dt.month - 1).to_numpy(dtype=np.int64)
+    return idx[codes]
+
+def month_label(idx) -> np.ndarray:
+    idx = np.asarray(idx, dtype=np.int64)
+    return np.array([f"{i // 12:04d}-{i % 12 + 1:02d}" for i in idx], dtype=object)
+
+def keyed(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The rows with both a clinic_id and a month. A missing key would factorize to -1
+    and land the row on the last clinic / month, so those rows are dropped.
+    """
+    ok = df["clinic_id"].notna() & df["month"].notna()
+    return df if ok.all() else df[ok]
+
+def _digest(clinic_hash: np.ndarray, month_idx: np.ndarray, visits: np.ndarray, rain: np.ndarray) -> int:
+    h = clinic_hash
+    for a in (month_idx, visits, rain):
+        h = h * np.uint64(1000003) ^ pd.util.hash_array(a)
+    return int(h.sum(dtype=np.uint64))
+
+def history_digest(df: pd.DataFrame) -> int:
+    """
+    Order-independent hash of clinic_id / month / total_visits / rainfall_mm over the
+    rows: the sum (mod 2**64) of per-row hashes, so digests of disjoint months add up.
+    """
+    df = keyed(df)
+    if df.empty:
+        return 0
+    codes, clinics = pd.factorize(df["clinic_id"])
+    clinic_hash = pd.util.hash_array(np.asarray(clinics.astype(str), dtype=object))[codes]
+    values = _numeric(df[[c for c in ("total_visits", "rainfall_mm") if c in df.columns]])
+    return _digest(clinic_hash, month_index(df["month"]), values["total_visits"], values["rainfall_mm"])
+
+@dataclass
+class FeatureState:
+    """Last HISTORY months of visits / rain per clinic, ending at `last_month` (a month_index)."""
+    clinics: List[str]
+    last_month: int
+    visits: np.ndarray                  # (clinics, HISTORY), oldest first, NaN where not reported
+    rain: np.ndarray
+    digest: Optional[int] = None        # history_digest of every row up to last_month; None if unknown
+    positions: Dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.positions = {c: i for i, c in enumerate(self.clinics)}
+
+    def save(self, path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, clinics=np.asarray(self.clinics, dtype=str), last_month=self.last_month,
+                     visits=self.visits, rain=self.rain,
+                     digest=np.uint64(self.digest if self.digest is not None else 0),
+                     has_digest=self.digest is not None, lags=np.asarray(LAGS), windows=np.asarray(ROLL_WINDOWS))
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path) -> "FeatureState":
+        with np.load(path) as z:
+            if tuple(z["lags"]) != LAGS or tuple(z["windows"]) != ROLL_WINDOWS or z["visits"].shape[1] != HISTORY:
+                raise ValueError(f"{path} was built with different lags/windows; rebuild it")
+            digest = int(z["digest"]) if "has_digest" in z.files and bool(z["has_digest"]) else None
+            return cls(z["clinics"].tolist(), int(z["last_month"]), z["visits"].copy(), z["rain"].copy(), digest)
+
+    def _grow(self, clinics) -> None:
+        new = [c for c in dict.fromkeys(clinics) if c not in self.positions]
+        if new:
+            pad = np.full((len(new), HISTORY), np.nan)
+            self.visits = np.vstack([self.visits, pad])
+            self.rain = np.vstack([self.rain, pad])
+            self.clinics += new
+            self.positions.update({c: len(self.positions) + i for i, c in enumerate(new)})
+
+    def _advance(self, steps: int) -> None:
+        """Shift the windows `steps` months forward, filling with NaN."""
+        steps = min(steps, HISTORY)
+        if steps > 0:
+            for arr in (self.visits, self.rain):
+                arr[:, :-steps] = arr[:, steps:].copy()
+                arr[:, -steps:] = np.nan
+
+def _calendar(month_idx: np.ndarray) -> Dict[str, np.ndarray]:
+    moy = month_idx % 12 + 1
+    angle = 2 * np.pi * (moy - 1) / 12.0
+    return {"month_of_year": moy, "month_sin": np.sin(angle), "month_cos": np.cos(angle)}
+
+def _history(visit_at: Callable[[int], np.ndarray], rain_at: Callable[[int], np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Lags and trailing means from accessors returning, for every row, visits k months
+    back (k = 1 .. HISTORY) and rain k months back (k = 0 .. RAIN_WINDOW - 1).
+    The full build and append_month both go through here, so they agree bit for bit.
+    """
+    cols: Dict[str, np.ndarray] = {}
+    for name, at, ks, lags, windows in (("visits", visit_at, range(1, HISTORY + 1), LAGS, ROLL_WINDOWS),
+                                        ("rain", rain_at, range(RAIN_WINDOW), (), (RAIN_WINDOW,))):
+        total = count = None
+        for k in ks:
+            v = at(k)
+            if k in lags:
+                cols[f"{name}_lag{k}"] = v
+            ok = ~np.isnan(v)
+            total = np.where(ok, v, 0.0) if total is None else total + np.where(ok, v, 0.0)
+            count = ok.astype(np.int64) if count is None else count + ok
+            n = k + 1 if name == "rain" else k
+            if n in windows:
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    cols[f"{name}_roll{n}"] = np.where(count > 0, total / count, np.nan)
+    return cols
+
+def _numeric(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """total_visits and the exogenous columns as float arrays (NaN where absent)."""
+    return {c: pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64) if c in df.columns
+            else np.full(len(df), np.nan) for c in ("total_visits",) + EXOGENOUS}
+
+def _labels(month_idx: np.ndarray) -> np.ndarray:
+    codes, uniques = pd.factorize(month_idx)
+    return month_label(uniques)[codes]
+
+def _frame(clinic: np.ndarray, month_idx: np.ndarray, values: Dict[str, np.ndarray],
+           cols: Dict[str, np.ndarray]) -> pd.DataFrame:
+    out = {"clinic_id": clinic, "month": _labels(month_idx), "total_visits": values["total_visits"]}
+    cols = {**cols, **_calendar(month_idx)}
+    out.update({name: cols[name] if name in cols else values[name] for name in FEATURES})
+    return pd.DataFrame(out)
+
+def build_features(df: pd.DataFrame) -> Tuple[pd.DataFrame, FeatureState]:
+    """
+    Features for every row of a clinic_visits frame (one row per clinic and month),
+    sorted by clinic_id then month, plus the state to append later months from.
+    Rows without a clinic_id or month are left out.
+    """
+    df = keyed(df)
+    c_codes, clinics = pd.factorize(df["clinic_id"], sort=True)
+    clinics = np.asarray(clinics.astype(str), dtype=object)
+    m_idx = month_index(df["month"])
+    order = np.lexsort((m_idx, c_codes))
+    c_codes, m_idx = c_codes[order], m_idx[order]
+    values = {k: v[order] for k, v in _numeric(df).items()}
+
+    t0 = int(m_idx.min()) if len(m_idx) else 0
+    T = int(m_idx.max()) - t0 + 1 if len(m_idx) else 0
+    # grids padded with HISTORY empty months on the left: column HISTORY + t is month t0 + t
+    C = len(clinics)
+    visits = np.full((C, HISTORY + T), np.nan)
+    rain = np.full((C, HISTORY + T), np.nan)
+    col = m_idx - t0 + HISTORY
+    visits[c_codes, col] = values["total_visits"]
+    rain[c_codes, col] = values["rainfall_mm"]
+
+    cols = _history(lambda k: visits[c_codes, col - k], lambda k: rain[c_codes, col - k])
+    tail = slice(T, T + HISTORY)          # the last HISTORY months
+    digest = _digest(pd.util.hash_array(clinics)[c_codes], m_idx, values["total_visits"], values["rainfall_mm"])
+    state = FeatureState(clinics.tolist(), t0 + T - 1, visits[:, tail].copy(), rain[:, tail].copy(), digest)
+    return _frame(clinics[c_codes], m_idx, values, cols), state
+
+def append_month(state: FeatureState, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Features for the rows of one new month (later than state.last_month), from the
+    state alone; the state then includes that month. Clinics seen for the first
+    time get empty history. Rows come back in input order (without the ones missing
+    a clinic_id or month).
+    """
+    df = keyed(df)
+    values = _numeric(df)
+    clinic = np.asarray(df["clinic_id"].astype(str), dtype=object)
+    if df.empty:
+        return _frame(clinic, np.empty(0, dtype=np.int64), values, {})
+    m_idx = month_index(df["month"])
+    month = int(m_idx[0])
+    if (m_idx != month).any():
+        raise ValueError("append_month takes the rows of a single month")
+    if month <= state.last_month:
+        raise ValueError(f"month {month_label([month])[0]} is not after the state's last month "
+                         f"{month_label([state.last_month])[0]}; rebuild instead")
+    state._grow(clinic)
+    state._advance(month - state.last_month - 1)       # skipped months become empty history
+    rows = np.array([state.positions[c] for c in clinic], dtype=np.int64)
+
+    visits, rain = state.visits[rows], state.rain[rows]     # months month-HISTORY .. month-1
+    cols = _history(lambda k: visits[:, -k], lambda k: values["rainfall_mm"] if k == 0 else rain[:, -k])
+    out = _frame(clinic, m_idx, values, cols)
+
+    state._advance(1)
+    state.visits[rows, -1] = values["total_visits"]
+    state.rain[rows, -1] = values["rainfall_mm"]
+    state.last_month = month
+    if state.digest is not None:
+        digest = _digest(pd.util.hash_array(clinic), m_idx, values["total_visits"], values["rainfall_mm"])
+        state.digest = (state.digest + digest) % 2**64
+    return out
@@ -0,0 +1,73 @@
+# benchmarks/bench_cluster_index.py
+"""
+Clinic -> nearest DHS cluster: KD-tree index (backend/spatial.py) vs brute force.
+
+    brute:  the old enrich_visits_with_dhs path, a haversine matrix in 2000-clinic
+            chunks against every cluster (O(N*M) time and allocation)
+    index:  ClusterIndex build + k=1 query (O(M log M) + O(N log M))
+
+Clinics and clusters are random points over Nigeria's bounding box, so any size
+can be tried; results are checked to agree.
+
+    python -m benchmarks.bench_cluster_index --clinics 30000 100000 --clusters 568 5000 50000
+"""
+import argparse, json, time, tracemalloc
+
+import numpy as np
+import scipy.spatial  # noqa: F401  (imported up front so the first build doesn't time the import)
+
+from backend.spatial import ClusterIndex
+
+LAT, LON = (4.0, 14.0), (2.7, 14.7)     # Nigeria, roughly
+
+def haversine(lat1, lon1, lat2, lon2):
+    R = 6371.0
+    p1 = np.radians(lat1); p2 = np.radians(lat2)
+    dlat = p2[:, None] - p1[None, :]
+    dlon = np.radians(lon2)[:, None] - np.radians(lon1)[None, :]
+    a = np.sin(dlat/2.0)**2 + np.cos(p1)[None, :]*np.cos(p2)[:, None]*(np.sin(dlon/2.0)**2)
+    return R * 2*np.arcsin(np.sqrt(a))
+
+def brute_force(lat_c, lon_c, lat_k, lon_k, chunk=2000):
+    out = np.empty(len(lat_c), dtype=np.int64)
+    for s in range(0, len(lat_c), chunk):
+        e = min(s + chunk, len(lat_c))
+        out[s:e] = haversine(lat_c[s:e], lon_c[s:e], lat_k, lon_k).T.argmin(axis=1)
+    return out
+
+def _points(n, rng):
+    return rng.uniform(*LAT, n), rng.uniform(*LON, n)
+
+def _measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn()
+    dt = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, round(dt, 4), peak
+
+def run(n_clinics, n_clusters, seed=0):
+    rng = np.random.default_rng(seed)
+    lat_c, lon_c = _points(n_clinics, rng)
+    lat_k, lon_k = _points(n_clusters, rng)
+    brute, brute_s, brute_peak = _measure(lambda: brute_force(lat_c, lon_c, lat_k, lon_k))
+    index, build_s, _ = _measure(lambda: ClusterIndex(lat_k, lon_k))
+    (_, pos), query_s, query_peak = _measure(lambda: index.query(lat_c, lon_c, k=1))
+    agree = float(np.mean(pos[:, 0] == brute))
+    return {
+        "clinics": n_clinics, "clusters": n_clusters,
+        "brute_s": brute_s, "brute_peak_mb": round(brute_peak / 2**20, 1),
+        "index_build_s": build_s, "index_query_s": query_s, "index_peak_mb": round(query_peak / 2**20, 1),
+        "speedup": round(brute_s / max(build_s + query_s, 1e-9), 1), "agreement": agree,
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark nearest-cluster matching.")
+    ap.add_argument("--clinics", type=int, nargs="+", default=[30000])
+    ap.add_argument("--clusters", type=int, nargs="+", default=[568, 5000, 50000])
+    args = ap.parse_args()
+    print(json.dumps([run(n, m) for n in args.clinics for m in args.clusters], indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/bench_month_normalization.py
+"""
+Month normalization in bronze_to_silver: per-row apply vs scripts/dates.py.
+
+    legacy:      df["month"].apply(to_month), one pd.to_datetime per row
+    vectorized:  normalize_dates (factorize, one parse per distinct value, scatter back)
+
+The month column of data/raw/_manual/clinic_visits.csv is tiled to --rows rows,
+with a small share of junk values mixed in. The legacy path is timed on at most
+--legacy-rows rows (it is linear) and reported as rows/s.
+
+    python -m benchmarks.bench_month_normalization --rows 1000000 5000000
+"""
+import argparse, json, sys, time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAW_VISITS = "data/raw/_manual/clinic_visits.csv"
+JUNK = ["", "n/a", "2021-13", "unknown"]
+
+def to_month(v):
+    """The original bronze_to_silver row function."""
+    try:
+        return pd.to_datetime(v).to_period("M").to_timestamp()
+    except Exception:
+        return pd.NaT
+
+def _column(months: np.ndarray, rows: int, seed: int = 0) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    col = months[rng.integers(0, len(months), rows)].astype(object)
+    junk = rng.random(rows) < 0.001
+    col[junk] = np.array(JUNK, dtype=object)[rng.integers(0, len(JUNK), int(junk.sum()))]
+    return pd.Series(col, name="month")
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark month normalization.")
+    ap.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 5_000_000])
+    ap.add_argument("--legacy-rows", type=int, default=100_000)
+    args = ap.parse_args()
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+    from dates import normalize_dates
+
+    months = pd.read_csv(RAW_VISITS, usecols=["month"])["month"].unique()
+    results = []
+    for rows in args.rows:
+        col = _column(months, rows)
+        t0 = time.perf_counter()
+        fast, report = normalize_dates(col, unit="M", name="month")
+        fast_s = time.perf_counter() - t0
+
+        legacy_col = col.iloc[: min(rows, args.legacy_rows)]
+        t0 = time.perf_counter()
+        legacy = legacy_col.apply(to_month)
+        legacy_s = time.perf_counter() - t0
+        assert fast.iloc[: len(legacy)].equals(pd.to_datetime(legacy).astype("datetime64[ns]").rename("month"))
+
+        results.append({
+            "rows": rows,
+            "distinct": report.distinct,
+            "bad_rows": report.bad_rows,
+            "vectorized_s": round(fast_s, 4),
+            "vectorized_rows_per_s": round(rows / fast_s),
+            "legacy_rows_timed": len(legacy_col),
+            "legacy_rows_per_s": round(len(legacy_col) / legacy_s),
+            "legacy_est_s": round(rows * legacy_s / len(legacy_col), 2),
+            "speedup": round((legacy_s / len(legacy_col)) / (fast_s / rows), 1),
+        })
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/bench_prepare_features.py
+"""
+Per-request cost of turning predict records into the model matrix.
+
+    pandas: DataFrame -> project_to_canonical -> prepare_features (the old route)
+    fast:   prepare_records (dicts -> float32 matrix, scaler folded in place)
+
+Records are real rows from data/raw/dhs/dhs_env.csv, so each one carries the full
+set of year-suffixed keys a client would send. Allocations are measured with
+tracemalloc (block count and peak bytes for one call).
+
+    python -m benchmarks.bench_prepare_features --rows 1 8 64 --repeat 200
+"""
+import argparse, json, time, tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from backend.model_loader import load_bundle, prepare_features, prepare_records, project_to_canonical
+
+MODEL_PATH = "docs/malaria_mlp_model.pkl"
+META_PATH = "backend/models/model_meta.json"
+NPZ_PATH = "backend/models/malaria_mlp.npz"         # the exported weights (specs_from_env default)
+ENV_CSV = "data/raw/dhs/dhs_env.csv"
+
+def _pandas_path(records, bundle):
+    df_canon = project_to_canonical(pd.DataFrame(records), bundle.plan)
+    return prepare_features(df_canon, bundle.features, bundle.scaler)
+
+def _fast_path(records, bundle):
+    return prepare_records(records, bundle.plan, bundle.fast_scaler)
+
+PATHS = {"pandas": _pandas_path, "fast": _fast_path}
+
+def _allocations(fn, records, bundle):
+    fn(records, bundle)  # warm caches before measuring
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    fn(records, bundle)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    n_blocks = sum(s.count_diff for s in after.compare_to(before, "lineno") if s.count_diff > 0)
+    return n_blocks, peak
+
+def _latency_us(fn, records, bundle, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(records, bundle)
+        times.append((time.perf_counter() - t0) * 1e6)
+    return float(np.median(times))
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--rows", type=int, nargs="+", default=[1, 8, 64, 512])
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    bundle = load_bundle(MODEL_PATH, None, META_PATH, engine="numpy", npz_path=NPZ_PATH)
+    env = pd.read_csv(ENV_CSV, nrows=max(args.rows))
+    rows = json.loads(env.to_json(orient="records"))
+
+    results = []
+    for n in args.rows:
+        records = rows[:n]
+        ref = _pandas_path(records, bundle)
+        got = _fast_path(records, bundle)
+        max_abs_diff = float(np.max(np.abs(ref - got))) if n else 0.0
+        for name, fn in PATHS.items():
+            blocks, peak = _allocations(fn, records, bundle)
+            results.append({
+                "path": name, "rows": n,
+                "median_us": round(_latency_us(fn, records, bundle, args.repeat), 1),
+                "alloc_blocks": blocks, "peak_bytes": peak,
+                "max_abs_diff_vs_pandas": max_abs_diff,
+            })
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/bench_silver_storage.py
+"""
+Silver-layer storage: CSV vs partitioned Parquet (scripts/storage.py).
+
+The raw clinic_visits table is tiled --scale times (clinic ids made unique per
+copy, like adding clinics) and written both ways into a temp DATA_ROOT. Then:
+
+    disk_bytes      size on disk
+    write_s         df.to_csv vs write_table
+    full_s          every column, every row (read_csv vs read_table)
+    project_s       two columns (read_csv usecols vs column projection)
+    filter_s        two columns, one year of months (read_csv + mask vs pushdown)
+
+    python -m benchmarks.bench_silver_storage --scale 1 10 --repeat 5
+"""
+import argparse, json, os, sys, tempfile, time
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+RAW_VISITS = "data/raw/_manual/clinic_visits.csv"
+COLS = ["clinic_id", "total_visits"]
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return round(best, 4)
+
+def _du(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+def run(scale: int, repeat: int, base: pd.DataFrame):
+    df = pd.concat([base.assign(clinic_id=base["clinic_id"] + f"-{k}") for k in range(scale)], ignore_index=True)
+    df["month"] = pd.to_datetime(df["month"]).dt.to_period("M").dt.to_timestamp()
+    lo, hi = pd.Timestamp(date(2024, 1, 1)), pd.Timestamp(date(2025, 1, 1))
+    with tempfile.TemporaryDirectory() as root:
+        os.environ["DATA_ROOT"] = root
+        sys.modules.pop("storage", None)
+        import storage
+        csv = storage.layer_dir("silver") / "clinic_visits.csv"
+        csv.parent.mkdir(parents=True, exist_ok=True)
+
+        def read_csv_filtered():
+            d = pd.read_csv(csv, usecols=COLS + ["month"], parse_dates=["month"])
+            return d.loc[(d["month"] >= lo) & (d["month"] < hi), COLS]
+
+        out = {"rows": len(df), "csv": {}, "parquet": {}}
+        out["csv"]["write_s"] = _best(lambda: df.to_csv(csv, index=False), 1)
+        out["parquet"]["write_s"] = _best(lambda: storage.write_table(df, "clinic_visits"), 1)
+        out["csv"]["disk_bytes"] = _du(csv)
+        out["parquet"]["disk_bytes"] = _du(storage.layer_dir("silver") / "clinic_visits")
+        out["csv"]["full_s"] = _best(lambda: pd.read_csv(csv, parse_dates=["month"]), repeat)
+        out["parquet"]["full_s"] = _best(lambda: storage.read_table("clinic_visits"), repeat)
+        out["csv"]["project_s"] = _best(lambda: pd.read_csv(csv, usecols=COLS), repeat)
+        out["parquet"]["project_s"] = _best(lambda: storage.read_table("clinic_visits", columns=COLS), repeat)
+        out["csv"]["filter_s"] = _best(read_csv_filtered, repeat)
+        out["parquet"]["filter_s"] = _best(lambda: storage.read_table(
+            "clinic_visits", columns=COLS, filters=[("month", ">=", lo.date()), ("month", "<", hi.date())]), repeat)
+        assert len(read_csv_filtered()) == len(storage.read_table(
+            "clinic_visits", columns=COLS, filters=[("month", ">=", lo.date()), ("month", "<", hi.date())]))
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare CSV and Parquet silver storage.")
+    ap.add_argument("--scale", type=int, nargs="+", default=[1, 10])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+    base = pd.read_csv(RAW_VISITS)
+    print(json.dumps([run(s, args.repeat, base) for s in args.scale], indent=2))
+
+if __name__ == "__main__":
+    main()
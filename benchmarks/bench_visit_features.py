@@ -0,0 +1,95 @@
+# benchmarks/bench_visit_features.py
+"""
+Clinic × month feature building: per-clinic pandas loop vs backend/visit_features.py.
+
+    loop:        for each clinic, reindex to the calendar and shift / rolling-mean its series
+    vectorized:  build_features (dense clinic × month grid, lags and windows gathered as array views)
+    append:      append_month for one new month of every clinic, from the saved state
+
+A synthetic panel of --clinics clinics × --months months (5% of cells missing) is
+generated in memory. The loop is timed on at most --loop-clinics clinics (it is
+linear in clinics) and extrapolated.
+
+    python -m benchmarks.bench_visit_features --clinics 30000 --months 120
+"""
+import argparse, json, time
+
+import numpy as np
+import pandas as pd
+
+from backend.visit_features import LAGS, ROLL_WINDOWS, append_month, build_features
+
+def _panel(clinics: int, months: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    labels = pd.period_range("2015-01", periods=months, freq="M").strftime("%Y-%m").to_numpy()
+    ids = np.array([f"NGA-{i:06d}" for i in range(clinics)], dtype=object)
+    c = np.repeat(np.arange(clinics), months)
+    m = np.tile(np.arange(months), clinics)
+    keep = rng.random(len(c)) >= 0.05
+    c, m = c[keep], m[keep]
+    n = len(c)
+    return pd.DataFrame({
+        "clinic_id": ids[c], "month": labels[m],
+        "total_visits": rng.poisson(120, n).astype(float),
+        "available_doctors": rng.integers(0, 6, n), "available_nurses": rng.integers(1, 12, n),
+        "available_beds": rng.integers(0, 40, n), "power_availability_days": rng.integers(5, 31, n),
+        "rainfall_mm": rng.gamma(2.0, 60.0, n).round(1), "avg_temperature_c": rng.normal(28, 2, n).round(1),
+    })
+
+def loop_features(df: pd.DataFrame) -> pd.DataFrame:
+    """The straightforward version: one reindexed series per clinic."""
+    out = []
+    for clinic, g in df.groupby("clinic_id", sort=True):
+        g = g.set_index(pd.PeriodIndex(g["month"], freq="M")).sort_index()
+        full = g.reindex(pd.period_range(g.index.min(), g.index.max(), freq="M"))
+        v, r = full["total_visits"], full["rainfall_mm"]
+        f = full.assign(**{f"visits_lag{k}": v.shift(k) for k in LAGS},
+                        **{f"visits_roll{w}": v.shift(1).rolling(w, min_periods=1).mean() for w in ROLL_WINDOWS},
+                        rain_roll3=r.rolling(3, min_periods=1).mean())
+        out.append(f.loc[g.index])
+    return pd.concat(out)
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark clinic-month feature building.")
+    ap.add_argument("--clinics", type=int, default=30_000)
+    ap.add_argument("--months", type=int, default=120)
+    ap.add_argument("--loop-clinics", type=int, default=1_000)
+    args = ap.parse_args()
+
+    df = _panel(args.clinics, args.months)
+    last = df["month"].max()
+    history, new = df[df["month"] < last], df[df["month"] == last]
+
+    t0 = time.perf_counter()
+    feats, state = build_features(history)
+    vec_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    appended = append_month(state, new)
+    append_s = time.perf_counter() - t0
+
+    sample = history[history["clinic_id"].isin(np.unique(history["clinic_id"])[: args.loop_clinics])]
+    t0 = time.perf_counter()
+    ref = loop_features(sample)
+    loop_s = time.perf_counter() - t0
+    got = feats[feats["clinic_id"].isin(set(sample["clinic_id"]))]
+    for k in ("visits_lag12", "visits_roll12", "rain_roll3"):
+        np.testing.assert_allclose(got[k].to_numpy(), ref[k].to_numpy(), equal_nan=True)
+
+    clinics_timed = sample["clinic_id"].nunique()
+    loop_est = loop_s * args.clinics / clinics_timed
+    print(json.dumps({
+        "clinics": args.clinics,
+        "months": args.months,
+        "rows": len(history),
+        "vectorized_s": round(vec_s, 3),
+        "vectorized_rows_per_s": round(len(history) / vec_s),
+        "append_month_rows": len(appended),
+        "append_month_s": round(append_s, 4),
+        "loop_clinics_timed": clinics_timed,
+        "loop_est_s": round(loop_est, 1),
+        "speedup": round(loop_est / vec_s, 1),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/bench_visit_forecast.py
+"""
+Visit forecasts: one batched pass for all clinics vs forecasting per request.
+
+    batch:      build_forecasts (fit + every clinic's 1..12 month forecast, written to disk)
+    read:       ForecastTable.get for one clinic, what GET /forecast/visits does
+    recompute:  ForecastTable.recompute for one clinic, the on-demand path
+
+The panel is the synthetic one from bench_visit_features (--clinics × --months).
+"per_request_all_s" is what forecasting every clinic through the single-clinic
+path would cost.
+
+    python -m benchmarks.bench_visit_forecast --clinics 30000 --months 120
+"""
+import argparse, json, tempfile, time
+from pathlib import Path
+
+import numpy as np
+
+from backend.forecast import ForecastTable, build_forecasts
+from benchmarks.bench_visit_features import _panel
+
+def _us(samples) -> dict:
+    a = np.asarray(samples) * 1e6
+    return {"p50_us": round(float(np.percentile(a, 50)), 1), "p99_us": round(float(np.percentile(a, 99)), 1)}
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark batched visit forecasting and table reads.")
+    ap.add_argument("--clinics", type=int, default=30_000)
+    ap.add_argument("--months", type=int, default=120)
+    ap.add_argument("--reads", type=int, default=20_000)
+    ap.add_argument("--recomputes", type=int, default=1_000)
+    args = ap.parse_args()
+
+    df = _panel(args.clinics, args.months)[["clinic_id", "month", "total_visits"]]
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        res = build_forecasts(Path(tmp) / "visits", df)
+        batch_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        table = ForecastTable.open(Path(tmp) / "visits")
+        open_s = time.perf_counter() - t0
+
+    ids = list(table.positions)
+    picks = [ids[i] for i in rng.integers(0, len(ids), args.reads)]
+    reads = []
+    for c in picks:
+        t0 = time.perf_counter()
+        table.get(c)
+        reads.append(time.perf_counter() - t0)
+    recomputes = []
+    for c in picks[: args.recomputes]:
+        t0 = time.perf_counter()
+        table.recompute(c)
+        recomputes.append(time.perf_counter() - t0)
+    assert table.recompute(picks[0])["visits"] == table.get(picks[0])["visits"]
+
+    print(json.dumps({
+        "clinics": res["clinics"],
+        "months": args.months,
+        "horizon": res["horizon"],
+        "batch_s": round(batch_s, 2),
+        "fit_s": res["fit_s"],
+        "predict_all_s": res["predict_s"],
+        "open_s": round(open_s, 3),
+        "read": _us(reads),
+        "recompute": _us(recomputes),
+        "per_request_all_s": round(float(np.mean(recomputes)) * res["clinics"], 1),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
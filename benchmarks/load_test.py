@@ -0,0 +1,225 @@
+# benchmarks/load_test.py
+"""
+Load test for the predict API, with a regression check between two runs.
+
+Payloads are real rows from data/raw/dhs/dhs_env.csv (all the year-suffixed keys a
+client sends). For every (concurrency, batch size) pair, that many client threads
+post /api/v1/predict back to back for --duration seconds. The report is JSON with
+throughput and p50/p95/p99 latency per pair.
+
+    # start backend.app:app in-process (uvicorn on a free port) and write a report
+    python -m benchmarks.load_test run --concurrency 1 8 32 --batch 1 16 256 --out bench_output.json
+
+    # or hit a server that is already running
+    python -m benchmarks.load_test run --url http://localhost:8000 --out new.json
+
+    # compare: exit code 1 if any pair got slower / lost throughput beyond --tolerance
+    python -m benchmarks.load_test compare base.json new.json --tolerance 0.10
+"""
+import argparse, json, os, platform, socket, sys, threading, time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import requests
+
+ENV_CSV = "data/raw/dhs/dhs_env.csv"
+PREDICT_PATH = "/api/v1/predict"
+
+# ---------- server ----------
+class InProcessServer:
+    """backend.app:app under uvicorn in a background thread of this process."""
+    def __init__(self, host: str = "127.0.0.1"):
+        import uvicorn
+        with socket.socket() as s:
+            s.bind((host, 0))
+            self.port = s.getsockname()[1]
+        config = uvicorn.Config("backend.app:app", host=host, port=self.port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, name="bench-uvicorn", daemon=True)
+        self.url = f"http://{host}:{self.port}"
+
+    def __enter__(self):
+        self.thread.start()
+        deadline = time.time() + 120
+        while not self.server.started:
+            if time.time() > deadline or not self.thread.is_alive():
+                raise RuntimeError("in-process server did not start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=30)
+
+def wait_ready(url: str, timeout_s: float = 120.0) -> None:
+    """Health first, then one tiny predict so model loading isn't measured."""
+    deadline = time.time() + timeout_s
+    while True:
+        try:
+            if requests.get(f"{url}/api/v1/health", timeout=2).ok:
+                feats = requests.get(f"{url}/api/v1/model_meta", timeout=5).json()["features"]
+                r = requests.post(f"{url}{PREDICT_PATH}", json={"records": [{f: 0 for f in feats}]}, timeout=120)
+                if r.ok:
+                    return
+        except requests.RequestException:
+            pass
+        if time.time() > deadline:
+            raise RuntimeError(f"{url} not ready after {timeout_s}s")
+        time.sleep(0.5)
+
+# ---------- load ----------
+def build_payloads(batch_size: int, n_payloads: int = 64, seed: int = 0) -> List[bytes]:
+    env = pd.read_csv(ENV_CSV)
+    rows = json.loads(env.to_json(orient="records"))
+    rng = np.random.default_rng(seed)
+    return [
+        json.dumps({"records": [rows[i] for i in rng.integers(0, len(rows), batch_size)]}).encode("utf-8")
+        for _ in range(n_payloads)
+    ]
+
+def run_level(url: str, concurrency: int, batch_size: int, duration_s: float, warmup_s: float) -> Dict:
+    payloads = build_payloads(batch_size)
+    latencies: List[List[float]] = [[] for _ in range(concurrency)]
+    statuses: List[Dict[str, int]] = [{} for _ in range(concurrency)]
+    start = time.perf_counter()
+    measure_from, stop_at = start + warmup_s, start + warmup_s + duration_s
+
+    def client(k: int):
+        sess = requests.Session()
+        headers = {"Content-Type": "application/json"}
+        i = k
+        while True:
+            t0 = time.perf_counter()
+            if t0 >= stop_at:
+                return
+            try:
+                code = str(sess.post(f"{url}{PREDICT_PATH}", data=payloads[i % len(payloads)], headers=headers, timeout=60).status_code)
+            except requests.RequestException:
+                code = "error"
+            t1 = time.perf_counter()
+            i += concurrency
+            if t0 >= measure_from:
+                statuses[k][code] = statuses[k].get(code, 0) + 1
+                if code == "200":
+                    latencies[k].append((t1 - t0) * 1000.0)
+
+    threads = [threading.Thread(target=client, args=(k,)) for k in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    lat = np.array([x for per in latencies for x in per])
+    status_counts: Dict[str, int] = {}
+    for per in statuses:
+        for code, n in per.items():
+            status_counts[code] = status_counts.get(code, 0) + n
+    n_ok = int(len(lat))
+    pct = lambda q: round(float(np.percentile(lat, q)), 3) if n_ok else None
+    return {
+        "concurrency": concurrency,
+        "batch_size": batch_size,
+        "requests": sum(status_counts.values()),
+        "ok": n_ok,
+        "status_counts": status_counts,
+        "throughput_rps": round(n_ok / duration_s, 2),
+        "throughput_rows_per_s": round(n_ok * batch_size / duration_s, 2),
+        "latency_ms": {"p50": pct(50), "p95": pct(95), "p99": pct(99), "max": pct(100),
+                       "mean": round(float(lat.mean()), 3) if n_ok else None},
+    }
+
+def run(args) -> Dict:
+    def levels(url):
+        wait_ready(url)
+        out = []
+        for c in args.concurrency:
+            for b in args.batch:
+                res = run_level(url, c, b, args.duration, args.warmup)
+                print(f"[BENCH] c={c:<4} batch={b:<5} {res['throughput_rps']:>9} req/s  "
+                      f"p50={res['latency_ms']['p50']}ms p99={res['latency_ms']['p99']}ms", file=sys.stderr)
+                out.append(res)
+        return out
+
+    if args.url:
+        results = levels(args.url.rstrip("/"))
+    else:
+        with InProcessServer() as srv:
+            results = levels(srv.url)
+    return {
+        "meta": {
+            "target": args.url or "in-process",
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "env": {k: v for k, v in os.environ.items()
+                    if k.startswith(("MODEL_", "BATCH", "PREDICT_CACHE", "INFERENCE_"))},
+        },
+        "results": results,
+    }
+
+# ---------- compare ----------
+def compare(base: Dict, new: Dict, tolerance: float) -> Dict:
+    """Pairs whose p50/p95/p99 grew or throughput fell by more than `tolerance` (fraction)."""
+    key = lambda r: (r["concurrency"], r["batch_size"])
+    base_by = {key(r): r for r in base["results"]}
+    rows, regressions = [], []
+    for r in new["results"]:
+        b = base_by.get(key(r))
+        if b is None:
+            continue
+        row = {"concurrency": r["concurrency"], "batch_size": r["batch_size"], "changes": {}}
+        checks = [(f"latency_{q}", b["latency_ms"][q], r["latency_ms"][q], +1) for q in ("p50", "p95", "p99")]
+        checks.append(("throughput_rps", b["throughput_rps"], r["throughput_rps"], -1))
+        for name, old, cur, worse_sign in checks:
+            if not old or cur is None:
+                continue
+            change = (cur - old) / old
+            row["changes"][name] = {"base": old, "new": cur, "change": round(change, 4)}
+            if change * worse_sign > tolerance:
+                regressions.append({"concurrency": r["concurrency"], "batch_size": r["batch_size"],
+                                    "metric": name, "base": old, "new": cur, "change": round(change, 4)})
+        rows.append(row)
+    return {"tolerance": tolerance, "compared": rows, "regressions": regressions}
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Load test / latency benchmark for the predict API.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_run = sub.add_parser("run", help="Replay dhs_env.csv payloads and report throughput/latency")
+    p_run.add_argument("--url", default=None, help="Running server; default starts backend.app:app in-process")
+    p_run.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    p_run.add_argument("--batch", type=int, nargs="+", default=[1, 16, 256])
+    p_run.add_argument("--duration", type=float, default=10.0, help="Measured seconds per level")
+    p_run.add_argument("--warmup", type=float, default=1.0, help="Unmeasured seconds per level")
+    p_run.add_argument("--out", default=None, help="Write the JSON report here (stdout otherwise)")
+    p_cmp = sub.add_parser("compare", help="Flag regressions of NEW against BASE")
+    p_cmp.add_argument("base")
+    p_cmp.add_argument("new")
+    p_cmp.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    if args.cmd == "run":
+        report = run(args)
+        text = json.dumps(report, indent=2)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+            print(f"[OK] wrote {args.out}", file=sys.stderr)
+        else:
+            print(text)
+    else:
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.new, encoding="utf-8") as f:
+            new = json.load(f)
+        result = compare(base, new, args.tolerance)
+        print(json.dumps(result, indent=2))
+        if result["regressions"]:
+            print(f"[FAIL] {len(result['regressions'])} regression(s) beyond {args.tolerance:.0%}", file=sys.stderr)
+            sys.exit(1)
+        print("[OK] no regressions", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
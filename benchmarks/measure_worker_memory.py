@@ -0,0 +1,71 @@
+# benchmarks/measure_worker_memory.py
+"""
+Per-worker memory with private vs memory-mapped model weights.
+
+Starts N worker processes per engine (spawned, like separate uvicorn/gunicorn
+workers), has each one import the app, load the default model and score a batch,
+then holds them all alive together while reading /proc/<pid>/smaps_rollup (Linux).
+
+    rss_kb      everything resident in the worker, shared pages counted in full
+    pss_kb      shared pages split across the processes mapping them
+    private_kb  pages only this worker has (what each extra worker really costs)
+
+    python -m benchmarks.measure_worker_memory --workers 1 2 4 8 --engines numpy mmap
+"""
+import argparse, json, os, multiprocessing as mp
+
+def _smaps_rollup(pid: int):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss_kb": fields.get("Rss", 0),
+        "pss_kb": fields.get("Pss", 0),
+        "private_kb": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+        "shared_kb": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+    }
+
+def _worker(engine: str, mmap_dir: str, ready, release):
+    os.environ.update(MODEL_ENGINE=engine, MODEL_MMAP_DIR=mmap_dir, MODEL_PRELOAD="lazy", MODEL_RELOAD_POLL_S="0")
+    import numpy as np
+    from backend.routers.predict import REGISTRY
+    m = REGISTRY.get()
+    m.forward(np.zeros((64, len(m.bundle.features)), dtype=np.float32))
+    ready.wait()        # everyone loaded: now the numbers reflect N live workers
+    release.wait()
+
+def measure(engine: str, n_workers: int, mmap_dir: str):
+    ctx = mp.get_context("spawn")
+    ready, release = ctx.Barrier(n_workers + 1), ctx.Barrier(n_workers + 1)
+    procs = [ctx.Process(target=_worker, args=(engine, mmap_dir, ready, release)) for _ in range(n_workers)]
+    for p in procs:
+        p.start()
+    try:
+        ready.wait(timeout=300)
+        per_worker = [_smaps_rollup(p.pid) for p in procs]
+    finally:
+        release.wait(timeout=60)
+        for p in procs:
+            p.join()
+    def mean(key):
+        return round(sum(w[key] for w in per_worker) / n_workers)
+    return {
+        "engine": engine, "workers": n_workers,
+        "mean_rss_kb": mean("rss_kb"), "mean_pss_kb": mean("pss_kb"),
+        "mean_private_kb": mean("private_kb"), "total_pss_kb": sum(w["pss_kb"] for w in per_worker),
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare per-worker memory across model engines.")
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 4])
+    ap.add_argument("--engines", nargs="+", default=["numpy", "mmap"])
+    ap.add_argument("--mmap-dir", default=os.getenv("MODEL_MMAP_DIR", "backend/models/mmap"))
+    args = ap.parse_args()
+    results = [measure(e, n, args.mmap_dir) for e in args.engines for n in sorted(set(args.workers))]
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
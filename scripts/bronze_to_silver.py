@@ -9,32 +9,39 @@ DATA_ROOT = Path(os.getenv("DATA_ROOT", "./data"))
 RAW_DIR = DATA_ROOT / "raw" / "_manual"
 SILVER_DIR = DATA_ROOT / "processed" / "silver"
 SILVER_DIR.mkdir(parents=True, exist_ok=True)
+# parquet | csv | both; "both" until notebooks and other readers of silver/*.csv move to Parquet
+SILVER_FORMAT = os.getenv("SILVER_FORMAT", "both")
 
-def to_month(v):
-    try:
-        return pd.to_datetime(v).to_period("M").to_timestamp()
-    except Exception:
-        return pd.NaT
+from storage import write_table  # noqa: E402  (reads DATA_ROOT after load_dotenv)
+from dates import normalize_dates  # noqa: E402
+
+def normalize_column(df, table, col, unit="M"):
+    """Vectorized date parse of df[col] in place; warns about values that couldn't be parsed."""
+    if col in df.columns:
+        df[col], report = normalize_dates(df[col], unit=unit, name=f"{table}.{col}")
+        report.warn()
 
 def save_silver(name, df):
-    out = SILVER_DIR / f"{name}.csv"
-    df.to_csv(out, index=False)
-    print(f"[SILVER] wrote {out} ({len(df)} rows)")
+    if SILVER_FORMAT in ("parquet", "both"):
+        out = write_table(df, name, layer="silver")
+        print(f"[SILVER] wrote {out}/ ({len(df)} rows, parquet)")
+    if SILVER_FORMAT in ("csv", "both"):
+        out = SILVER_DIR / f"{name}.csv"
+        df.to_csv(out, index=False)
+        print(f"[SILVER] wrote {out} ({len(df)} rows)")
 
 def process_clinic_visits():
     f = RAW_DIR / "clinic_visits.csv"
     if not f.exists(): return
     df = pd.read_csv(f)
-    if "month" in df.columns:
-        df["month"] = df["month"].apply(to_month)
+    normalize_column(df, "clinic_visits", "month")
     save_silver("clinic_visits", df)
 
 def process_medicine_stock():
     f = RAW_DIR / "medicine_stock.csv"
     if not f.exists(): return
     df = pd.read_csv(f)
-    if "month" in df.columns:
-        df["month"] = df["month"].apply(to_month)
+    normalize_column(df, "medicine_stock", "month")
     save_silver("medicine_stock", df)
 
 def process_symptom_triage():
@@ -43,7 +50,8 @@ def process_symptom_triage():
     df = pd.read_csv(f)
     # normalize date column if present
     if "date" in df.columns:
-        df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.date
+        normalize_column(df, "symptom_triage", "date", unit="D")
+        df["date"] = df["date"].dt.date
     save_silver("symptom_triage", df)
 
 def process_clinic_geo():
@@ -0,0 +1,78 @@
+# scripts/build_clinic_month_features.py
+"""
+Build gold/clinic_month_features from silver clinic_visits (features described in
+backend/visit_features.py): visit lags and rolling means, month of year,
+rainfall / temperature and staffing per clinic and month.
+
+The per-clinic history the next month needs is kept next to the table
+(gold/.clinic_month_features_state.npz). When the state exists and silver only
+gained later months, those months are computed from the state and added as new
+partitions; history isn't re-read or rewritten. --rebuild (or any back-filled
+month, or a changed value in an old one) recomputes the whole table.
+"""
+import argparse, os, sys, time
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+DATA_ROOT = Path(os.getenv("DATA_ROOT", "./data"))
+GOLD_DIR = DATA_ROOT / "processed" / "gold"
+STATE = GOLD_DIR / ".clinic_month_features_state.npz"
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from backend.visit_features import (FeatureState, append_month, build_features, history_digest,  # noqa: E402
+                                    keyed, month_index, month_label)
+from storage import append_table, read_table, write_table  # noqa: E402
+
+TABLE = "clinic_month_features"
+COLUMNS = ["clinic_id", "month", "total_visits", "available_doctors", "available_nurses", "available_beds",
+           "power_availability_days", "rainfall_mm", "avg_temperature_c"]
+
+def _rebuild(visits, state_path):
+    feats, state = build_features(visits)
+    write_table(feats, TABLE, layer="gold")
+    state.save(state_path)
+    return feats
+
+def main():
+    ap = argparse.ArgumentParser(description="Build the clinic x month feature table (gold layer).")
+    ap.add_argument("--rebuild", action="store_true", help="Recompute every month instead of appending new ones")
+    ap.add_argument("--state", type=Path, default=STATE)
+    args = ap.parse_args()
+
+    t = time.perf_counter()
+    visits = keyed(read_table("clinic_visits", columns=COLUMNS))
+    months = month_index(visits["month"])
+    table_exists = (GOLD_DIR / TABLE).is_dir()
+    state = None
+    if not args.rebuild and table_exists and args.state.exists():
+        try:
+            state = FeatureState.load(args.state)
+        except ValueError as e:
+            print(f"[WARN] {e}")
+    if state is None:
+        feats = _rebuild(visits, args.state)
+        print(f"[OK] {TABLE}: built {len(feats):,} rows in {time.perf_counter() - t:.1f}s")
+        return
+
+    # appending is only valid if nothing at or before the state's last month changed:
+    # a corrected value, a back-filled row or a dropped one changes the digest -> rebuild
+    old = months <= state.last_month
+    if history_digest(visits[old]) != state.digest:
+        feats = _rebuild(visits, args.state)
+        print(f"[OK] {TABLE}: history up to {month_label([state.last_month])[0]} changed, rebuilt {len(feats):,} rows "
+              f"in {time.perf_counter() - t:.1f}s")
+        return
+    new = visits[~old]
+    added = 0
+    for m in sorted(set(months[~old].tolist())):
+        feats = append_month(state, new[months[~old] == m])
+        append_table(feats, TABLE, layer="gold")
+        added += len(feats)
+        print(f"  + {month_label([m])[0]}: {len(feats):,} rows")
+    state.save(args.state)
+    mode = "appended" if added else "unchanged"
+    print(f"[OK] {TABLE}: {mode} (+{added:,} rows) in {time.perf_counter() - t:.1f}s")
+
+if __name__ == "__main__":
+    main()
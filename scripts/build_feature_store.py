@@ -0,0 +1,47 @@
+# scripts/build_feature_store.py
+"""
+Update the history feature stores the API reads prev_lag1 / prev_roll3 from
+(see backend/feature_store.py):
+
+    state_year     prevalence per State per survey year -> prev_lag1, prev_roll3
+    clinic_month   total_visits per clinic per month    -> visits_lag1, visits_roll3
+
+Only periods newer than what a store already holds are appended; --rebuild
+recomputes everything.
+"""
+import argparse, os, sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+DATA_ROOT = Path(os.getenv("DATA_ROOT", "./data"))
+SILVER_DIR = DATA_ROOT / "processed" / "silver"
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from backend.feature_store import update_store, FEATURE_STORE_DIR  # noqa: E402
+from storage import read_table  # noqa: E402
+
+# store name -> (silver table, entity field, period field, value, features, period key width)
+STORES = {
+    "state_year": ("malaria_prevalence_state_year", "State", "year", "prevalence", ("prev_lag1", "prev_roll3"), None),
+    "clinic_month": ("clinic_visits", "clinic_id", "month", "total_visits", ("visits_lag1", "visits_roll3"), 7),
+}
+
+def main():
+    ap = argparse.ArgumentParser(description="Append new periods to the lag / rolling feature stores.")
+    ap.add_argument("--rebuild", action="store_true", help="Recompute every store from scratch")
+    ap.add_argument("--out", type=Path, default=FEATURE_STORE_DIR)
+    args = ap.parse_args()
+
+    for name, (table, entity, period, value, features, width) in STORES.items():
+        try:
+            df = read_table(table, columns=[entity, period, value])
+        except FileNotFoundError:
+            print(f"[WARN] {name}: no silver table '{table}', skipped")
+            continue
+        res = update_store(args.out / name, df, entity, period, value, features, period_width=width, rebuild=args.rebuild)
+        print(f"[OK] {name}: {res['mode']} (+{res['periods_added']} periods) "
+              f"-> {res['entities']} entities x {res['periods']} periods at {args.out / name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+# scripts/build_visit_forecasts.py
+"""
+Refit the visit forecaster on silver clinic_visits and precompute 1..horizon
+month forecasts for every clinic (backend/forecast.py). The API picks the new
+table up from FORECAST_DIR without a restart.
+"""
+import argparse, sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from backend.forecast import FORECAST_DIR, FORECAST_HORIZON, FORECAST_RIDGE, FORECAST_TRAIN_ORIGINS, build_forecasts  # noqa: E402
+from storage import read_table  # noqa: E402
+
+def main():
+    ap = argparse.ArgumentParser(description="Precompute multi-horizon visit forecasts for all clinics.")
+    ap.add_argument("--horizon", type=int, default=FORECAST_HORIZON, help="Months ahead to forecast")
+    ap.add_argument("--origins", type=int, default=FORECAST_TRAIN_ORIGINS, help="Most recent forecast origins to fit on")
+    ap.add_argument("--ridge", type=float, default=FORECAST_RIDGE)
+    ap.add_argument("--out", type=Path, default=FORECAST_DIR)
+    args = ap.parse_args()
+
+    visits = read_table("clinic_visits", columns=["clinic_id", "month", "total_visits"])
+    res = build_forecasts(args.out, visits, horizon=args.horizon, origins=args.origins, ridge=args.ridge)
+    print(f"[OK] visit forecasts: {res['clinics']:,} clinics x {res['horizon']} months from {res['origin']} "
+          f"({res['model_version']}, fit {res['fit_s']}s on {res['train_rows']:,} rows, predict {res['predict_s']}s) -> {args.out}")
+    print(f"     in-sample relative RMSE by horizon: {res['rel_rmse']}")
+
+if __name__ == "__main__":
+    main()
@@ -17,17 +17,23 @@ Usage (example):
         --dta2010 data/raw/NG_2010_MIS/NGPR61DT/NGPR61FL.DTA \
         --dta2015 data/raw/NG_2015_MIS/NGPR71DT/NGPR71FL.DTA \
         --dta2021 data/raw/NG_2021_MIS/NGPR81DT/NGPR81FL.DTA \
-        --outdir data/processed
+        --outdir data/processed \
+        --chunksize 200000 --workers 3
 
 Notes:
 - 2010 & 2015 use state code `shstate` directly.
 - 2021 uses `hv024`*10 to align with the same REGCODE scale as older years.
 - hml35: malaria RDT result (1=positive, 0=negative). We keep only {0,1}.
+- Each survey year is read in its own worker process, only the columns below and
+  `--chunksize` rows at a time. Cleaned chunks are appended to a per-year part file
+  and prevalence is built from per-chunk counts, so peak memory follows the chunk
+  size, not the file size.
 
 Author: Emmanuel
 """
 
-import argparse
+import argparse, os, shutil
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import pandas as pd
 try:
@@ -48,12 +54,25 @@ REGCODE_STATE = {
 }
 
 
+# Raw DHS columns clean_year needs (plus the year's region column)
+BASE_COLUMNS = ["hml35", "hv005", "hv001", "hv105"]
+DEFAULT_CHUNKSIZE = 200_000
+
+
 def read_dta(path: Path) -> pd.DataFrame:
     """Read a Stata .dta file into a pandas DataFrame."""
     df, _meta = pyreadstat.read_dta(str(path))
     return df
 
 
+def iter_dta_chunks(path: Path, columns, chunksize: int = DEFAULT_CHUNKSIZE):
+    """Yield DataFrames of at most `chunksize` rows holding only `columns`."""
+    for chunk, _meta in pyreadstat.read_file_in_chunks(
+        pyreadstat.read_dta, str(path), chunksize=chunksize, usecols=list(columns)
+    ):
+        yield chunk
+
+
 def clean_year(df: pd.DataFrame, year: int, reg_col: str) -> pd.DataFrame:
     """
     Clean a DHS MIS dataframe to the columns used downstream.
@@ -91,64 +110,114 @@ def compute_state_year_prevalence(df_individual: pd.DataFrame) -> pd.DataFrame:
     """
     Given individual-level records with binary status (0/1), compute state-year prevalence.
     """
+    return finalize_prevalence([prevalence_counts(df_individual)])
+
+
+def prevalence_counts(df_individual: pd.DataFrame) -> pd.DataFrame:
+    """Per (State, year) sums for one chunk of individual records; add chunks up with finalize_prevalence."""
     # Map state names
     df_individual = df_individual.copy()
     df_individual["State"] = df_individual["REGCODE"].map(REGCODE_STATE)
 
     # Group and aggregate
-    grp = (
+    return (
         df_individual
         .dropna(subset=["REGCODE"])
         .groupby(["State", "year"], as_index=False)
         .agg(
-            REGCODE=("REGCODE", "mean"),   # mean is fine since REGCODE is constant within group
+            REGCODE_sum=("REGCODE", "sum"),
+            REGCODE_n=("REGCODE", "count"),
             y=("status", "sum"),           # total positives
             n=("status", "count")          # total tested
         )
     )
+
+
+def finalize_prevalence(counts) -> pd.DataFrame:
+    """Combine prevalence_counts() outputs into the state-year prevalence table."""
+    grp = (
+        pd.concat([c for c in counts if c is not None], ignore_index=True)
+        .groupby(["State", "year"], as_index=False)
+        .sum()
+    )
+    # mean is fine since REGCODE is constant within group
+    grp["REGCODE"] = grp["REGCODE_sum"] / grp["REGCODE_n"]
     grp["prevalence"] = grp["y"] / grp["n"]
     grp["state_id"] = grp["REGCODE"] / 10.0
     grp = grp[["state_id", "State", "year", "y", "n", "prevalence"]].sort_values(["year", "state_id"]).reset_index(drop=True)
     return grp
 
 
+def clean_year_to_part(path: Path, year: int, reg_col: str, part_path: Path, chunksize: int = DEFAULT_CHUNKSIZE):
+    """
+    Worker: stream one survey year through clean_year chunk by chunk into `part_path` (CSV).
+    Returns (year, rows written, prevalence counts for the year).
+    """
+    rows, counts, header_written = 0, [], False
+    with open(part_path, "w", newline="", encoding="utf-8") as f:
+        for chunk in iter_dta_chunks(path, BASE_COLUMNS + [reg_col], chunksize):
+            cleaned = clean_year(chunk, year, reg_col=reg_col)
+            # the header goes out with the first chunk, even if that chunk cleans to no rows
+            cleaned.to_csv(f, index=False, header=not header_written)
+            header_written = True
+            rows += len(cleaned)
+            counts.append(prevalence_counts(cleaned))
+    print(f"[INFO] Cleaned {year}: {rows} records")
+    return year, rows, (pd.concat(counts, ignore_index=True) if counts else None)
+
+
+def concat_parts(parts, out_path: Path) -> None:
+    """Concatenate per-year CSV parts into one file, keeping only the first header."""
+    header_written = False
+    with open(out_path, "w", newline="", encoding="utf-8") as out:
+        for part in parts:
+            with open(part, "r", encoding="utf-8") as f:
+                header = f.readline()
+                if not header:
+                    continue
+                if not header_written:
+                    out.write(header)
+                    header_written = True
+                shutil.copyfileobj(f, out)
+            os.remove(part)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Clean & merge Nigeria DHS MIS malaria datasets.")
     parser.add_argument("--dta2010", required=True, type=Path, help="Path to NGPR61FL.DTA (2010 MIS)")
     parser.add_argument("--dta2015", required=True, type=Path, help="Path to NGPR71FL.DTA (2015 MIS)")
     parser.add_argument("--dta2021", required=True, type=Path, help="Path to NGPR81FL.DTA (2021 MIS)")
     parser.add_argument("--outdir", required=True, type=Path, help="Output directory for CSVs")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Rows read per chunk")
+    parser.add_argument("--workers", type=int, default=3, help="Worker processes (one survey year each)")
     args = parser.parse_args()
 
     outdir = args.outdir
     outdir.mkdir(parents=True, exist_ok=True)
 
-    # ---- Load raw DTA files ----
-    print("[INFO] Reading DTA files...")
-    df10 = read_dta(args.dta2010)
-    df15 = read_dta(args.dta2015)
-    df21 = read_dta(args.dta2021)
-
-    # ---- Clean per year ----
-    print("[INFO] Cleaning 2010...")
-    d10 = clean_year(df10, 2010, reg_col="shstate")
-    print("[INFO] Cleaning 2015...")
-    d15 = clean_year(df15, 2015, reg_col="shstate")
-    print("[INFO] Cleaning 2021...")
-    d21 = clean_year(df21, 2021, reg_col="hv024")
-
-    # ---- Concatenate all years ----
-    print("[INFO] Concatenating years...")
-    malaria_data = pd.concat([d10, d15, d21], ignore_index=True)
-
-    # ---- Save individual-level tidy data ----
+    # ---- Clean each survey year in its own process, streaming chunks to a part file ----
+    surveys = [
+        (args.dta2010, 2010, "shstate"),
+        (args.dta2015, 2015, "shstate"),
+        (args.dta2021, 2021, "hv024"),
+    ]
+    print(f"[INFO] Cleaning {len(surveys)} survey years ({args.workers} workers, {args.chunksize} rows/chunk)...")
+    parts = [outdir / f".malaria_individual_records.{year}.part.csv" for _, year, _ in surveys]
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [
+            pool.submit(clean_year_to_part, path, year, reg_col, part, args.chunksize)
+            for (path, year, reg_col), part in zip(surveys, parts)
+        ]
+        results = [f.result() for f in futures]
+
+    # ---- Save individual-level tidy data (years in order, as before) ----
     indiv_out = outdir / "malaria_individual_records.csv"
-    malaria_data.to_csv(indiv_out, index=False)
+    concat_parts(parts, indiv_out)
     print(f"[OK] Saved individual-level CSV → {indiv_out}")
 
     # ---- Compute and save state-year prevalence ----
     print("[INFO] Computing prevalence by state-year...")
-    prevalence = compute_state_year_prevalence(malaria_data)
+    prevalence = finalize_prevalence(counts for _, _, counts in results)
 
     prev_out = outdir / "malaria_prevalence_state_year.csv"
     prevalence.to_csv(prev_out, index=False)
@@ -157,7 +226,7 @@ def main():
     # ---- Quick sanity summary ----
     print("\n=== Quick Summary ===")
     print("Records by year:")
-    print(malaria_data.groupby('year').size())
+    print(pd.Series({year: rows for year, rows, _ in results}, name="records"))
     print("\nPreview of prevalence:")
     print(prevalence.head(10))
 
@@ -0,0 +1,117 @@
+# scripts/dates.py
+"""
+Vectorized date normalization for the silver processors.
+
+Raw month / date columns hold a few dozen distinct values repeated over millions
+of rows, so each distinct value is parsed once: the column is factorized, the
+uniques are matched against FORMATS in order (one vectorized to_datetime per
+format, each only on what is still unparsed), anything left goes through pandas'
+own parser one value at a time, and the parsed uniques are scattered back to rows
+by their codes.
+
+    month, report = normalize_dates(df["month"], unit="M", name="clinic_visits.month")
+    report.warn()      # prints rows / distinct values that could not be parsed
+
+Ambiguous slash dates like 03/04/2024 are read month-first (March 4), as pandas
+did in the original per-row parse. For sources that write day-first (3 April), set
+DATE_DAYFIRST=1 or pass dayfirst=True.
+"""
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+FORMATS = [
+    "%Y-%m",
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y/%m",
+    "%Y/%m/%d",
+    "%Y%m",
+    "%Y%m%d",
+    "%m/%d/%Y",
+    "%d/%m/%Y",
+    "%m/%Y",
+    "%b %Y",
+    "%B %Y",
+    "%b-%y",
+]
+DAY_FIRST = ("%d/%m/%Y", "%m/%d/%Y")      # swapped when dayfirst
+DATE_DAYFIRST = os.getenv("DATE_DAYFIRST", "0").lower() in ("1", "true", "yes")
+
+def formats(dayfirst: bool = False) -> List[str]:
+    """FORMATS in the order they are tried."""
+    if not dayfirst:
+        return list(FORMATS)
+    swap = {DAY_FIRST[1]: DAY_FIRST[0], DAY_FIRST[0]: DAY_FIRST[1]}
+    return [swap.get(f, f) for f in FORMATS]
+
+@dataclass
+class DateReport:
+    name: str
+    rows: int = 0
+    distinct: int = 0
+    null_rows: int = 0
+    bad_rows: int = 0
+    formats: Dict[str, int] = field(default_factory=dict)      # format -> distinct values it parsed
+    bad_values: List[Tuple[str, int]] = field(default_factory=list)   # (value, rows), most frequent first
+
+    def warn(self, limit: int = 10) -> None:
+        if self.bad_rows:
+            sample = ", ".join(f"{v!r} x{n}" for v, n in self.bad_values[:limit])
+            print(f"[WARN] {self.name}: {self.bad_rows} of {self.rows} rows unparseable "
+                  f"({len(self.bad_values)} distinct): {sample}")
+
+def _parse_uniques(uniques: pd.Index, report: DateReport, dayfirst: bool) -> pd.Series:
+    text = pd.Series(uniques.astype(str), dtype=object)
+    parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+    todo = text.str.strip()
+    for fmt in formats(dayfirst):
+        if todo.empty:
+            break
+        hit = pd.to_datetime(todo, format=fmt, errors="coerce")
+        ok = hit.notna()
+        if ok.any():
+            parsed[ok[ok].index] = hit[ok]
+            report.formats[fmt] = int(ok.sum())
+            todo = todo[~ok]
+    # whatever no explicit format matched: pandas' inference, one distinct value at a time
+    inferred = 0
+    for i, v in todo.items():
+        try:
+            parsed[i] = pd.Timestamp(pd.to_datetime(v, dayfirst=dayfirst)).tz_localize(None)
+            inferred += 1
+        except (ValueError, TypeError, OverflowError):
+            pass
+    if inferred:
+        report.formats["inferred"] = inferred
+    return parsed
+
+def normalize_dates(values: pd.Series, unit: str = "M", name: str = "date",
+                    dayfirst: Optional[bool] = None) -> Tuple[pd.Series, DateReport]:
+    """
+    Parse `values` to datetime64, truncated to the month start (unit "M") or the day
+    ("D"). Unparseable values become NaT and are listed in the returned report.
+    dayfirst (default DATE_DAYFIRST) reads 03/04/2024 as 3 April instead of March 4.
+    """
+    report = DateReport(name=name, rows=len(values))
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    report.distinct = len(uniques)
+    parsed = _parse_uniques(pd.Index(uniques), report, DATE_DAYFIRST if dayfirst is None else dayfirst)
+    parsed = parsed.dt.to_period("M").dt.to_timestamp() if unit == "M" else parsed.dt.normalize()
+
+    lut = parsed.to_numpy(dtype="datetime64[ns]")
+    out = np.full(len(codes), np.datetime64("NaT"), dtype="datetime64[ns]")
+    valid = codes >= 0
+    out[valid] = lut[codes[valid]]
+    report.null_rows = int((~valid).sum())
+
+    bad = np.flatnonzero(parsed.isna().to_numpy())
+    if len(bad):
+        counts = np.bincount(codes[valid], minlength=len(uniques))[bad]
+        report.bad_values = sorted(((str(uniques[i]), int(n)) for i, n in zip(bad, counts)), key=lambda t: -t[1])
+        report.bad_rows = int(counts.sum())
+    return pd.Series(out, index=values.index, name=values.name), report
@@ -1,10 +1,15 @@
 import os
+import sys
 import math
+import argparse
 import warnings
 import numpy as np
 import pandas as pd
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from backend.spatial import ClusterIndex, load_clusters
+
 # Optional: geopandas for shapefile; script still runs without it
 try:
     import geopandas as gpd  # only used if shapefile present
@@ -40,39 +45,14 @@ def inv_minmax(s):
     x = minmax(s)
     return 1 - x
 
-def haversine(lat1, lon1, lat2, lon2):
-    # inputs in degrees -> distance in km
-    R = 6371.0
-    p1 = np.radians(lat1); p2 = np.radians(lat2)
-    dlat = p2[:,None] - p1[None,:]
-    dlon = np.radians(lon2)[:,None] - np.radians(lon1)[None,:]
-    a = np.sin(dlat/2.0)**2 + np.cos(p1)[None,:]*np.cos(p2)[:,None]*(np.sin(dlon/2.0)**2)
-    c = 2*np.arcsin(np.sqrt(a))
-    return R * c  # matrix (clusters x clinics)
-
 def nearest_cluster(clin_df, clu_df, max_km=25_000):
     """
     Map each clinic to nearest cluster by geodesic distance.
     Returns Series aligned to clin_df.index with cluster DHSID (or NaN if none).
     """
-    lat_c = clin_df["latitude"].values.astype(float)
-    lon_c = clin_df["longitude"].values.astype(float)
-    lat_k = clu_df["lat"].values.astype(float)
-    lon_k = clu_df["lon"].values.astype(float)
-
-    # process in chunks to limit memory
-    chunk = 2000
-    nearest_ids = []
-    for start in range(0, len(lat_c), chunk):
-        end = min(start+chunk, len(lat_c))
-        d = haversine(lat_c[start:end], lon_c[start:end], lat_k, lon_k).T  # (clin_chunk x clusters)
-        idx_min = d.argmin(axis=1)
-        dist_min = d[np.arange(d.shape[0]), idx_min]
-        ids = clu_df["DHSID"].values[idx_min]
-        ids = pd.Series(ids, index=clin_df.index[start:end])
-        ids[dist_min > max_km] = np.nan  # (shouldn't happen with 25,000km safety)
-        nearest_ids.append(ids)
-    return pd.concat(nearest_ids)
+    index = ClusterIndex.from_frame(clu_df, lat="lat", lon="lon", id_col="DHSID")
+    ids = index.nearest(clin_df["latitude"].values.astype(float), clin_df["longitude"].values.astype(float), max_km=max_km)
+    return pd.Series(ids, index=clin_df.index)
 
 def build_need_index(env):
     """
@@ -105,31 +85,85 @@ def build_need_index(env):
     need = need.replace(0, need[need>0].min())
     return need
 
-def rescale_within_month(df, weight_col="need_weight"):
+def rescale_within_month(df, weight_col="need_weight", rounding="largest_remainder"):
     """
     For each month, preserve the total visits but redistribute by weights.
     new_visits = total_month_visits * weight_i / sum(weights)
+
+    One vectorized pass: month totals and weight sums are broadcast back to rows with
+    groupby().transform. rounding="largest_remainder" floors every share and hands
+    the leftover visits of each month to the rows with the largest fractional parts,
+    so monthly totals are preserved exactly; rounding="round" is the old plain
+    .round() (totals can drift by a few visits per month).
     """
-    out = []
-    for m, g in df.groupby("month", sort=False):
-        tot = g["total_visits"].sum()
-        w = g[weight_col].clip(lower=1e-6)
-        g2 = g.copy()
-        g2["total_visits"] = (tot * (w / w.sum())).round().astype(int)
-        out.append(g2)
-    return pd.concat(out, ignore_index=True)
+    month = df["month"]
+    w = df[weight_col].clip(lower=1e-6)
+    tot = df["total_visits"].groupby(month, sort=False).transform("sum")
+    share = tot * w / w.groupby(month, sort=False).transform("sum")
+    if rounding == "round":
+        new = share.round()
+    elif rounding == "largest_remainder":
+        base = np.floor(share)
+        left = (tot - base.groupby(month, sort=False).transform("sum")).round()
+        rank = (share - base).groupby(month, sort=False).rank(method="first", ascending=False)
+        new = base + (rank <= left)
+    else:
+        raise ValueError(f"unknown rounding mode {rounding!r}")
+    out = df.copy()
+    out["total_visits"] = new.astype(int)
+    return out.reset_index(drop=True)
+
+def rescale_month_partitions(src_dir, dst_dir, clin_weights, weight_col="need_weight", rounding="largest_remainder"):
+    """
+    rescale_within_month for visit tables bigger than memory: `src_dir` is a
+    month-partitioned Parquet dataset (month=<value>/..., as written by
+    scripts/storage.py). Each month is read, joined to `clin_weights`, rescaled and
+    written to the same partition under `dst_dir` before the next is read, so memory
+    is bounded by the largest month. Returns {month: (rows, total_visits)}.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    src = ds.dataset(str(src_dir), format="parquet", partitioning=ds.HivePartitioning.discover(infer_dictionary=False))
+    months = sorted({ds.get_partition_keys(f.partition_expression)["month"] for f in src.get_fragments()})
+    fill = clin_weights[weight_col].median()
+    fill = 1.0 if pd.isna(fill) else fill
+    dst_dir = Path(dst_dir)
+    summary = {}
+    for m in months:
+        part = src.to_table(filter=ds.field("month") == m).to_pandas()
+        part = part.merge(clin_weights[["clinic_id", weight_col]], on="clinic_id", how="left", suffixes=("_old", ""))
+        part = part.drop(columns=[f"{weight_col}_old"], errors="ignore")
+        part[weight_col] = part[weight_col].fillna(fill)
+        out = rescale_within_month(part, weight_col, rounding=rounding)
+        target = dst_dir / f"month={m}"
+        target.mkdir(parents=True, exist_ok=True)
+        pq.write_table(pa.Table.from_pandas(out.drop(columns=["month"]), preserve_index=False), target / "part-0.parquet")
+        summary[m] = (len(out), int(out["total_visits"].sum()))
+    return summary
 
 # ---------- main ----------
 def main():
-    if not VISITS.exists() or not CLINICS.exists() or not DHS_ENV.exists():
+    ap = argparse.ArgumentParser(description="Redistribute synthetic visits by DHS need, preserving monthly totals.")
+    ap.add_argument("--rounding", choices=["largest_remainder", "round"], default="largest_remainder")
+    ap.add_argument("--partitions-in", type=Path, default=None,
+                    help="Month-partitioned Parquet visits dataset to rescale month by month (instead of clinic_visits.csv)")
+    ap.add_argument("--partitions-out", type=Path, default=None, help="Where to write the rescaled partitions")
+    args = ap.parse_args()
+    streaming = args.partitions_in is not None
+    if streaming and args.partitions_out is None:
+        ap.error("--partitions-in needs --partitions-out")
+
+    if (not streaming and not VISITS.exists()) or not CLINICS.exists() or not DHS_ENV.exists():
         raise FileNotFoundError("Missing one of required files: clinic_visits.csv, clinic_geo_data.csv, dhs_env.csv")
 
-    visits = pd.read_csv(VISITS)
+    visits = None if streaming else pd.read_csv(VISITS)
     clinics = pd.read_csv(CLINICS)
     env = pd.read_csv(DHS_ENV)
 
     # Ensure month is treated as a string YYYY-MM (keep as-is for grouping)
-    if "month" in visits.columns:
+    if visits is not None and "month" in visits.columns:
         visits["month"] = visits["month"].astype(str)
 
     # 1) Build cluster-level need index from DHS env table
@@ -142,12 +176,10 @@ def main():
     # 2) Load cluster coordinates if available
     clu = None
     if DHS_GPS_CSV.exists():
-        gps = pd.read_csv(DHS_GPS_CSV)
-        # common DHS columns for lat/lon
-        lat_col = next((c for c in gps.columns if c.lower() in ["lat", "latitude", "latnum"]), None)
-        lon_col = next((c for c in gps.columns if c.lower() in ["lon", "longitude", "longnum", "lonnum"]), None)
-        if lat_col and lon_col and "DHSID" in gps.columns:
-            clu = gps[["DHSID", lat_col, lon_col]].rename(columns={lat_col:"lat", lon_col:"lon"})
+        try:
+            clu = load_clusters(DHS_GPS_CSV)
+        except KeyError:
+            clu = None
     elif DHS_SHAPE.exists() and HAS_GPD:
         g = gpd.read_file(DHS_SHAPE)
         if "DHSID" in g.columns:
@@ -183,13 +215,22 @@ def main():
         clin_weights = clinics[["clinic_id","need_index"]].rename(columns={"need_index":"need_weight"})
     else:
         # no spatial mapping -> use a single DHS distribution scalar = 1 for everyone
-        clin_weights = visits[["clinic_id"]].drop_duplicates().copy()
+        clin_weights = (visits[["clinic_id"]].drop_duplicates().copy() if visits is not None
+                        else pd.DataFrame({"clinic_id": pd.Series(dtype=str)}))
         clin_weights["need_weight"] = 1.0
 
+    if streaming:
+        summary = rescale_month_partitions(args.partitions_in, args.partitions_out, clin_weights,
+                                           "need_weight", rounding=args.rounding)
+        rows = sum(n for n, _ in summary.values())
+        print(f"✅ Rescaled {len(summary)} month partitions ({rows} rows) → {args.partitions_out}")
+        return
+
     # 5) Join weights to visits and rescale per month
-    v = visits.merge(clin_weights, on="clinic_id", how="left")
+    # (a rerun on already-enriched visits replaces the old weights)
+    v = visits.drop(columns=["need_weight"], errors="ignore").merge(clin_weights, on="clinic_id", how="left")
     v["need_weight"] = v["need_weight"].fillna(v["need_weight"].median())
-    v2 = rescale_within_month(v, "need_weight")
+    v2 = rescale_within_month(v, "need_weight", rounding=args.rounding)
 
     # 6) Save: overwrite visits and produce a tiny diff sample for audit
     # Make a sample diff (first 10 clinics x 2 months)
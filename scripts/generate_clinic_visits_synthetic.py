@@ -1,4 +1,7 @@
-import os, math
+import os, math, time, argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 import numpy as np
 import pandas as pd
 from pathlib import Path
@@ -16,13 +19,26 @@ START_YEAR  = int(os.getenv("START_YEAR", "2020"))
 END_YEAR    = int(os.getenv("END_YEAR", "2024"))
 
 # Controls to keep data manageable during dev
-MAX_CLINICS = int(os.getenv("SYNTH_MAX_CLINICS", "600"))   # use small subset first; set large later
+MAX_CLINICS = int(os.getenv("SYNTH_MAX_CLINICS", "600"))   # use small subset first; 0 = every facility
 SEED        = int(os.getenv("SYNTH_SEED", "42"))
 
+# Clinics are generated in fixed blocks of SHARD_CLINICS, each with its own seed
+# (SEED, shard number). Output is therefore identical for any --workers.
+SHARD_CLINICS = int(os.getenv("SYNTH_SHARD_CLINICS", "2000"))
+
 # --- Nigeria-aware simple climate/seasonality (very lightweight) ---
 NORTH = {"Borno","Kano","Kaduna","Katsina","Sokoto","Yobe","Zamfara","Jigawa","Bauchi","Gombe","Kebbi","Niger","Kwara","Plateau","Benue","Taraba","Nasarawa","FCT"}
 COAST = {"Lagos","Rivers","Bayelsa","Delta","Akwa Ibom","Cross River","Ondo","Ogun","Edo"}
 # everyone else treated as "middle"
+RAINY = np.isin(np.arange(1, 13), (6, 7, 8, 9))           # by month_num - 1
+
+# per region (north, coast, middle): rain mean/sd, rain multiplier (dry, rainy), temp mean/sd
+RAIN_MU   = np.array([60.0, 180.0, 110.0])
+RAIN_SD   = np.array([25.0, 60.0, 40.0])
+RAIN_MULT = np.array([[0.6, 1.2], [0.9, 1.3], [0.8, 1.2]])
+TEMP_MU   = np.array([30.0, 27.0, 28.0])
+TEMP_SD   = np.array([2.0, 1.5, 1.5])
+
 def seasonal_multiplier(month_num: int) -> float:
     """Base monthly seasonality shared nationwide (flu/rain patterns, holidays)."""
     x = (month_num-1) / 12.0 * 2 * math.pi
@@ -31,95 +47,175 @@ def seasonal_multiplier(month_num: int) -> float:
     if month_num in (12,1):    base *= 0.93   # holiday dip
     return base
 
-def climate_for(state: str, month_num: int, rng: np.random.Generator):
-    if state in NORTH:
-        rain = max(0, rng.normal(60, 25)) * (1.2 if month_num in (6,7,8,9) else 0.6)
-        temp = rng.normal(30, 2)
-    elif state in COAST:
-        rain = max(0, rng.normal(180, 60)) * (1.3 if month_num in (6,7,8,9) else 0.9)
-        temp = rng.normal(27, 1.5)
-    else:
-        rain = max(0, rng.normal(110, 40)) * (1.2 if month_num in (6,7,8,9) else 0.8)
-        temp = rng.normal(28, 1.5)
-    return float(round(rain,1)), float(round(temp,1))
-
-def staff_capacity(level: str, rng: np.random.Generator):
-    lvl = (level or "").lower()
-    if "primary" in lvl:
-        docs  = max(0, int(rng.normal(1.2, 0.6)))
-        nurs  = max(0, int(rng.normal(4.0, 1.5)))
-        beds  = max(1, int(rng.normal(12, 5)))
-    elif "hospital" in lvl:
-        docs  = max(1, int(rng.normal(6, 2)))
-        nurs  = max(3, int(rng.normal(18, 6)))
-        beds  = max(10, int(rng.normal(60, 15)))
-    else:
-        docs  = max(0, int(rng.normal(2, 1)))
-        nurs  = max(1, int(rng.normal(8, 3)))
-        beds  = max(2, int(rng.normal(20, 7)))
-    return docs, nurs, beds
+SEASONAL = np.array([seasonal_multiplier(m) for m in range(1, 13)])
+
+def region_of(states) -> np.ndarray:
+    """0 = north, 1 = coast, 2 = middle, per clinic."""
+    s = pd.Series(states, dtype=object)
+    return np.where(s.isin(NORTH), 0, np.where(s.isin(COAST), 1, 2))
+
+def climate(region: np.ndarray, month_num: np.ndarray, rng: np.random.Generator):
+    """Rain (mm) and temperature (°C) for matching arrays of region and month number."""
+    rain = np.maximum(0, rng.normal(RAIN_MU[region], RAIN_SD[region])) * RAIN_MULT[region, RAINY[month_num - 1].astype(int)]
+    temp = rng.normal(TEMP_MU[region], TEMP_SD[region])
+    return np.round(rain, 1), np.round(temp, 1)
+
+def staff_capacity(levels, rng: np.random.Generator):
+    """Doctors, nurses and beds per clinic from its level (primary / hospital / other)."""
+    lvl = pd.Series(levels, dtype=object).fillna("").astype(str).str.lower()
+    kind = np.where(lvl.str.contains("primary"), 0, np.where(lvl.str.contains("hospital"), 1, 2))
+    #                        primary      hospital     other
+    mu  = np.array([[1.2, 4.0, 12.0], [6.0, 18.0, 60.0], [2.0, 8.0, 20.0]])[kind]
+    sd  = np.array([[0.6, 1.5, 5.0],  [2.0, 6.0, 15.0],  [1.0, 3.0, 7.0]])[kind]
+    low = np.array([[0, 0, 1],        [1, 3, 10],        [0, 1, 2]])[kind]
+    draws = np.maximum(low, np.trunc(rng.normal(mu, sd))).astype(np.int64)
+    return draws[:, 0], draws[:, 1], draws[:, 2]
 
 def expected_visits(docs, nurs, beds, month_num, rng: np.random.Generator):
     """Simple visit generator: staff-driven base × seasonality + noise."""
     base = 35 * (1 + docs*0.35 + nurs*0.06) + beds*0.4
-    base *= seasonal_multiplier(month_num)
-    noise = rng.normal(0, max(5.0, base*0.08))
-    return max(0, int(base + noise))
+    base = base * SEASONAL[month_num - 1]
+    noise = rng.normal(0, np.maximum(5.0, base*0.08))
+    return np.maximum(0, np.trunc(base + noise)).astype(np.int64)
 
 def to_months(start_year, end_year):
     idx = pd.period_range(f"{start_year}-01", f"{end_year}-12", freq="M")
     return [p.to_timestamp() for p in idx]
 
+COLUMNS = ["clinic_id", "month", "total_visits", "available_doctors", "available_nurses", "available_beds",
+           "power_availability_days", "rainfall_mm", "avg_temperature_c", "source"]
+
+def generate_shard(shard: int, clinic_ids, states, levels, months, seed: int = SEED) -> pd.DataFrame:
+    """All clinic × month rows for one block of clinics, in one NumPy pass."""
+    rng = np.random.default_rng([seed, shard])
+    n_c, n_m = len(clinic_ids), len(months)
+    docs, nurs, beds = staff_capacity(levels, rng)       # static per clinic
+
+    # clinic-major grid, like the original nested loops
+    ci = np.repeat(np.arange(n_c), n_m)
+    month_num = np.tile(np.array([ts.month for ts in months]), n_c)
+    rain, temp = climate(region_of(states)[ci], month_num, rng)
+    power_days = np.trunc(np.clip(rng.normal(24, 4, n_c * n_m), 0, 30)).astype(np.int64)   # proxy outages
+    visits = expected_visits(docs[ci], nurs[ci], beds[ci], month_num, rng)
+    return pd.DataFrame({
+        "clinic_id": np.asarray(clinic_ids, dtype=object)[ci],
+        "month": np.tile(np.array([ts.strftime("%Y-%m") for ts in months], dtype=object), n_c),
+        "total_visits": visits,
+        "available_doctors": docs[ci],
+        "available_nurses": nurs[ci],
+        "available_beds": beds[ci],
+        "power_availability_days": power_days,
+        "rainfall_mm": rain,
+        "avg_temperature_c": temp,
+        "source": "synthetic_ng_v1",  # clear label for transparency
+    })
+
+def encode_shard(df: pd.DataFrame, parquet: bool):
+    """What the writer appends: an Arrow table, or headerless CSV text (formatting is the slow part)."""
+    if parquet:
+        import pyarrow as pa
+        return pa.Table.from_pandas(df, preserve_index=False)
+    return df.to_csv(index=False, header=False, lineterminator="\n")
+
+def _shard_job(args):
+    *shard_args, parquet = args
+    return encode_shard(generate_shard(*shard_args), parquet)
+
+def select_clinics(fac: pd.DataFrame, n: int, seed: int = SEED, replicate: bool = False) -> pd.DataFrame:
+    """
+    n clinics as a deterministic sample of the registry. Past the registry size the
+    whole registry is used, or with replicate=True it is repeated with ids suffixed
+    -r1, -r2, ... (for national-scale load tests).
+    """
+    if n <= 0 or n == len(fac) or (n > len(fac) and not replicate):
+        return fac
+    if n < len(fac):
+        return fac.sample(n=n, random_state=seed)
+    reps = -(-n // len(fac))
+    copies = [fac.assign(clinic_id=fac["clinic_id"].astype(str) + (f"-r{k}" if k else "")) for k in range(reps)]
+    return pd.concat(copies, ignore_index=True).iloc[:n]
+
+class ChunkWriter:
+    """Appends encoded shards to one CSV or Parquet file (format from the suffix)."""
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.parquet = self.path.suffix == ".parquet"
+        self.rows = 0
+        self._writer = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.parquet:
+            self._f = open(self.path, "w", newline="", encoding="utf-8")
+            self._f.write(",".join(COLUMNS) + "\n")
+
+    def write(self, chunk) -> None:
+        if self.parquet:
+            import pyarrow.parquet as pq
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, chunk.schema)
+            self._writer.write_table(chunk)
+            self.rows += chunk.num_rows
+        else:
+            self._f.write(chunk)
+            self.rows += chunk.count("\n")
+
+    def close(self) -> None:
+        if self.parquet:
+            if self._writer is not None:
+                self._writer.close()
+        else:
+            self._f.close()
+
 def main():
-    rng = np.random.default_rng(SEED)
+    ap = argparse.ArgumentParser(description="Generate synthetic clinic × month visits.")
+    ap.add_argument("--clinics", type=int, default=MAX_CLINICS, help="0 = every facility in the registry")
+    ap.add_argument("--replicate", action="store_true", help="Repeat the registry when --clinics exceeds it")
+    ap.add_argument("--start-year", type=int, default=START_YEAR)
+    ap.add_argument("--end-year", type=int, default=END_YEAR)
+    ap.add_argument("--workers", type=int, default=1, help="Processes generating shards")
+    ap.add_argument("--out", type=Path, default=OUT_FILE, help=".csv or .parquet")
+    args = ap.parse_args()
 
     if not FAC_FILE.exists():
         raise FileNotFoundError(f"Missing facility file: {FAC_FILE}")
 
+    t0 = time.perf_counter()
     fac = pd.read_csv(FAC_FILE)
     # take manageable subset for dev, but deterministic
-    if len(fac) > MAX_CLINICS:
-        fac = fac.sample(n=MAX_CLINICS, random_state=SEED)
+    fac = select_clinics(fac, args.clinics, SEED, args.replicate)
 
     # ensure required columns exist (fallbacks)
     for col in ["clinic_id","clinic_name","state","lga","level"]:
         if col not in fac.columns: fac[col] = None
 
-    months = to_months(START_YEAR, END_YEAR)
-    rows = []
-
-    # static per-clinic staff capacity (can evolve later)
-    static_sc = {}
-    for _, f in fac.iterrows():
-        docs, nurs, beds = staff_capacity(f.get("level",""), rng)
-        static_sc[f["clinic_id"]] = (docs, nurs, beds)
-
-    for _, f in fac.iterrows():
-        cid   = f["clinic_id"]
-        state = f.get("state", "Unknown")
-        docs, nurs, beds = static_sc[cid]
-        for ts in months:
-            m = int(ts.month)
-            rain, temp = climate_for(state, m, rng)
-            power_days = int(np.clip(rng.normal(24, 4), 0, 30))   # proxy outages
-            visits = expected_visits(docs, nurs, beds, m, rng)
-            rows.append({
-                "clinic_id": cid,
-                "month": ts.strftime("%Y-%m"),
-                "total_visits": visits,
-                "available_doctors": docs,
-                "available_nurses": nurs,
-                "available_beds": beds,
-                "power_availability_days": power_days,
-                "rainfall_mm": rain,
-                "avg_temperature_c": temp,
-                "source": "synthetic_ng_v1"   # clear label for transparency
-            })
-
-    out = pd.DataFrame(rows)
-    OUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    out.to_csv(OUT_FILE, index=False)
-    print(f"✅ Saved {OUT_FILE}  rows={len(out)}  clinics={fac.shape[0]}  months={len(months)}")
+    months = to_months(args.start_year, args.end_year)
+    writer = ChunkWriter(args.out)
+    jobs = [
+        (k, fac["clinic_id"].to_numpy()[s:s + SHARD_CLINICS], fac["state"].to_numpy()[s:s + SHARD_CLINICS],
+         fac["level"].to_numpy()[s:s + SHARD_CLINICS], months, SEED, writer.parquet)
+        for k, s in enumerate(range(0, len(fac), SHARD_CLINICS))
+    ]
+    try:
+        if args.workers > 1:
+            # at most 2 shards per worker in flight: finished shards wait in memory only
+            # until the ones before them are written, not until the whole run is done
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                pending, todo = deque(), iter(jobs)
+                for job in islice(todo, 2 * args.workers):
+                    pending.append(pool.submit(_shard_job, job))
+                while pending:
+                    chunk = pending.popleft().result()      # in shard order
+                    job = next(todo, None)
+                    if job is not None:
+                        pending.append(pool.submit(_shard_job, job))
+                    writer.write(chunk)
+        else:
+            for job in jobs:
+                writer.write(_shard_job(job))
+    finally:
+        writer.close()
+    dt = time.perf_counter() - t0
+    print(f"✅ Saved {args.out}  rows={writer.rows}  clinics={fac.shape[0]}  months={len(months)}  "
+          f"shards={len(jobs)}  {dt:.1f}s ({writer.rows / max(dt, 1e-9):,.0f} rows/s)")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,335 @@
+# scripts/run_pipeline.py
+"""
+Incremental runner for the bronze → silver → gold data scripts.
+
+Every step declares the script it runs, the files it reads and the files it writes.
+A step is skipped when its last successful run saw the same input file hashes,
+the same code version (hash of the script, the local modules it imports, its
+arguments and the env vars it reads) and all of its outputs still exist. Steps whose upstream steps are done run
+in parallel (subprocesses, --jobs at a time), so touching one raw file only reruns
+what is downstream of it.
+
+State lives in DATA_ROOT/processed/.pipeline_state.json: per step the input hashes,
+code version, wall time and row count of every output of the last good run, plus
+a (mtime, size) → sha256 cache so unchanged files are not rehashed.
+
+    python scripts/run_pipeline.py               # run what is stale
+    python scripts/run_pipeline.py --dry-run     # only show what would run
+    python scripts/run_pipeline.py --force enrich_visits --jobs 4
+    python scripts/run_pipeline.py --report reports/pipeline_run.json
+"""
+import argparse, hashlib, json, os, subprocess, sys, time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DATA_ROOT = Path(os.getenv("DATA_ROOT", "./data"))
+RAW = DATA_ROOT / "raw"
+MANUAL = RAW / "_manual"
+SILVER = DATA_ROOT / "processed" / "silver"
+GOLD = DATA_ROOT / "processed" / "gold"
+FEATURES = Path(os.getenv("FEATURE_STORE_DIR", str(DATA_ROOT / "processed" / "features")))
+FORECASTS = Path(os.getenv("FORECAST_DIR", str(DATA_ROOT / "processed" / "forecasts" / "visits")))
+STATE_FILE = Path(os.getenv("PIPELINE_STATE", str(DATA_ROOT / "processed" / ".pipeline_state.json")))
+SCRIPTS = Path(__file__).resolve().parent
+ROOT = SCRIPTS.parent
+
+@dataclass(frozen=True)
+class Step:
+    name: str
+    script: str                                  # file under scripts/; its hash is the code version
+    code: Tuple[str, ...] = ()                   # local modules it imports (repo-relative); hashed with it
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    optional_inputs: Tuple[str, ...] = ()        # hashed when present, never required
+    optional_outputs: Tuple[str, ...] = ()       # counted when present, never required
+    args: Tuple[str, ...] = ()
+    env: Tuple[str, ...] = ()                    # env vars the script reads; part of the code version
+
+    def command(self) -> List[str]:
+        return [sys.executable, str(SCRIPTS / self.script), *self.args]
+
+    def all_inputs(self) -> Tuple[str, ...]:
+        return self.inputs + self.optional_inputs
+
+    def all_outputs(self) -> Tuple[str, ...]:
+        return self.outputs + self.optional_outputs
+
+def _p(path: Path) -> str:
+    return str(path)
+
+STEPS: List[Step] = [
+    Step("clinic_geo", "extract_clinic_geo_from_json.py",
+         inputs=(_p(MANUAL / "nigeriahealthfacilities.json"),),
+         outputs=(_p(MANUAL / "clinic_geo_data.csv"),)),
+    Step("clinic_visits", "generate_clinic_visits_synthetic.py",
+         inputs=(_p(MANUAL / "clinic_geo_data.csv"),),
+         outputs=(_p(MANUAL / "clinic_visits.csv"),),
+         env=("START_YEAR", "END_YEAR", "SYNTH_MAX_CLINICS", "SYNTH_SEED", "SYNTH_SHARD_CLINICS")),
+    # rewrites clinic_visits.csv in place
+    Step("enrich_visits", "enrich_visits_with_dhs.py",
+         inputs=(_p(MANUAL / "clinic_visits.csv"), _p(MANUAL / "clinic_geo_data.csv"), _p(RAW / "dhs" / "dhs_env.csv")),
+         optional_inputs=(_p(RAW / "dhs" / "dhs_clusters_gps.csv"), _p(RAW / "dhs" / "NGGE81FL.shp")),
+         outputs=(_p(MANUAL / "clinic_visits.csv"), _p(MANUAL / "clinic_visits_dhs_diff_sample.csv")),
+         code=("backend/spatial.py",)),
+    Step("medicine_stock", "generate_medicine_stock_synthetic.py",
+         inputs=(_p(MANUAL / "clinic_visits.csv"),),
+         outputs=(_p(MANUAL / "medicine_stock.csv"),),
+         env=("SYNTH_SEED",)),
+    Step("malaria_dhs", "clean_malaria_dhs.py",
+         inputs=(_p(RAW / "NG_2010_MIS" / "NGPR61DT" / "NGPR61FL.DTA"),
+                 _p(RAW / "NG_2015_MIS" / "NGPR71DT" / "NGPR71FL.DTA"),
+                 _p(RAW / "NG_2021_MIS" / "NGPR81DT" / "NGPR81FL.DTA")),
+         outputs=(_p(SILVER / "malaria_individual_records.csv"), _p(SILVER / "malaria_prevalence_state_year.csv")),
+         args=("--dta2010", _p(RAW / "NG_2010_MIS" / "NGPR61DT" / "NGPR61FL.DTA"),
+               "--dta2015", _p(RAW / "NG_2015_MIS" / "NGPR71DT" / "NGPR71FL.DTA"),
+               "--dta2021", _p(RAW / "NG_2021_MIS" / "NGPR81DT" / "NGPR81FL.DTA"),
+               "--outdir", _p(SILVER))),
+    # each table is converted only if its raw file exists
+    Step("bronze_to_silver", "bronze_to_silver.py", code=("scripts/storage.py", "scripts/dates.py"),
+         optional_inputs=tuple(_p(MANUAL / f"{t}.csv") for t in ("clinic_geo_data", "clinic_visits", "medicine_stock", "symptom_triage")),
+         optional_outputs=tuple(_p(SILVER / s) for t in ("clinic_geo_data", "clinic_visits", "medicine_stock", "symptom_triage")
+                                for s in (t, f"{t}.csv")),
+         env=("SILVER_FORMAT", "DATE_DAYFIRST")),
+    # appends new periods to the lag / rolling stores the API looks prev_lag1 / prev_roll3 up in
+    Step("feature_store", "build_feature_store.py",
+         code=("backend/feature_store.py", "backend/fsutil.py", "scripts/storage.py"),
+         inputs=(_p(SILVER / "malaria_prevalence_state_year.csv"),),
+         optional_inputs=(_p(SILVER / "clinic_visits"), _p(SILVER / "clinic_visits.csv")),
+         outputs=(_p(FEATURES / "state_year"),),
+         optional_outputs=(_p(FEATURES / "clinic_month"),),
+         env=("FEATURE_STORE_DIR",)),
+    # visit-forecasting features; appends months newer than the saved per-clinic state
+    Step("clinic_month_features", "build_clinic_month_features.py",
+         code=("backend/visit_features.py", "scripts/storage.py"),
+         optional_inputs=(_p(SILVER / "clinic_visits"), _p(SILVER / "clinic_visits.csv")),
+         optional_outputs=(_p(GOLD / "clinic_month_features"),)),
+    # refits the visit forecaster and precomputes every clinic's forecasts for the API
+    Step("visit_forecasts", "build_visit_forecasts.py",
+         code=("backend/forecast.py", "backend/visit_features.py", "backend/fsutil.py", "scripts/storage.py"),
+         optional_inputs=(_p(SILVER / "clinic_visits"), _p(SILVER / "clinic_visits.csv")),
+         optional_outputs=(_p(FORECASTS),),
+         env=("FORECAST_DIR", "FORECAST_HORIZON", "FORECAST_TRAIN_ORIGINS", "FORECAST_RIDGE")),
+]
+
+# ---------- hashing ----------
+class FileHasher:
+    """sha256 of files (or of every file under a directory), memoized on (mtime_ns, size) across runs."""
+    def __init__(self, cache: Optional[Dict[str, list]] = None):
+        self.cache = cache if cache is not None else {}
+
+    def __call__(self, path: str) -> Optional[str]:
+        if os.path.isdir(path):
+            h = hashlib.sha256()
+            for sub in sorted(Path(path).rglob("*")):
+                if sub.is_file():
+                    h.update(f"{sub.relative_to(path)}:{self(str(sub))}".encode())
+            return h.hexdigest()
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        hit = self.cache.get(path)
+        if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+            return hit[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        self.cache[path] = [st.st_mtime_ns, st.st_size, digest]
+        return digest
+
+def code_version(step: Step, hasher: FileHasher) -> str:
+    h = hashlib.sha256()
+    h.update((hasher(str(SCRIPTS / step.script)) or "missing").encode())
+    for module in step.code:
+        h.update(f"{module}:{hasher(str(ROOT / module)) or 'missing'}".encode())
+    h.update(json.dumps([list(step.args), {k: os.getenv(k) for k in step.env}]).encode())
+    return h.hexdigest()[:16]
+
+def count_rows(path: str) -> Optional[int]:
+    """Data rows in a CSV (newlines minus the header) or a Parquet file / dataset directory."""
+    if path.endswith(".parquet") or os.path.isdir(path):
+        try:
+            import pyarrow.dataset as ds
+        except ImportError:
+            return None
+        return ds.dataset(path, format="parquet", partitioning="hive").count_rows()
+    if not path.endswith(".csv"):
+        return None
+    n, last = 0, b"\n"
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            n += block.count(b"\n")
+            last = block[-1:]
+    n += last != b"\n"          # no trailing newline on the final row
+    return max(0, n - 1)
+
+# ---------- planning ----------
+def upstream(steps: List[Step]) -> Dict[str, List[str]]:
+    """For each step, the earlier steps that last wrote one of its inputs."""
+    deps: Dict[str, List[str]] = {}
+    for i, step in enumerate(steps):
+        found = []
+        for path in step.all_inputs():
+            for prev in reversed(steps[:i]):
+                if path in prev.all_outputs():
+                    if prev.name not in found:
+                        found.append(prev.name)
+                    break
+        deps[step.name] = found
+    return deps
+
+def downstream(steps: List[Step], names) -> set:
+    deps = upstream(steps)
+    out = set(names)
+    for step in steps:                  # steps are listed in dependency order
+        if any(d in out for d in deps[step.name]):
+            out.add(step.name)
+    return out
+
+def why_stale(step: Step, record: Optional[dict], hasher: FileHasher) -> Optional[str]:
+    """Reason the step must run, or None when its last run is still valid."""
+    missing = [p for p in step.inputs if not os.path.exists(p)]
+    if missing:
+        return "missing input: " + ", ".join(missing)
+    if record is None:
+        return "never run"
+    if record.get("code") != code_version(step, hasher):
+        return "code changed"
+    seen = record.get("inputs", {})
+    for path in step.all_inputs():
+        if hasher(path) != seen.get(path):
+            return f"input changed: {path}"
+    for path in step.outputs:
+        if not os.path.exists(path):
+            return f"output missing: {path}"
+    return None
+
+# ---------- running ----------
+def load_state(path: Path = STATE_FILE) -> dict:
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"steps": {}, "files": {}}
+
+def save_state(state: dict, path: Path = STATE_FILE) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def _execute(step: Step) -> Tuple[int, float, str]:
+    t0 = time.perf_counter()
+    proc = subprocess.run(step.command(), capture_output=True, text=True)
+    return proc.returncode, time.perf_counter() - t0, (proc.stdout + proc.stderr)
+
+def run_pipeline(steps: List[Step] = STEPS, jobs: int = 2, force=(), dry_run: bool = False,
+                 state_path: Path = STATE_FILE) -> List[dict]:
+    """Run stale steps, independent ones in parallel. Returns one result dict per step."""
+    state = load_state(state_path)
+    hasher = FileHasher(state.setdefault("files", {}))
+    records = state.setdefault("steps", {})
+    deps = upstream(steps)
+    forced = downstream(steps, force) if force else set()
+    by_name = {s.name: s for s in steps}
+    results: Dict[str, dict] = {}
+    pending = [s.name for s in steps]
+    running = {}
+
+    def finish(name: str, status: str, **extra):
+        results[name] = dict(step=name, status=status, **extra)
+        tag = {"ran": "[OK]", "skipped": "[SKIP]", "dry-run": "[PLAN]"}.get(status, "[WARN]")
+        detail = extra.get("reason") or ""
+        if status == "ran":
+            detail = f"{extra['wall_s']:.2f}s rows={extra['rows']}"
+        print(f"{tag} {name}: {status} {detail}".rstrip())
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while pending or running:
+            for name in list(pending):
+                if any(d not in results for d in deps[name]):
+                    continue                    # upstream still running
+                pending.remove(name)
+                step = by_name[name]
+                bad = [d for d in deps[name] if results[d]["status"] == "failed"]
+                if bad:
+                    finish(name, "blocked", reason=f"upstream failed: {', '.join(bad)}")
+                    continue
+                reason = why_stale(step, records.get(name), hasher)
+                if dry_run and any(results[d]["status"] == "dry-run" for d in deps[name]):
+                    reason = reason or "upstream would run"
+                if reason and reason.startswith("missing input"):
+                    finish(name, "missing-input", reason=reason)
+                elif name in forced or reason:
+                    reason = reason or "forced"
+                    if dry_run:
+                        finish(name, "dry-run", reason=reason)
+                    else:
+                        print(f"[INFO] {name}: running ({reason})")
+                        running[pool.submit(_execute, step)] = (name, reason)
+                else:
+                    finish(name, "skipped", reason="up to date")
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name, reason = running.pop(fut)
+                step = by_name[name]
+                code, wall_s, log = fut.result()
+                if code != 0:
+                    finish(name, "failed", reason=f"exit {code}", wall_s=round(wall_s, 3), log=log[-2000:])
+                    continue
+                rows = {p: count_rows(p) for p in step.all_outputs() if os.path.exists(p)}
+                records[name] = {
+                    # hashed after the run, so a step that rewrites its own input is not stale next time
+                    "inputs": {p: hasher(p) for p in step.all_inputs()},
+                    "code": code_version(step, hasher),
+                    "wall_s": round(wall_s, 3),
+                    "rows": rows,
+                    "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                }
+                save_state(state, state_path)
+                finish(name, "ran", reason=reason, wall_s=round(wall_s, 3), rows=rows)
+    if not dry_run:
+        save_state(state, state_path)
+    return [results[s.name] for s in steps]
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Run the data pipeline, skipping steps that are up to date.")
+    ap.add_argument("--jobs", type=int, default=2, help="Steps run in parallel")
+    ap.add_argument("--force", nargs="*", default=None, metavar="STEP",
+                    help="Rerun these steps (and everything downstream); no names = all")
+    ap.add_argument("--dry-run", action="store_true", help="Only report what would run")
+    ap.add_argument("--report", default=None, help="Also write the per-step results as JSON here")
+    args = ap.parse_args(argv)
+
+    names = [s.name for s in STEPS]
+    force = names if args.force == [] else (args.force or [])
+    unknown = sorted(set(force) - set(names))
+    if unknown:
+        ap.error(f"unknown step(s) {unknown}; steps are {names}")
+
+    t0 = time.perf_counter()
+    results = run_pipeline(STEPS, jobs=args.jobs, force=force, dry_run=args.dry_run)
+    total = time.perf_counter() - t0
+    ran = sum(r["status"] == "ran" for r in results)
+    failed = [r["step"] for r in results if r["status"] == "failed"]
+    print(f"\n[INFO] {ran} ran, {sum(r['status'] == 'skipped' for r in results)} up to date, "
+          f"{len(failed)} failed in {total:.2f}s")
+    for r in results:
+        if r["status"] == "failed":
+            print(f"\n--- {r['step']} output (tail) ---\n{r['log']}")
+    if args.report:
+        Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"total_s": round(total, 3), "steps": results}, f, indent=2)
+        print(f"[OK] wrote {args.report}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# scripts/storage.py
+"""
+Parquet storage for the silver and gold layers.
+
+Tables are written as hive-partitioned Parquet datasets under
+DATA_ROOT/processed/<layer>/<table>/ (e.g. silver/clinic_visits/month=2020-01-01/).
+Column types come from data/contracts/required_files.yml, so readers get ints,
+floats and dates back instead of re-inferring them from text; columns the
+contract doesn't list keep the type pandas gives them.
+
+    from storage import write_table, read_table
+    write_table(df, "clinic_visits")                              # silver by default
+    read_table("clinic_visits", columns=["clinic_id", "total_visits"],
+               filters=[("month", ">=", date(2024, 1, 1))])
+
+`read_table` pushes the column list and filters down to the Parquet scan: only
+the listed columns are decoded and partitions / row groups that can't match the
+filter are skipped. When a table has no Parquet dataset yet it falls back to the
+old <table>.csv with the same columns and filters.
+"""
+import os, shutil, uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import yaml
+
+DATA_ROOT = Path(os.getenv("DATA_ROOT", "./data"))
+CONTRACT = Path(os.getenv("DATA_CONTRACT", str(Path(__file__).resolve().parents[1] / "data" / "contracts" / "required_files.yml")))
+
+# hive partition columns per table; tables not listed are written unpartitioned
+PARTITIONS: Dict[str, List[str]] = {
+    "clinic_visits": ["month"],
+    "medicine_stock": ["month"],
+    "clinic_geo_data": ["state"],
+    "clinic_month_features": ["month"],
+}
+
+# contract type -> Arrow type
+ARROW_TYPES = {
+    "string": pa.string(),
+    "int": pa.int64(),
+    "float": pa.float64(),
+    "YYYY-MM": pa.date32(),         # stored as the first day of the month
+    "YYYY-MM-DD": pa.date32(),
+    "datetime": pa.timestamp("us", tz="UTC"),
+}
+
+_schemas: Dict[str, pa.Schema] = {}
+
+def layer_dir(layer: str = "silver") -> Path:
+    return DATA_ROOT / "processed" / layer
+
+def contract_schema(table: str) -> pa.Schema:
+    """Arrow schema of `table` as declared in the data contract (empty if it isn't declared)."""
+    if not _schemas:
+        with open(CONTRACT, "r", encoding="utf-8") as f:
+            spec = yaml.safe_load(f)
+        for name, meta in spec.get("required", {}).items():
+            fields = []
+            for col in meta["columns"]:
+                col_name, col_type = next(iter(col.items())) if isinstance(col, dict) else (col.split(":")[0].strip(), "string")
+                fields.append(pa.field(col_name, ARROW_TYPES.get(str(col_type).strip(), pa.string())))
+            _schemas[name] = pa.schema(fields)
+    return _schemas.get(table, pa.schema([]))
+
+def _coerce(s: pd.Series, typ: pa.DataType) -> pd.Series:
+    if pa.types.is_integer(typ):
+        return pd.to_numeric(s, errors="coerce").astype("Int64")
+    if pa.types.is_floating(typ):
+        return pd.to_numeric(s, errors="coerce").astype("float64")
+    if pa.types.is_date(typ):
+        return pd.to_datetime(s, errors="coerce").dt.normalize()
+    if pa.types.is_timestamp(typ):
+        return pd.to_datetime(s, errors="coerce", utc=True)
+    return s.astype("string")
+
+def to_arrow(df: pd.DataFrame, table: str) -> pa.Table:
+    """df as an Arrow table with contract types on the columns the contract knows."""
+    schema = contract_schema(table)
+    df = df.copy()
+    for field in schema:
+        if field.name in df.columns:
+            df[field.name] = _coerce(df[field.name], field.type)
+    tbl = pa.Table.from_pandas(df, preserve_index=False)
+    for field in schema:
+        i = tbl.schema.get_field_index(field.name)
+        if i >= 0 and tbl.schema.field(i).type != field.type:
+            tbl = tbl.set_column(i, field, tbl.column(i).cast(field.type))
+    return tbl.replace_schema_metadata(None)
+
+def _partitioning(table: str, schema: pa.Schema) -> Optional[ds.Partitioning]:
+    cols = [c for c in PARTITIONS.get(table, []) if c in schema.names]
+    if not cols:
+        return None
+    return ds.partitioning(pa.schema([schema.field(c) for c in cols]), flavor="hive")
+
+def write_table(df: pd.DataFrame, table: str, layer: str = "silver") -> Path:
+    """Replace <layer>/<table>/ with df as a partitioned Parquet dataset. Returns the dataset path."""
+    out = layer_dir(layer) / table
+    tbl = to_arrow(df, table)
+    # write next to the target and swap, so readers never see a half-written table
+    tmp = out.with_name(f".{table}.{uuid.uuid4().hex[:8]}.tmp")
+    ds.write_dataset(
+        tbl, tmp, format="parquet",
+        partitioning=_partitioning(table, tbl.schema),
+        basename_template="part-{i}.parquet",
+        max_rows_per_group=128 * 1024,
+    )
+    old = out.with_name(f".{table}.old")
+    if out.exists():
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(out, old)
+    os.replace(tmp, out)
+    shutil.rmtree(old, ignore_errors=True)
+    return out
+
+def append_table(df: pd.DataFrame, table: str, layer: str = "silver") -> Path:
+    """
+    Add df's rows to <layer>/<table>/ as new Parquet files, leaving existing files alone
+    (creates the table if it doesn't exist). Meant for new partitions, e.g. a new month.
+    """
+    out = layer_dir(layer) / table
+    if not out.is_dir():
+        return write_table(df, table, layer)
+    tbl = to_arrow(df, table)
+    ds.write_dataset(
+        tbl, out, format="parquet",
+        partitioning=_partitioning(table, tbl.schema),
+        basename_template=f"part-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        max_rows_per_group=128 * 1024,
+    )
+    return out
+
+def dataset(table: str, layer: str = "silver") -> ds.Dataset:
+    """The table as a pyarrow Dataset: the Parquet directory, or the legacy CSV in memory."""
+    path = layer_dir(layer) / table
+    if path.is_dir():
+        schema = contract_schema(table)
+        part = _partitioning(table, schema) if all(c in schema.names for c in PARTITIONS.get(table, [])) else "hive"
+        return ds.dataset(path, format="parquet", partitioning=part)
+    csv = path.with_suffix(".csv")
+    if csv.exists():
+        return ds.dataset(to_arrow(pd.read_csv(csv), table))
+    raise FileNotFoundError(f"no {layer} table '{table}' (looked for {path}/ and {csv})")
+
+def read_table(table: str, layer: str = "silver", columns: Optional[List[str]] = None, filters=None) -> pd.DataFrame:
+    """
+    Load a table with projection and predicate pushdown.
+    `filters` is a pyarrow Expression or DNF tuples as in pyarrow.parquet, e.g.
+    [("month", ">=", date(2024, 1, 1)), ("total_visits", ">", 0)].
+    """
+    d = dataset(table, layer)
+    if filters is not None and not isinstance(filters, ds.Expression):
+        filters = pq.filters_to_expression(filters)
+    tbl = d.to_table(columns=columns, filter=filters)
+    if columns is None:
+        # partition columns come back last; put contract columns back in contract order
+        order = [c for c in contract_schema(table).names if c in tbl.schema.names]
+        tbl = tbl.select(order + [c for c in tbl.schema.names if c not in order])
+    return tbl.to_pandas(date_as_object=False)
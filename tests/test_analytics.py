@@ -0,0 +1,76 @@
+# tests/test_analytics.py
+import os, sys, time
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("duckdb")
+pytest.importorskip("pyarrow")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import storage  # noqa: E402
+from backend.analytics import QueryService, MissingTable, UnknownQuery
+
+def _write(root, visits_per_clinic=10):
+    storage.write_table(pd.DataFrame({
+        "clinic_id": ["A", "B", "A", "B", "C"],
+        "month": ["2024-01-01", "2024-01-01", "2024-02-01", "2024-02-01", "2024-02-01"],
+        "total_visits": [visits_per_clinic] * 5,
+    }), "clinic_visits")
+    storage.write_table(pd.DataFrame({"clinic_id": ["A", "B"], "state": ["Kano", "Lagos"]}), "clinic_geo_data")
+    storage.write_table(pd.DataFrame({
+        "clinic_id": ["A", "A", "B"], "month": ["2024-01-01"] * 3, "item_code": ["ACT", "ORS", "ACT"],
+        "item_name": ["a", "o", "a"], "stock_on_hand": [5, 50, 20], "reorder_level": [10, 10, 10],
+        "is_high_risk_stockout": [1, 0, 0],
+    }), "medicine_stock")
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_ROOT", tmp_path)
+    _write(tmp_path)
+    svc = QueryService(data_root=tmp_path, refresh_s=0)
+    yield svc
+    svc.close()
+
+def test_views_and_state_month_aggregate(service):
+    assert {"silver.clinic_visits", "silver.clinic_geo_data", "silver.medicine_stock"} <= set(service.views())
+    res = service.run("visits_by_state_month", start="2024-02")
+    assert res["cached"] is False
+    assert res["rows"] == [
+        {"state": "Kano", "month": "2024-02-01", "clinics": 1, "total_visits": 10, "avg_visits_per_clinic": 10.0},
+        {"state": "Lagos", "month": "2024-02-01", "clinics": 1, "total_visits": 10, "avg_visits_per_clinic": 10.0},
+        {"state": "Unknown", "month": "2024-02-01", "clinics": 1, "total_visits": 10, "avg_visits_per_clinic": 10.0},
+    ]
+    only = service.run("visits_by_state_month", state="Kano")["rows"]
+    assert [r["month"] for r in only] == ["2024-01-01", "2024-02-01"]
+
+def test_stockout_risk(service):
+    rows = service.run("stockout_risk")["rows"]
+    assert rows[0]["item_code"] == "ACT" and rows[0]["share_below_reorder"] == 0.5 and rows[0]["share_high_risk"] == 0.5
+    assert [r["item_code"] for r in service.run("stockout_risk", item="ORS")["rows"]] == ["ORS"]
+
+def test_cache_hits_until_files_change(service, tmp_path):
+    assert service.run("visits_by_state_month")["cached"] is False
+    assert service.run("visits_by_state_month")["cached"] is True
+    time.sleep(0.01)
+    _write(tmp_path, visits_per_clinic=7)
+    res = service.run("visits_by_state_month")
+    assert res["cached"] is False and res["rows"][0]["total_visits"] == 7
+    assert service.cache.stats()["invalidations"] >= 1
+
+def test_errors(service):
+    with pytest.raises(MissingTable):
+        service.run("prevalence_trend")
+    with pytest.raises(UnknownQuery):
+        service.run("drop_everything")
+
+def test_odd_table_names_are_quoted(service, tmp_path):
+    silver = tmp_path / "processed" / "silver"
+    pd.DataFrame({"x": [1, 2]}).to_csv(silver / """it's "odd".csv""", index=False)
+    (silver / "my table").mkdir()
+    pd.DataFrame({"y": [3]}).to_parquet(silver / "my table" / "part-0.parquet")
+    service.refresh(force=True)
+    described = {d["view"]: d["columns"] for d in service.describe()}
+    assert described["""silver.it's "odd\""""] == [{"name": "x", "type": "BIGINT"}]
+    assert described["silver.my table"][0]["name"] == "y"
+    assert service.run("visits_by_state_month")["rows"]
@@ -0,0 +1,38 @@
+# tests/test_cache.py
+import numpy as np
+
+from backend.cache import PredictionCache, cached_predict
+
+class _Model:
+    def __init__(self):
+        self.rows_seen = 0
+    def __call__(self, X):
+        self.rows_seen += len(X)
+        return X.sum(axis=1, keepdims=True)
+
+def test_only_misses_reach_the_model():
+    cache, model = PredictionCache(max_rows=100, ttl_s=0), _Model()
+    X = np.arange(12, dtype=np.float32).reshape(4, 3)
+    first = cached_predict(cache, X[:2], "v1", model)
+    mixed = cached_predict(cache, X, "v1", model)
+    assert model.rows_seen == 4
+    np.testing.assert_array_equal(mixed, X.sum(axis=1, keepdims=True))
+    np.testing.assert_array_equal(mixed[:2], first)
+    assert (cache.hits, cache.misses) == (2, 4)
+
+def test_lru_eviction_and_version_invalidation():
+    cache, model = PredictionCache(max_rows=2, ttl_s=0), _Model()
+    X = np.eye(3, dtype=np.float32)
+    cached_predict(cache, X, "v1", model)
+    assert cache.stats()["rows"] == 2 and cache.evictions == 1
+    cached_predict(cache, X[2:], "v1", model)
+    assert model.rows_seen == 3                     # most recent row still cached
+    cached_predict(cache, X[2:], "v2", model)
+    assert model.rows_seen == 4 and cache.invalidations == 1
+
+def test_ttl_expiry():
+    cache, model = PredictionCache(max_rows=10, ttl_s=1e-9), _Model()
+    X = np.ones((1, 3), dtype=np.float32)
+    cached_predict(cache, X, "v1", model)
+    cached_predict(cache, X, "v1", model)
+    assert model.rows_seen == 2
@@ -0,0 +1,57 @@
+# tests/test_clean_malaria_dhs.py
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyreadstat")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import clean_malaria_dhs as cm  # noqa: E402
+
+def _survey(path, reg_col, regions, n=250, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "hv000": ["NG6"] * n,                                   # a column ingestion must skip
+        "hv001": rng.integers(1, 40, n).astype(float),
+        "hv005": rng.integers(100_000, 3_000_000, n).astype(float),
+        "hv105": rng.integers(0, 5, n).astype(float),
+        "hml35": rng.choice([0.0, 1.0, 6.0], n),               # 6 = not tested, dropped
+        reg_col: rng.choice(regions, n).astype(float),
+    })
+    df.to_stata(path, write_index=False)
+    return df
+
+def test_chunked_year_matches_full_read(tmp_path):
+    src = tmp_path / "NGPR61FL.DTA"
+    _survey(src, "shstate", [10, 20, 30, 240])
+    full = cm.clean_year(cm.read_dta(src), 2010, reg_col="shstate")
+
+    part = tmp_path / "part.csv"
+    year, rows, counts = cm.clean_year_to_part(src, 2010, "shstate", part, chunksize=37)
+    assert (year, rows) == (2010, len(full))
+
+    expected = tmp_path / "expected.csv"
+    full.to_csv(expected, index=False)
+    pd.testing.assert_frame_equal(pd.read_csv(part), pd.read_csv(expected))
+    pd.testing.assert_frame_equal(cm.finalize_prevalence([counts]), cm.compute_state_year_prevalence(full))
+
+def test_empty_first_chunk_writes_one_header(tmp_path):
+    src = tmp_path / "NGPR61FL.DTA"
+    df = _survey(src, "shstate", [10, 20])
+    df.loc[:36, "hml35"] = 6.0                                 # the whole first chunk is dropped
+    df.to_stata(src, write_index=False)
+    part = tmp_path / "part.csv"
+    _, rows, _ = cm.clean_year_to_part(src, 2010, "shstate", part, chunksize=37)
+    lines = part.read_text().splitlines()
+    assert len(lines) == rows + 1 and lines.count(lines[0]) == 1
+    assert len(pd.read_csv(part)) == rows
+
+def test_concat_parts_keeps_one_header(tmp_path):
+    a, b, out = tmp_path / "a.csv", tmp_path / "b.csv", tmp_path / "out.csv"
+    a.write_text("x,y\n1,2\n")
+    b.write_text("x,y\n3,4\n")
+    cm.concat_parts([a, b], out)
+    assert out.read_text() == "x,y\n1,2\n3,4\n"
+    assert not a.exists() and not b.exists()
@@ -0,0 +1,40 @@
+# tests/test_columnar.py
+import io, json
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend import columnar
+
+def _frame():
+    return pd.DataFrame({"Aridity_2020": [1.0, np.nan, 3.0], "prev_lag1": [0.1, 0.2, 0.3]})
+
+def test_columnar_json_wrapped_and_bare():
+    cols = {"Aridity_2020": [1.0, None, 3.0], "prev_lag1": [0.1, 0.2, 0.3]}
+    for body in ({"columns": cols}, cols):
+        df = columnar.read_frame(json.dumps(body).encode(), "application/json; charset=utf-8")
+        pd.testing.assert_frame_equal(df, _frame())
+
+def test_columnar_json_rejects_ragged_columns():
+    with pytest.raises(ValueError):
+        columnar.read_columnar_json(b'{"a": [1, 2], "b": [1]}')
+
+def test_arrow_and_parquet_round_trip():
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    table = pa.Table.from_pandas(_frame(), preserve_index=False)
+    stream = io.BytesIO()
+    with pa.ipc.new_stream(stream, table.schema) as w:
+        w.write_table(table)
+    parquet = io.BytesIO()
+    pq.write_table(table, parquet)
+    pd.testing.assert_frame_equal(columnar.read_frame(stream.getvalue(), columnar.ARROW_STREAM), _frame())
+    pd.testing.assert_frame_equal(columnar.read_frame(parquet.getvalue(), "application/x-parquet"), _frame())
+
+    out = pa.ipc.open_stream(columnar.preds_to_arrow(np.array([[0.25], [0.5]]), "v1")).read_all()
+    assert out.column("pred").to_pylist() == [0.25, 0.5]
+    assert out.schema.metadata[b"model_version"] == b"v1"
+
+def test_unknown_content_type():
+    with pytest.raises(columnar.UnsupportedFormat):
+        columnar.read_frame(b"a,b\n1,2\n", "text/csv")
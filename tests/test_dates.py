@@ -0,0 +1,38 @@
+# tests/test_dates.py
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+from dates import normalize_dates  # noqa: E402
+
+def test_months_from_mixed_formats():
+    s = pd.Series(["2024-03", "2024-03-17", "2024/03", "17/03/2024", "Mar 2024", 202403, "2024-03"])
+    out, report = normalize_dates(s, unit="M")
+    assert (out == pd.Timestamp("2024-03-01")).all()
+    assert report.rows == 7 and report.distinct == 6 and report.bad_rows == 0
+    assert report.formats["%Y-%m"] == 1 and report.formats["%Y%m"] == 1
+
+def test_days_keep_the_day_and_ambiguous_dates_are_month_first():
+    s = pd.Series(["2024-03-17 10:30:00", "03/04/2024", "17/03/2024"])
+    out, _ = normalize_dates(s, unit="D")
+    assert list(out) == [pd.Timestamp("2024-03-17"), pd.Timestamp("2024-03-04"), pd.Timestamp("2024-03-17")]
+    assert out.iloc[1] == pd.to_datetime("03/04/2024")                       # as the per-row parse read it
+    out, _ = normalize_dates(s, unit="D", dayfirst=True)
+    assert list(out) == [pd.Timestamp("2024-03-17"), pd.Timestamp("2024-04-03"), pd.Timestamp("2024-03-17")]
+
+def test_bad_values_are_reported_and_nat():
+    s = pd.Series(["2024-01", "n/a", None, "2024-13", "n/a", np.nan], index=[10, 11, 12, 13, 14, 15])
+    out, report = normalize_dates(s, unit="M", name="visits.month")
+    assert list(out.index) == [10, 11, 12, 13, 14, 15]
+    assert out.iloc[0] == pd.Timestamp("2024-01-01") and out.iloc[1:].isna().all()
+    assert report.null_rows == 2 and report.bad_rows == 3
+    assert report.bad_values == [("n/a", 2), ("2024-13", 1)]
+
+def test_matches_per_row_parse():
+    s = pd.Series(["2020-01", "2021-07", "2022-12-31", "bogus"] * 50)
+    legacy = s.apply(lambda v: pd.to_datetime(v, errors="coerce")).dt.to_period("M").dt.to_timestamp()
+    out, _ = normalize_dates(s, unit="M")
+    assert out.equals(legacy.astype("datetime64[ns]"))
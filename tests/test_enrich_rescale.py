@@ -0,0 +1,57 @@
+# tests/test_enrich_rescale.py
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import enrich_visits_with_dhs as enrich  # noqa: E402
+
+def _visits(n_clinics=37, months=("2024-01", "2024-02", "2024-03"), seed=0):
+    rng = np.random.default_rng(seed)
+    rows = [(f"C{c:03d}", m, int(rng.integers(0, 200))) for m in months for c in range(n_clinics)]
+    df = pd.DataFrame(rows, columns=["clinic_id", "month", "total_visits"])
+    df["need_weight"] = rng.uniform(0.05, 3.0, len(df))
+    return df
+
+def _loop_rescale(df):
+    """The previous per-month loop with .round()."""
+    out = []
+    for _, g in df.groupby("month", sort=False):
+        w = g["need_weight"].clip(lower=1e-6)
+        g2 = g.copy()
+        g2["total_visits"] = (g["total_visits"].sum() * (w / w.sum())).round().astype(int)
+        out.append(g2)
+    return pd.concat(out, ignore_index=True)
+
+def test_largest_remainder_preserves_monthly_totals():
+    df = _visits()
+    out = enrich.rescale_within_month(df)
+    before = df.groupby("month")["total_visits"].sum()
+    assert out.groupby("month")["total_visits"].sum().equals(before)
+    share = df["total_visits"].groupby(df["month"]).transform("sum") * df["need_weight"] / df["need_weight"].groupby(df["month"]).transform("sum")
+    assert ((out["total_visits"] - share).abs() < 1).all()      # never more than one visit off its exact share
+
+def test_round_mode_matches_previous_loop():
+    df = _visits()
+    pd.testing.assert_frame_equal(enrich.rescale_within_month(df, rounding="round"), _loop_rescale(df))
+
+def test_month_partitions_match_in_memory(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    import storage
+    monkeypatch.setattr(storage, "DATA_ROOT", tmp_path)
+    df = _visits()
+    src = storage.write_table(df.drop(columns=["need_weight"]), "clinic_visits")
+    weights = df.groupby("clinic_id", as_index=False)["need_weight"].first()
+    summary = enrich.rescale_month_partitions(src, tmp_path / "out", weights)
+
+    expected = enrich.rescale_within_month(df.drop(columns=["need_weight"]).merge(weights, on="clinic_id"))
+    got = pd.read_parquet(tmp_path / "out")
+    got["month"] = got["month"].astype(str).str[:7]
+    key = ["month", "clinic_id"]
+    merged = got.merge(expected, on=key, suffixes=("", "_expected"))
+    assert len(merged) == len(df)
+    assert (merged["total_visits"] == merged["total_visits_expected"]).all()
+    assert sum(t for _, t in summary.values()) == int(df["total_visits"].sum())
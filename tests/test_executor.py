@@ -0,0 +1,25 @@
+# tests/test_executor.py
+import asyncio, threading
+
+import pytest
+
+from backend.executor import InferenceExecutor, Overloaded
+
+def test_sheds_past_max_inflight_and_recovers():
+    ex = InferenceExecutor(threads=1, max_inflight=2)
+    gate = threading.Event()
+
+    async def scenario():
+        running = [asyncio.ensure_future(ex.run(gate.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(Overloaded):
+            await ex.run(lambda: 1)
+        waited = asyncio.ensure_future(ex.run(lambda: "queued", shed=False))
+        gate.set()
+        await asyncio.gather(*running)
+        assert await waited == "queued"
+        return await ex.run(lambda x: x * 2, 21)
+
+    assert asyncio.run(scenario()) == 42
+    assert ex.stats()["shed"] == 1 and ex.inflight == 0
+    ex.shutdown()
@@ -0,0 +1,123 @@
+# tests/test_feature_store.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.feature_store import FeatureStore, FeatureStores, update_store
+
+def _series(n=40, periods=24, seed=0):
+    rng = np.random.default_rng(seed)
+    months = pd.period_range("2022-01", periods=periods, freq="M").strftime("%Y-%m-01")
+    df = pd.DataFrame([(f"C{e:03d}", m) for e in range(n) for m in months], columns=["clinic_id", "month"])
+    df["total_visits"] = rng.integers(0, 300, len(df)).astype(float)
+    return df.sample(frac=0.8, random_state=seed)        # gaps: not every clinic reports every month
+
+def _reference(df):
+    """Per clinic, lag / rolling mean over its own observations, in pandas."""
+    df = df.sort_values(["clinic_id", "month"])
+    g = df.groupby("clinic_id")["total_visits"]
+    return df.assign(lag1=df["total_visits"], roll3=g.transform(lambda s: s.rolling(3, min_periods=1).mean()))
+
+def _build(path, df, **kw):
+    return update_store(path, df, "clinic_id", "month", "total_visits", ("visits_lag1", "visits_roll3"), period_width=7, **kw)
+
+def test_lookup_matches_pandas_history(tmp_path):
+    df = _series()
+    assert _build(tmp_path / "s", df)["mode"] == "built"
+    store = FeatureStore.open(tmp_path / "s")
+    assert isinstance(store.values, np.memmap)
+    ref = _reference(df)
+    for _, r in ref.sample(50, random_state=1).iterrows():
+        # features stored at an observed month apply to any later month
+        nxt = (pd.Period(r["month"][:7], "M") + 1).strftime("%Y-%m")
+        got = store.lookup(r["clinic_id"], nxt)
+        assert got["visits_lag1"] == pytest.approx(r["lag1"])
+        assert got["visits_roll3"] == pytest.approx(r["roll3"], rel=1e-6)
+    first = ref.groupby("clinic_id")["month"].min()
+    assert store.lookup("C000", first["C000"]) is None              # nothing observed before
+    assert store.lookup("nope") is None
+
+def test_incremental_append_equals_full_build(tmp_path):
+    df = _series(periods=30)
+    cut = "2023-07-01"
+    _build(tmp_path / "inc", df[df.month < cut])
+    # a clinic that first reports after the cut
+    extra = pd.DataFrame({"clinic_id": ["NEW"] * 3, "month": ["2023-08-01", "2023-09-01", "2023-10-01"],
+                          "total_visits": [10.0, 20.0, 60.0]})
+    full = pd.concat([df, extra])
+    res = _build(tmp_path / "inc", full)
+    assert res["mode"] == "appended" and res["periods_added"] == 30 - 18
+    _build(tmp_path / "full", full)
+    a, b = FeatureStore.open(tmp_path / "inc"), FeatureStore.open(tmp_path / "full")
+    assert a.periods == b.periods
+    order = [a.entities[e] for e in b.entities]
+    np.testing.assert_array_equal(np.asarray(a.values)[:, order], np.asarray(b.values))
+    assert a.lookup("NEW") == {"visits_lag1": 60.0, "visits_roll3": 30.0}
+    assert _build(tmp_path / "inc", full)["mode"] == "unchanged"
+
+def test_rows_without_entity_or_period_are_dropped(tmp_path):
+    df = pd.DataFrame({"state": ["Kano", None, "Oyo", "Oyo"], "year": [2018, 2018, 2018, None],
+                       "prevalence": [0.1, 0.9, 0.2, 0.7]})
+    res = update_store(tmp_path / "s", df, "state", "year", "prevalence", ("lag1", "roll3"))
+    assert res["entities"] == 2 and res["periods"] == 1
+    store = FeatureStore.open(tmp_path / "s")
+    assert store.lookup("Oyo", 2019)["lag1"] == pytest.approx(0.2)
+    assert store.lookup("Kano", 2019)["lag1"] == pytest.approx(0.1)
+
+def test_backfill_and_setting_changes_rebuild(tmp_path):
+    df = _series()
+    _build(tmp_path / "s", df[df.month != "2022-05-01"])
+    assert _build(tmp_path / "s", df)["mode"] == "built"
+    assert update_store(tmp_path / "s", df, "clinic_id", "month", "total_visits", ("visits_lag1", "visits_roll3"),
+                        window=6, period_width=7)["mode"] == "built"
+
+def test_changed_or_dropped_history_rebuilds(tmp_path):
+    df = pd.DataFrame({"State": "Kano", "year": [2010, 2013, 2015], "prevalence": [0.5, 0.4, 0.3]})
+    args = ("State", "year", "prevalence", ("lag1", "roll3"))
+    update_store(tmp_path / "s", df, *args)
+    fixed = df.assign(prevalence=[0.9, 0.8, 0.7])              # same periods, corrected values
+    assert update_store(tmp_path / "s", fixed, *args)["mode"] == "built"
+    assert FeatureStore.open(tmp_path / "s").lookup("Kano") == pytest.approx({"lag1": 0.7, "roll3": 0.8})
+    assert update_store(tmp_path / "s", fixed, *args)["mode"] == "unchanged"
+    res = update_store(tmp_path / "s", fixed[fixed.year != 2013], *args)
+    assert res["mode"] == "built" and res["periods"] == 2
+
+def test_survey_years(tmp_path):
+    prev = pd.DataFrame({"State": ["Kano"] * 3 + ["Lagos"], "year": [2010, 2015, 2021, 2021],
+                         "prevalence": [0.4, 0.6, 0.5, 0.1]})
+    update_store(tmp_path / "sy", prev, "State", "year", "prevalence")
+    store = FeatureStore.open(tmp_path / "sy")
+    assert store.lookup("Kano", 2021) == pytest.approx({"prev_lag1": 0.6, "prev_roll3": 0.5})
+    assert store.lookup("Kano", 2018.0) == pytest.approx({"prev_lag1": 0.6, "prev_roll3": 0.5})
+    assert store.lookup("Kano") == pytest.approx({"prev_lag1": 0.5, "prev_roll3": 0.5})
+    assert store.lookup("Lagos", 2021) is None and store.lookup("Lagos", 2024) == pytest.approx({"prev_lag1": 0.1, "prev_roll3": 0.1})
+
+def test_fill_records_and_frame(tmp_path):
+    prev = pd.DataFrame({"State": ["Kano", "Kano", "Oyo"], "year": [2015, 2021, 2021], "prevalence": [0.6, 0.5, 0.2]})
+    update_store(tmp_path / "state_year", prev, "State", "year", "prevalence")
+    stores = FeatureStores(tmp_path, refresh_s=0)
+    wanted = ["Aridity", "prev_lag1", "prev_roll3"]
+
+    records = [
+        {"Aridity": 1.0},                                          # no key: untouched
+        {"State": "Kano", "year": 2022},                           # filled
+        {"State": "Kano", "prev_lag1": 0.9, "prev_roll3": None},   # caller's lag kept, roll filled
+        {"State": "Atlantis"},                                     # unknown
+    ]
+    out = stores.fill_records(records, wanted)
+    assert out[0] is records[0] and "prev_lag1" not in records[1]
+    assert out[1]["prev_lag1"] == pytest.approx(0.5) and out[1]["prev_roll3"] == pytest.approx(0.55)
+    assert out[2]["prev_lag1"] == 0.9 and out[2]["prev_roll3"] == pytest.approx(0.55)
+    assert out[3] is records[3] and stores.unresolved == 1
+    assert stores.fill_records(records, ["Aridity"]) is records      # model doesn't use these features
+
+    df = pd.DataFrame({"State": ["Kano", "Oyo", "x"], "prev_lag1": [np.nan, 0.7, np.nan]})
+    filled = stores.fill_frame(df, wanted)
+    assert filled["prev_lag1"].tolist()[:2] == pytest.approx([0.5, 0.7]) and np.isnan(filled["prev_lag1"].iloc[2])
+    assert filled["prev_roll3"].tolist()[:2] == pytest.approx([0.55, 0.2])
+
+    # a pipeline run shows up without reopening by hand
+    update_store(tmp_path / "state_year", pd.concat([prev, pd.DataFrame({"State": ["Kano"], "year": [2024], "prevalence": [0.1]})]),
+                 "State", "year", "prevalence")
+    stores.refresh(force=True)
+    assert stores.fill_records([{"State": "Kano"}], wanted)[0]["prev_lag1"] == pytest.approx(0.1)
@@ -0,0 +1,65 @@
+# tests/test_forecast.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.forecast import ForecastTable, VisitForecaster, build_forecasts, visit_grid, WINDOW
+
+def _visits(n=60, periods=60, seed=0):
+    """Clinic level × a shared seasonal shape, with a little noise."""
+    rng = np.random.default_rng(seed)
+    months = pd.period_range("2019-01", periods=periods, freq="M")
+    season = 1 + 0.3 * np.sin(2 * np.pi * (months.month.to_numpy() - 1) / 12)
+    level = rng.uniform(40, 2000, n)
+    visits = level[:, None] * season[None, :] * rng.normal(1, 0.02, (n, periods))
+    return pd.DataFrame({"clinic_id": np.repeat([f"C{c:03d}" for c in range(n)], periods),
+                         "month": np.tile(months.strftime("%Y-%m"), n),
+                         "total_visits": visits.ravel().round()})
+
+def test_forecasts_follow_the_season():
+    df = _visits()
+    clinics, t0, grid = visit_grid(df)
+    T = grid.shape[1]
+    model = VisitForecaster.fit(grid[:, :T - 12], t0)
+    pred = model.predict(grid[:, T - 12 - WINDOW:T - 12], t0 + T - 13)
+    actual = grid[:, T - 12:]
+    assert pred["point"].shape == (60, 12)
+    assert np.mean(np.abs(pred["point"] - actual) / actual) < 0.05
+    assert (pred["lower"] <= pred["point"]).all() and (pred["point"] <= pred["upper"]).all()
+    flat = np.nanmean(grid[:, T - 12 - WINDOW:T - 12], axis=1)[:, None]      # no-season baseline
+    assert np.mean(np.abs(pred["point"] - actual)) < 0.3 * np.mean(np.abs(flat - actual))
+
+def test_table_reads_and_recompute(tmp_path):
+    df = _visits(n=20, periods=40)
+    df = df[~((df.clinic_id == "C001") & (df.month == "2022-04"))]          # a gap in the last month
+    res = build_forecasts(tmp_path / "visits", df, horizon=6)
+    assert res["clinics"] == 20 and res["origin"] == "2022-04" and res["horizon"] == 6
+    table = ForecastTable.open(tmp_path / "visits")
+    got = table.get("C000", horizon=3)
+    assert got["months"] == ["2022-05", "2022-06", "2022-07"] and len(got["visits"]) == 3
+    assert got["lower"][0] <= got["visits"][0] <= got["upper"][0]
+    assert table.get("nope") is None and len(table.get("C001")["visits"]) == 6
+    # same inputs -> the stored numbers; a new month moves the origin
+    assert table.recompute("C000", horizon=3) == got
+    newer = table.recompute("C000", {"2022-05": got["visits"][0]})
+    assert newer["origin"] == "2022-05" and newer["months"][0] == "2022-06"
+    assert newer["visits"][0] == pytest.approx(got["visits"][1], rel=0.05)
+    assert table.recompute("NEW", {"2022-03": 100, "2022-04": 100})["visits"][0] > 0
+    with pytest.raises(KeyError):
+        table.recompute("NEW")
+
+def test_rebuild_swaps_the_table(tmp_path):
+    df = _visits(n=5, periods=30)
+    build_forecasts(tmp_path / "visits", df[df.month < "2021-06"])
+    build_forecasts(tmp_path / "visits", df)
+    table = ForecastTable.open(tmp_path / "visits")
+    assert table.manifest["origin"] == "2021-06"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["visits"]
+
+def test_grid_skips_rows_without_clinic_or_month():
+    df = _visits(n=3, periods=4)
+    bad = pd.DataFrame({"clinic_id": [None, "C002"], "month": ["2019-02", None], "total_visits": [1e6, 1e6]})
+    clinics, t0, grid = visit_grid(pd.concat([df, bad], ignore_index=True))
+    ref = visit_grid(df)
+    assert clinics.tolist() == ["C000", "C001", "C002"] and t0 == ref[1]
+    np.testing.assert_array_equal(grid, ref[2])
@@ -0,0 +1,92 @@
+# tests/test_generate_clinic_visits.py
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+SCRIPTS = Path(__file__).resolve().parents[1] / "scripts"
+sys.path.insert(0, str(SCRIPTS))
+import generate_clinic_visits_synthetic as gen  # noqa: E402
+
+COLUMNS = ["clinic_id", "month", "total_visits", "available_doctors", "available_nurses", "available_beds",
+           "power_availability_days", "rainfall_mm", "avg_temperature_c", "source"]
+
+def _registry(n=25):
+    return pd.DataFrame({
+        "clinic_id": [f"NG-{i:04d}" for i in range(n)],
+        "clinic_name": [f"Clinic {i}" for i in range(n)],
+        "state": (["Kano", "Lagos", "Oyo", None, "Borno"] * n)[:n],
+        "lga": "x",
+        "level": (["Primary Health Centre", "General Hospital", "Clinic", None, "primary"] * n)[:n],
+    })
+
+def test_shard_shape_and_ranges():
+    fac = _registry()
+    months = gen.to_months(2023, 2024)
+    df = gen.generate_shard(0, fac["clinic_id"], fac["state"], fac["level"], months)
+    assert list(df.columns) == COLUMNS == gen.COLUMNS
+    assert len(df) == len(fac) * 24
+    # clinic-major, months in order within a clinic
+    assert df["clinic_id"].iloc[:24].eq("NG-0000").all()
+    assert df["month"].iloc[:24].tolist() == [ts.strftime("%Y-%m") for ts in months]
+    assert (df["total_visits"] >= 0).all()
+    assert df["power_availability_days"].between(0, 30).all()
+    assert (df["rainfall_mm"] >= 0).all()
+    # staff is static per clinic and respects the level floors
+    per_clinic = df.groupby("clinic_id")[["available_doctors", "available_nurses", "available_beds"]].nunique()
+    assert (per_clinic == 1).all().all()
+    hosp = df[df["clinic_id"] == "NG-0001"].iloc[0]
+    assert hosp["available_doctors"] >= 1 and hosp["available_nurses"] >= 3 and hosp["available_beds"] >= 10
+
+def test_shard_is_deterministic_and_seeded_per_shard():
+    fac = _registry()
+    months = gen.to_months(2024, 2024)
+    args = (fac["clinic_id"], fac["state"], fac["level"], months)
+    a = gen.generate_shard(3, *args, seed=7)
+    pd.testing.assert_frame_equal(a, gen.generate_shard(3, *args, seed=7))
+    assert not a["total_visits"].equals(gen.generate_shard(4, *args, seed=7)["total_visits"])
+
+def test_rainy_season_is_wetter_up_north():
+    n = 4000
+    months = gen.to_months(2024, 2024)
+    df = gen.generate_shard(0, [f"C{i}" for i in range(n)], ["Kano"] * n, ["primary"] * n, months)
+    mean = df.groupby(df["month"].str[5:].astype(int))["rainfall_mm"].mean()
+    assert mean[7] > 1.5 * mean[1]
+
+def test_select_clinics():
+    fac = _registry(10)
+    assert len(gen.select_clinics(fac, 4)) == 4
+    assert gen.select_clinics(fac, 4).equals(gen.select_clinics(fac, 4))
+    assert len(gen.select_clinics(fac, 0)) == 10
+    assert len(gen.select_clinics(fac, 25)) == 10
+    rep = gen.select_clinics(fac, 25, replicate=True)
+    assert len(rep) == 25 and rep["clinic_id"].is_unique
+    assert rep["clinic_id"].iloc[10] == "NG-0000-r1"
+
+def _run(tmp_path, out, *args):
+    raw = tmp_path / "raw" / "_manual"
+    raw.mkdir(parents=True, exist_ok=True)
+    _registry(50).to_csv(raw / "clinic_geo_data.csv", index=False)
+    env = {"DATA_ROOT": str(tmp_path), "SYNTH_SHARD_CLINICS": "7", "PATH": ""}
+    subprocess.run([sys.executable, str(SCRIPTS / "generate_clinic_visits_synthetic.py"),
+                    "--start-year", "2024", "--end-year", "2024", "--out", str(out), *args],
+                   check=True, env=env, cwd=tmp_path, capture_output=True)
+
+def test_output_independent_of_worker_count(tmp_path):
+    _run(tmp_path, tmp_path / "one.csv", "--workers", "1")
+    _run(tmp_path, tmp_path / "three.csv", "--workers", "3")
+    one, three = pd.read_csv(tmp_path / "one.csv"), pd.read_csv(tmp_path / "three.csv")
+    assert len(one) == 50 * 12
+    pd.testing.assert_frame_equal(one, three)
+
+def test_parquet_output_matches_csv(tmp_path):
+    _run(tmp_path, tmp_path / "v.csv")
+    _run(tmp_path, tmp_path / "v.parquet", "--workers", "2")
+    csv = pd.read_csv(tmp_path / "v.csv")
+    pqt = pq.read_table(tmp_path / "v.parquet").to_pandas()
+    assert list(pqt.columns) == COLUMNS
+    pd.testing.assert_frame_equal(csv, pqt, check_dtype=False)
+    assert np.array_equal(csv["total_visits"], pqt["total_visits"])
@@ -0,0 +1,13 @@
+# tests/test_load_test.py
+from benchmarks.load_test import compare
+
+def _report(p99, rps):
+    return {"results": [{"concurrency": 8, "batch_size": 16, "throughput_rps": rps,
+                         "latency_ms": {"p50": 5.0, "p95": 8.0, "p99": p99}}]}
+
+def test_compare_flags_only_changes_beyond_tolerance():
+    base = _report(10.0, 100.0)
+    assert compare(base, _report(10.5, 96.0), 0.10)["regressions"] == []
+    regs = compare(base, _report(12.0, 80.0), 0.10)["regressions"]
+    assert {r["metric"] for r in regs} == {"latency_p99", "throughput_rps"}
+    assert compare(base, _report(5.0, 200.0), 0.10)["regressions"] == []    # improvements never flag
@@ -0,0 +1,64 @@
+# tests/test_metrics.py
+import os, time
+
+from backend import metrics, profiling
+
+def test_prometheus_text_for_labelled_histograms_and_collectors():
+    h = metrics.histogram("test_stage_ms", "test stages", (1, 10), labels={"stage": "forward"})
+    h.observe(0.5)
+    h.observe(20)
+    metrics.register_collector(lambda: [("test_shed_total", "counter", "shed", {}, 3)])
+    lines = metrics.render_prometheus().splitlines()
+    assert "# TYPE test_stage_ms histogram" in lines
+    assert 'test_stage_ms_bucket{le="1",stage="forward"} 1' in lines
+    assert 'test_stage_ms_bucket{le="+Inf",stage="forward"} 2' in lines
+    assert 'test_stage_ms_count{stage="forward"} 2' in lines
+    assert "test_shed_total 3" in lines
+
+def test_slow_block_dumps_folded_stacks(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    profiling.configure(enabled=True, slow_ms=20)
+    try:
+        with profiling.sampled("fast"):
+            pass
+        with profiling.sampled("slow"):
+            t0 = time.perf_counter()
+            while time.perf_counter() - t0 < 0.1:
+                sum(range(1000))
+    finally:
+        profiling.configure(enabled=False)
+    (dump,) = os.listdir(tmp_path)
+    assert "-slow-" in dump
+    stack, count = open(tmp_path / dump).readline().rsplit(" ", 1)
+    assert "test_slow_block_dumps_folded_stacks" in stack and int(count) > 0
+
+def test_non_finite_values_use_prometheus_spellings():
+    metrics.register_collector(lambda: [("test_gauge_nan", "gauge", "nan", {}, float("nan")),
+                                        ("test_gauge_inf", "gauge", "inf", {}, float("inf"))])
+    h = metrics.histogram("test_inf_sum_ms", "inf sum", (1,))
+    h.observe(float("inf"))
+    lines = metrics.render_prometheus().splitlines()
+    assert "test_gauge_nan NaN" in lines and "test_gauge_inf +Inf" in lines
+    assert "test_inf_sum_ms_sum +Inf" in lines
+
+def test_request_timing_labels_by_route_template():
+    from fastapi import APIRouter, FastAPI
+    from fastapi.testclient import TestClient
+    from backend.middleware import RequestTimingMiddleware
+
+    router = APIRouter(prefix="/items")
+
+    @router.get("/{item_id}")
+    def item(item_id: str):
+        return {"id": item_id}
+
+    app = FastAPI()
+    app.add_middleware(RequestTimingMiddleware)
+    app.include_router(router, prefix="/api/v1")
+    with TestClient(app) as client:
+        for i in range(3):
+            assert client.get(f"/api/v1/items/C{i}").status_code == 200
+        client.get("/nowhere")
+    routes = {h.labels["route"]: h.snapshot()["count"] for h in metrics.REGISTRY.values() if h.name == "http_request_ms"}
+    assert routes["/api/v1/items/{item_id}"] == 3 and routes["unmatched"] >= 1
+    assert not any("/items/C" in r for r in routes)          # one series for every id
@@ -0,0 +1,68 @@
+# tests/test_numpy_mlp.py
+import pickle
+import numpy as np
+import pytest
+
+from backend.numpy_mlp import NumpyMLP, from_pickle, parity_check
+
+MODEL_PATH = "docs/malaria_mlp_model.pkl"
+NPZ_PATH = "backend/models/malaria_mlp.npz"
+
+def test_npz_matches_pickle_weights():
+    exported = NumpyMLP.from_npz(NPZ_PATH)
+    fresh = from_pickle(MODEL_PATH)
+    X = np.random.default_rng(1).normal(size=(64, fresh.n_features)).astype(np.float32)
+    assert np.allclose(exported.predict(X), fresh.predict(X), atol=1e-6)
+
+def test_parity_with_keras():
+    pytest.importorskip("tensorflow")
+    with open(MODEL_PATH, "rb") as f:
+        keras_model = pickle.load(f)
+    mlp = NumpyMLP.from_npz(NPZ_PATH)
+    X = np.random.default_rng(0).normal(size=(512, mlp.n_features)).astype(np.float32)
+    parity_check(keras_model, mlp, X)
+
+def test_mmap_engine_matches_numpy_engine(tmp_path):
+    from backend.model_loader import load_bundle, FoldedScaler, prepare_records
+    meta = "backend/models/model_meta.json"
+    ref = load_bundle(NPZ_PATH, None, meta, engine="numpy")
+    mapped = load_bundle(NPZ_PATH, None, meta, engine="mmap", mmap_dir=str(tmp_path))
+    again = load_bundle(NPZ_PATH, None, meta, engine="mmap", mmap_dir=str(tmp_path))
+    assert len(list(tmp_path.iterdir())) == 1 and again.version == mapped.version
+    assert isinstance(mapped.scaler, FoldedScaler)
+    assert not mapped.model.weights[0].flags.writeable          # a view on the read-only map
+    records = [{f: float(i + j) for j, f in enumerate(ref.features)} for i in range(16)]
+    X_ref = prepare_records(records, ref.plan, ref.fast_scaler)
+    X_map = prepare_records(records, mapped.plan, mapped.fast_scaler)
+    np.testing.assert_allclose(mapped.model.predict(X_map), ref.model.predict(X_ref), rtol=1e-6)
+
+def test_numpy_engine_does_not_export_on_load(tmp_path):
+    import shutil
+    from backend.model_loader import load_bundle
+    pkl = tmp_path / "model.pkl"
+    shutil.copy(MODEL_PATH, pkl)
+    bundle = load_bundle(str(pkl), None, "backend/models/model_meta.json", engine="numpy",
+                         npz_path=str(tmp_path / "missing.npz"))
+    assert bundle.version == "numpy::model.pkl"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["model.pkl"]     # converted in memory only
+
+def test_bulk_predict_on_mmap_engine(tmp_path, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from backend.model_loader import prepare_records
+    from backend.registry import ModelRegistry, ModelSpec
+    from backend.routers import predict
+    reg = ModelRegistry(poll_s=0)
+    reg.register("mapped", ModelSpec(model_path=NPZ_PATH, meta_path="backend/models/model_meta.json",
+                                     npz_path=NPZ_PATH, engine="mmap", mmap_dir=str(tmp_path)))
+    monkeypatch.setattr(predict, "REGISTRY", reg)
+    app = FastAPI()
+    app.include_router(predict.router)
+    m = reg.get("mapped")
+    records = [{f: float(i + j) for j, f in enumerate(m.bundle.features)} for i in range(8)]
+    columns = {f: [r[f] for r in records] for f in m.bundle.features}
+    res = TestClient(app).post("/api/v1/predict/bulk?model=mapped", json={"columns": columns})
+    assert res.status_code == 200, res.text
+    expected = m.forward(prepare_records(records, m.bundle.plan, m.bundle.fast_scaler)).ravel()
+    np.testing.assert_allclose(res.json()["preds"], expected, rtol=1e-5)
+    reg.stop()
@@ -0,0 +1,43 @@
+# tests/test_prepare_records.py
+import json
+import numpy as np
+import pandas as pd
+
+from backend.model_loader import (
+    load_bundle, prepare_features, prepare_records, project_to_canonical, FoldedScaler,
+)
+
+META_PATH = "backend/models/model_meta.json"
+NPZ_PATH = "backend/models/malaria_mlp.npz"
+
+def _bundle():
+    return load_bundle(NPZ_PATH, None, META_PATH, engine="numpy")
+
+def _pandas_path(records, bundle):
+    df_canon = project_to_canonical(pd.DataFrame(records), bundle.plan)
+    return prepare_features(df_canon, bundle.features, bundle.scaler)
+
+def test_matches_pandas_path_on_dhs_rows():
+    bundle = _bundle()
+    assert isinstance(bundle.fast_scaler, FoldedScaler)
+    env = pd.read_csv("data/raw/dhs/dhs_env.csv", nrows=300)
+    records = json.loads(env.to_json(orient="records"))
+    got = prepare_records(records, bundle.plan, bundle.fast_scaler)
+    assert got.dtype == np.float32 and got.flags.c_contiguous
+    np.testing.assert_allclose(got, _pandas_path(records, bundle), rtol=1e-5, atol=1e-4)
+
+def test_coercion_and_missing_values():
+    bundle = _bundle()
+    records = [
+        {"Aridity_2015": "3.5", "Aridity_2010": 1, "prev_lag1": None, "unknown": "x"},
+        {"Aridity": "bad", "Aridity_2000": 2.0, "PET": True},
+        {},
+    ]
+    got = prepare_records(records, bundle.plan, None)
+    ref = prepare_features(project_to_canonical(pd.DataFrame(records), bundle.plan), bundle.features, None)
+    np.testing.assert_allclose(got, ref)
+    j = bundle.features.index("Aridity")
+    assert got[:, j].tolist() == [3.5, 2.0, 0.0]
+    # a JSON integer too large for a float coerces to NaN (-> 0.0), as pd.to_numeric does
+    huge = prepare_records([{"Aridity": 10 ** 400, "PET": 1}], bundle.plan, None)
+    assert huge[0, j] == 0.0 and huge[0, bundle.features.index("PET")] == 1.0
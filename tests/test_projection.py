@@ -0,0 +1,28 @@
+# tests/test_projection.py
+import numpy as np
+import pandas as pd
+
+from backend.model_loader import ProjectionPlan, CANONICAL_FEATURES, project_to_canonical
+
+def test_latest_non_null_year_per_row():
+    df = pd.DataFrame({
+        "Aridity_2020": [1.0, np.nan, np.nan],
+        "Aridity_2015": [2.0, 3.0, np.nan],
+        "Aridity_2010": [4.0, 5.0, "bad"],
+        "prev_lag1": [0.1, None, 0.3],
+    })
+    out = project_to_canonical(df)
+    assert list(out.columns) == CANONICAL_FEATURES
+    assert out["Aridity"].tolist()[:2] == [1.0, 3.0]
+    assert np.isnan(out["Aridity"].iloc[2])
+    assert np.isnan(out["prev_lag1"].iloc[1])
+    assert out["PET"].isna().all()
+
+def test_matches_row_by_row_reference():
+    env = pd.read_csv("data/raw/dhs/dhs_env.csv", nrows=200)
+    plan = ProjectionPlan(CANONICAL_FEATURES)
+    got = plan.gather(env)
+    for j, cands in enumerate(plan.candidates):
+        cols = [c for c in cands if c in env.columns]
+        ref = env[cols].apply(pd.to_numeric, errors="coerce").bfill(axis=1).iloc[:, 0] if cols else np.nan
+        np.testing.assert_allclose(got[:, j], np.asarray(ref, dtype=np.float32) * np.ones(len(env)), equal_nan=True)
@@ -0,0 +1,74 @@
+# tests/test_registry.py
+import os, shutil
+import numpy as np
+import pytest
+
+from backend.registry import ModelRegistry, ModelSpec
+
+def _spec(tmp_path):
+    shutil.copy("backend/models/malaria_mlp.npz", tmp_path / "m.npz")
+    shutil.copy("backend/models/model_meta.json", tmp_path / "meta.json")
+    return ModelSpec(model_path=str(tmp_path / "m.npz"), meta_path=str(tmp_path / "meta.json"), engine="numpy")
+
+def test_swap_keeps_in_flight_model_usable(tmp_path):
+    reg = ModelRegistry(poll_s=0)
+    reg.register("a", _spec(tmp_path))
+    old = reg.get("a")
+    X = np.zeros((3, len(old.bundle.features)), dtype=np.float32)
+    assert reg.reload("a", force=False) is None          # files unchanged
+    st = os.stat(tmp_path / "meta.json")
+    os.utime(tmp_path / "meta.json", ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    new = reg.reload("a", force=False)
+    assert reg.get("a") is new and new.version != old.version
+    np.testing.assert_allclose(old.predict(X), new.predict(X))   # old batcher is closed, still answers
+    reg.stop()
+
+def test_failed_reload_keeps_previous_version(tmp_path):
+    reg = ModelRegistry(poll_s=0)
+    current = reg.register("a", _spec(tmp_path), load=True)
+    (tmp_path / "m.npz").write_bytes(b"not an npz")
+    with pytest.raises(Exception):
+        reg.reload("a")
+    assert reg.get("a") is current
+    with pytest.raises(KeyError):
+        reg.get("missing")
+    reg.stop()
+
+def test_register_is_lazy(tmp_path):
+    reg = ModelRegistry(poll_s=0)
+    reg.register("a", _spec(tmp_path))
+    assert not reg.is_loaded("a") and len(reg.features("a")) == 22
+    assert reg.describe()["models"][0]["loaded"] is False
+    m = reg.get("a")
+    assert reg.is_loaded("a") and m.load_s is not None and reg.get("a") is m
+    reg.stop()
+
+def test_shadow_builds_its_own_input(tmp_path, monkeypatch, caplog):
+    import json
+    from backend import registry
+    from backend.model_loader import prepare_records
+    reg = ModelRegistry(poll_s=0)
+    primary = reg.register("a", _spec(tmp_path), load=True)
+    # same function, but features in reverse order and scaled by twice the scale
+    meta = json.load(open(tmp_path / "meta.json"))
+    shadow_meta = {"features": meta["features"][::-1], "scaler_mean": meta["scaler_mean"][::-1],
+                   "scaler_scale": [2 * s for s in meta["scaler_scale"][::-1]]}
+    (tmp_path / "b.json").write_text(json.dumps(shadow_meta))
+    with np.load(tmp_path / "m.npz") as z:
+        arrays = {k: z[k] for k in z.files}
+    arrays["W0"] = 2 * arrays["W0"][::-1]
+    np.savez(tmp_path / "b.npz", **arrays)
+    reg.register("b", ModelSpec(model_path=str(tmp_path / "b.npz"), meta_path=str(tmp_path / "b.json"), engine="numpy"))
+    (tmp_path / "c.json").write_text(json.dumps({"features": []}))
+    reg.register("c", ModelSpec(model_path=str(tmp_path / "m.npz"), meta_path=str(tmp_path / "c.json"), engine="numpy"))
+    diffs = []
+    monkeypatch.setattr(registry.SHADOW_DIFF_HIST, "observe", diffs.append)
+
+    records = [{f: float(i + j) for j, f in enumerate(meta["features"])} for i in range(8)]
+    y = primary.forward(prepare_records(records, primary.bundle.plan, primary.bundle.fast_scaler))
+    reg.shadow("b", records, y)
+    reg.shadow("c", records, y)
+    reg._shadow_pool.shutdown(wait=True)
+    assert len(diffs) == 1 and diffs[0] < 1e-5
+    assert "shadow 'c' skipped" in caplog.text
+    reg.stop()
@@ -0,0 +1,70 @@
+# tests/test_run_pipeline.py
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import run_pipeline as rp  # noqa: E402
+
+COPY = "import sys, shutil; shutil.copyfile(sys.argv[1], sys.argv[2])\n"
+UPPER = "import sys; p = sys.argv[1]; t = open(p).read(); open(p, 'w').write(t.upper())\n"
+
+def _steps(tmp):
+    for name, body in (("copy.py", COPY), ("upper.py", UPPER), ("fail.py", "raise SystemExit(3)\n")):
+        (tmp / name).write_text(body)
+    raw, other = tmp / "raw.csv", tmp / "other.csv"
+    raw.write_text("a,b\n1,2\n3,4\n")
+    other.write_text("x\n1\n")
+    p = lambda n: str(tmp / n)
+    return [
+        rp.Step("silver", p("copy.py"), inputs=(p("raw.csv"),), outputs=(p("silver.csv"),), args=(p("raw.csv"), p("silver.csv"))),
+        rp.Step("shout", p("upper.py"), inputs=(p("silver.csv"),), outputs=(p("silver.csv"),), args=(p("silver.csv"),)),
+        rp.Step("gold", p("copy.py"), inputs=(p("silver.csv"),), outputs=(p("gold.csv"),), args=(p("silver.csv"), p("gold.csv"))),
+        rp.Step("side", p("copy.py"), inputs=(p("other.csv"),), outputs=(p("side.csv"),), args=(p("other.csv"), p("side.csv"))),
+    ]
+
+def _status(results):
+    return {r["step"]: r["status"] for r in results}
+
+def test_reruns_only_downstream_of_a_changed_file(tmp_path):
+    steps, state = _steps(tmp_path), tmp_path / "state.json"
+    first = rp.run_pipeline(steps, jobs=2, state_path=state)
+    assert set(_status(first).values()) == {"ran"}
+    assert (tmp_path / "gold.csv").read_text() == "A,B\n1,2\n3,4\n"
+    assert next(r for r in first if r["step"] == "gold")["rows"] == {str(tmp_path / "gold.csv"): 2}
+
+    # the in-place step must not look stale just because it rewrote its own input
+    assert set(_status(rp.run_pipeline(steps, state_path=state)).values()) == {"skipped"}
+
+    (tmp_path / "raw.csv").write_text("a,b\n5,6\n")
+    again = _status(rp.run_pipeline(steps, jobs=2, state_path=state))
+    assert again == {"silver": "ran", "shout": "ran", "gold": "ran", "side": "skipped"}
+    assert (tmp_path / "gold.csv").read_text() == "A,B\n5,6\n"
+
+def test_code_change_and_force(tmp_path):
+    steps, state = _steps(tmp_path), tmp_path / "state.json"
+    rp.run_pipeline(steps, state_path=state)
+    (tmp_path / "upper.py").write_text(UPPER + "# v2\n")
+    assert _status(rp.run_pipeline(steps, state_path=state, dry_run=True)) == {
+        "silver": "skipped", "shout": "dry-run", "gold": "dry-run", "side": "skipped"}
+    forced = _status(rp.run_pipeline(steps, state_path=state, force=["side"]))
+    # shout reran but wrote the same bytes, so gold's input hash did not change
+    assert forced == {"silver": "skipped", "shout": "ran", "gold": "skipped", "side": "ran"}
+
+def test_failure_blocks_downstream_and_missing_inputs(tmp_path):
+    steps, state = _steps(tmp_path), tmp_path / "state.json"
+    steps[1] = rp.Step("shout", str(tmp_path / "fail.py"), inputs=steps[1].inputs, outputs=steps[1].outputs)
+    steps.append(rp.Step("absent", str(tmp_path / "copy.py"), inputs=(str(tmp_path / "nope.csv"),)))
+    status = _status(rp.run_pipeline(steps, state_path=state))
+    assert status == {"silver": "ran", "shout": "failed", "gold": "blocked", "side": "ran", "absent": "missing-input"}
+
+def test_imported_module_change_marks_step_stale(tmp_path):
+    steps, state = _steps(tmp_path), tmp_path / "state.json"
+    (tmp_path / "helpers.py").write_text("X = 1\n")
+    steps[3] = rp.Step("side", steps[3].script, code=(str(tmp_path / "helpers.py"),), inputs=steps[3].inputs,
+                       outputs=steps[3].outputs, args=steps[3].args)
+    rp.run_pipeline(steps, state_path=state)
+    assert set(_status(rp.run_pipeline(steps, state_path=state, dry_run=True)).values()) == {"skipped"}
+    (tmp_path / "helpers.py").write_text("X = 2\n")
+    assert _status(rp.run_pipeline(steps, state_path=state, dry_run=True)) == {
+        "silver": "skipped", "shout": "skipped", "gold": "skipped", "side": "dry-run"}
+    assert all((rp.ROOT / m).is_file() for s in rp.STEPS for m in s.code)
@@ -0,0 +1,43 @@
+# tests/test_spatial.py
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("scipy")
+from backend.spatial import ClusterIndex, load_clusters
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    p1, p2 = np.radians(lat1), np.radians(lat2)
+    a = np.sin((p2 - p1) / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(np.radians(lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * np.arcsin(np.sqrt(a))
+
+def test_knn_matches_brute_force_haversine():
+    rng = np.random.default_rng(1)
+    lat_k, lon_k = rng.uniform(4, 14, 300), rng.uniform(2.7, 14.7, 300)
+    lat_q, lon_q = rng.uniform(4, 14, 200), rng.uniform(2.7, 14.7, 200)
+    index = ClusterIndex(lat_k, lon_k, ids=[f"C{i}" for i in range(300)])
+    dist, pos = index.query(lat_q, lon_q, k=3)
+    full = _haversine_km(lat_q[:, None], lon_q[:, None], lat_k[None, :], lon_k[None, :])
+    expected = np.argsort(full, axis=1)[:, :3]
+    assert (pos == expected).all()
+    assert np.allclose(dist, np.take_along_axis(full, expected, axis=1), atol=1e-6)
+    assert list(index.nearest(lat_q[:2], lon_q[:2])) == [f"C{expected[0, 0]}", f"C{expected[1, 0]}"]
+
+def test_radius_and_max_km():
+    # clusters 0, ~11 km and ~111 km north of the query point
+    index = ClusterIndex([9.0, 9.1, 10.0], [7.0, 7.0, 7.0], ids=["a", "b", "c"])
+    assert [list(h) for h in index.within([9.0], [7.0], radius_km=20)] == [[0, 1]]
+    assert list(index.nearest([9.02, 12.0], [7.0, 7.0], max_km=50)) == ["a", None]
+    dist, pos = index.query([9.0], [7.0], k=5)
+    assert list(pos[0]) == [0, 1, 2, -1, -1] and np.isinf(dist[0, 3:]).all()
+
+def test_missing_coordinates():
+    index = ClusterIndex([9.0, np.nan], [7.0, 7.0], ids=["a", "bad"])
+    assert len(index) == 1
+    assert list(index.nearest([np.nan, 9.0], [7.0, 7.0])) == [None, "a"]
+    assert [len(h) for h in index.within([np.nan], [7.0], radius_km=20000)] == [0]
+
+def test_load_clusters_column_names(tmp_path):
+    p = tmp_path / "gps.csv"
+    pd.DataFrame({"DHSID": ["x"], "LATNUM": [9.0], "LONGNUM": [7.0]}).to_csv(p, index=False)
+    assert list(load_clusters(str(p)).columns) == ["DHSID", "lat", "lon"]
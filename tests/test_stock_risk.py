@@ -0,0 +1,108 @@
+# tests/test_stock_risk.py
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend import stock_risk
+from backend.stock_risk import StockIndex, load_stock, records, score
+
+def _df(cols):
+    return pd.DataFrame(cols)
+
+def _stock(n_clinics=30, months=12, items=("ACT", "AMOX", "ORS"), seed=0):
+    rng = np.random.default_rng(seed)
+    rows = [(f"NG-{c:03d}", f"2024-{m:02d}", it) for c in range(n_clinics) for m in range(1, months + 1) for it in items]
+    df = pd.DataFrame(rows, columns=["clinic_id", "month", "item_code"])
+    df["item_name"] = df["item_code"] + " name"
+    df["reorder_level"] = rng.integers(5, 60, len(df))
+    df["stock_on_hand"] = rng.integers(0, 120, len(df))
+    df["lead_time_days"] = rng.integers(14, 46, len(df))
+    # shuffled, as files come
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+def test_score_formula():
+    # monthly use 30 -> 1/day; cover needed = lead + 7
+    out = score([0, 10, 20, 60], [36, 36, 36, 36], [13, 13, 13, 13])
+    assert list(out["days_of_cover"]) == [0, 10, 20, 60]
+    assert np.allclose(out["risk_score"], [1.0, 0.5, 0.0, 0.0])
+    assert list(out["risk_band"]) == ["high", "high", "low", "low"]
+    assert list(out["lead_time_breach"]) == [True, True, False, False]
+    assert list(out["reorder_breach"]) == [True, True, True, False]
+    # explicit use overrides the reorder-policy estimate; NaN falls back to it
+    out = score([15, 15], [36, 36], [13, 13], monthly_use=[60, np.nan])
+    assert list(out["days_of_cover"]) == [7.5, 15.0]
+    # nothing used: infinite cover, no risk
+    out = score([5, 0], [0, 0], [20, 20])
+    assert np.isinf(out["days_of_cover"][0]) and list(out["risk_score"]) == [0.0, 1.0]
+
+def test_rows_match_a_full_scan():
+    df = _stock()
+    index = StockIndex.from_frame(df)
+    assert len(index) == len(df) and index.n_clinics == 30 and "NG-007" in index and "nope" not in index
+
+    got = _df(index.rows("NG-007", item="AMOX", start="2024-03", end="2024-05"))
+    want = df[(df.clinic_id == "NG-007") & (df.item_code == "AMOX") & df.month.between("2024-03", "2024-05")].sort_values("month")
+    assert got["month"].tolist() == ["2024-03", "2024-04", "2024-05"]
+    assert got["stock_on_hand"].tolist() == want["stock_on_hand"].tolist()
+    ref = score(want["stock_on_hand"], want["reorder_level"], want["lead_time_days"])
+    assert np.allclose(got["risk_score"], ref["risk_score"])
+
+    all_items = _df(index.rows("NG-007", start="2024-11"))
+    assert len(all_items) == 2 * 3 and set(all_items["item_code"]) == {"ACT", "AMOX", "ORS"}
+    assert len(index.rows("NG-007")["month"]) == 36
+    assert _df(index.rows("NG-007", item="ZINC")).empty and _df(index.rows("nope")).empty
+    assert _df(index.rows("NG-007", item="ACT", start="2024-06", end="2024-02")).empty
+
+def test_latest_and_top():
+    df = _stock()
+    index = StockIndex.from_frame(df)
+    latest = _df(index.latest("NG-003"))
+    assert latest["item_code"].tolist() == ["ACT", "AMOX", "ORS"] and set(latest["month"]) == {"2024-12"}
+    assert _df(index.latest("nope")).empty
+
+    top = _df(index.top(month="2024-06", item="ACT", limit=5))
+    june = df[(df.month == "2024-06") & (df.item_code == "ACT")]
+    ref = np.sort(score(june["stock_on_hand"], june["reorder_level"], june["lead_time_days"])["risk_score"])[::-1][:5]
+    assert np.allclose(top["risk_score"], ref)
+    assert (top["month"] == "2024-06").all() and len(top) == 5
+    assert set(index.top(limit=1000)["month"]) == {"2024-12"}
+    assert (index.top(min_score=0.5, limit=1000)["risk_score"] >= 0.5).all()
+    assert len(index.top(item="ORS", limit=1000)["month"]) == 30
+
+def test_records_are_json_safe():
+    index = StockIndex(["a"], ["ACT"], ["2024-01"], [5], [0], [20])
+    rec = records(index.rows("a"))
+    assert rec[0]["days_of_cover"] is None and rec[0]["reorder_breach"] is False
+    json.dumps(rec, allow_nan=False)
+
+def test_rows_with_missing_month_or_key_are_dropped():
+    df = _stock(n_clinics=2, months=2)
+    bad = pd.DataFrame({"clinic_id": ["NG-000", "NG-000", None], "month": [np.nan, "", "2024-01"],
+                        "item_code": ["ACT", "ACT", "ACT"], "item_name": "x", "reorder_level": 1,
+                        "stock_on_hand": 1, "lead_time_days": 1})
+    index = StockIndex.from_frame(pd.concat([df, bad], ignore_index=True))
+    ref = StockIndex.from_frame(df)
+    assert len(index) == len(df) and index.months == ("2024-01", "2024-02")
+    pd.testing.assert_frame_equal(_df(index.rows("NG-000")), _df(ref.rows("NG-000")))
+    assert np.isnat(stock_risk.to_month([None, "2024-03", "bad"])).tolist() == [True, False, True]
+
+def test_load_stock_parquet_and_csv(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    df = _stock(n_clinics=3, months=2)
+    df["source"] = "x"
+    part = df.assign(month=pd.to_datetime(df["month"]).dt.date)
+    ds.write_dataset(pa.Table.from_pandas(part, preserve_index=False), tmp_path / "medicine_stock", format="parquet",
+                     partitioning=["month"], partitioning_flavor="hive")
+    df.to_csv(tmp_path / "medicine_stock.csv", index=False)
+
+    from_parquet = StockIndex.from_frame(load_stock(str(tmp_path / "medicine_stock")))
+    from_csv = StockIndex.from_frame(load_stock(str(tmp_path / "medicine_stock.csv")))
+    pd.testing.assert_frame_equal(_df(from_parquet.rows("NG-001")), _df(from_csv.rows("NG-001")))
+
+    monkeypatch.setattr(stock_risk, "DATA_ROOT", tmp_path / "empty")
+    with pytest.raises(FileNotFoundError):
+        load_stock()
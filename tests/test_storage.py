@@ -0,0 +1,56 @@
+# tests/test_storage.py
+import sys
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import storage  # noqa: E402
+
+def _visits():
+    return pd.DataFrame({
+        "clinic_id": ["NGA-1", "NGA-2", "NGA-1", "NGA-2"],
+        "month": ["2023-12-01", "2023-12-01", "2024-01-01", "2024-01-01"],
+        "total_visits": ["10", "20", "30", None],            # text, as read from a raw CSV
+        "rainfall_mm": [1.5, 2.5, 3.5, 4.5],
+        "need_weight": [1.0, 1.1, 0.9, 1.0],                   # not in the contract
+    })
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_ROOT", tmp_path)
+    return tmp_path
+
+def test_roundtrip_uses_contract_types_and_partitions(root):
+    out = storage.write_table(_visits(), "clinic_visits")
+    assert sorted(p.name for p in out.iterdir()) == ["month=2023-12-01", "month=2024-01-01"]
+    df = storage.read_table("clinic_visits")
+    assert list(df.columns) == ["clinic_id", "month", "total_visits", "rainfall_mm", "need_weight"]
+    schema = storage.dataset("clinic_visits").schema
+    assert str(schema.field("total_visits").type) == "int64"
+    assert str(schema.field("month").type) == "date32[day]"
+    assert pd.api.types.is_datetime64_any_dtype(df["month"])
+    assert sorted(df["total_visits"].dropna().astype(int)) == [10, 20, 30]
+
+def test_projection_and_pushdown(root):
+    storage.write_table(_visits(), "clinic_visits")
+    df = storage.read_table("clinic_visits", columns=["clinic_id", "total_visits"],
+                            filters=[("month", ">=", date(2024, 1, 1))])
+    assert list(df.columns) == ["clinic_id", "total_visits"]
+    assert sorted(df["clinic_id"]) == ["NGA-1", "NGA-2"]
+
+def test_rewrite_replaces_partitions(root):
+    storage.write_table(_visits(), "clinic_visits")
+    storage.write_table(_visits().iloc[:2], "clinic_visits")
+    assert len(storage.read_table("clinic_visits")) == 2
+    assert not list((root / "processed" / "silver").glob(".clinic_visits*"))
+
+def test_falls_back_to_csv(root):
+    csv = root / "processed" / "silver" / "clinic_visits.csv"
+    csv.parent.mkdir(parents=True)
+    _visits().to_csv(csv, index=False)
+    df = storage.read_table("clinic_visits", columns=["total_visits"], filters=[("month", "<", date(2024, 1, 1))])
+    assert sorted(df["total_visits"]) == [10, 20]
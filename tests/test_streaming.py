@@ -0,0 +1,34 @@
+# tests/test_streaming.py
+import asyncio, json
+
+import numpy as np
+
+from backend.streaming import encode_preds, iter_record_chunks, score_ndjson
+
+async def _pieces(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+def _collect(agen):
+    async def run():
+        return [x async for x in agen]
+    return asyncio.run(run())
+
+def test_chunks_are_bounded_and_ordered():
+    data = b"".join(b'{"i": %d}\n' % i for i in range(10)) + b"\n" + b'{"i": 10}'
+    chunks = _collect(iter_record_chunks(_pieces(data, 7), chunk_rows=4))
+    assert [len(c) for c in chunks] == [4, 4, 3]
+    assert [r["i"] for c in chunks for r in c] == list(range(11))
+
+def test_bad_line_ends_stream_with_error():
+    async def score(records):
+        return [float(r["i"]) for r in records]
+    data = b'{"i": 1}\n{"i": 2}\n[3]\n{"i": 4}\n'
+    lines = b"".join(_collect(score_ndjson(_pieces(data, 5), score, chunk_rows=2))).splitlines()
+    assert [json.loads(l) for l in lines[:2]] == [{"pred": 1.0}, {"pred": 2.0}]
+    err = json.loads(lines[2])
+    assert err["rows_scored"] == 2 and "line 3" in err["error"]
+
+def test_non_finite_preds_are_null():
+    out = encode_preds(np.array([0.25, np.nan, np.inf], dtype=np.float32))
+    assert [json.loads(line) for line in out.splitlines()] == [{"pred": 0.25}, {"pred": None}, {"pred": None}]
@@ -0,0 +1,121 @@
+# tests/test_visit_features.py
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.visit_features import FEATURES, FeatureState, append_month, build_features, history_digest
+
+def _visits(n=25, periods=30, seed=0):
+    rng = np.random.default_rng(seed)
+    months = pd.period_range("2021-01", periods=periods, freq="M").strftime("%Y-%m")
+    df = pd.DataFrame([(f"C{c:03d}", m) for c in range(n) for m in months], columns=["clinic_id", "month"])
+    df["total_visits"] = rng.integers(0, 400, len(df)).astype(float)
+    df["rainfall_mm"] = rng.gamma(2.0, 60.0, len(df)).round(1)
+    df["avg_temperature_c"] = rng.normal(28, 2, len(df)).round(1)
+    df["available_doctors"] = rng.integers(1, 5, len(df))
+    return df.sample(frac=0.85, random_state=seed)        # gaps: not every clinic reports every month
+
+def _reference(df):
+    """Calendar lags / trailing means per clinic, via a pandas pivot."""
+    wide = df.pivot(index="month", columns="clinic_id", values="total_visits")
+    wide.index = pd.PeriodIndex(wide.index, freq="M")
+    wide = wide.reindex(pd.period_range(wide.index.min(), wide.index.max(), freq="M"))
+    rain = df.pivot(index="month", columns="clinic_id", values="rainfall_mm")
+    rain.index = pd.PeriodIndex(rain.index, freq="M")
+    rain = rain.reindex(wide.index)
+    out = {"visits_lag1": wide.shift(1), "visits_lag12": wide.shift(12),
+           "visits_roll3": wide.shift(1).rolling(3, min_periods=1).mean(),
+           "visits_roll12": wide.shift(1).rolling(12, min_periods=1).mean(),
+           "rain_roll3": rain.rolling(3, min_periods=1).mean()}
+    return {k: v.rename(index=lambda p: p.strftime("%Y-%m")) for k, v in out.items()}
+
+def test_matches_pandas_reference():
+    df = _visits()
+    feats, state = build_features(df)
+    assert list(feats.columns) == ["clinic_id", "month", "total_visits"] + FEATURES
+    assert len(feats) == len(df) and feats.equals(feats.sort_values(["clinic_id", "month"]))
+    ref = _reference(df)
+    for name, wide in ref.items():
+        expected = wide.to_numpy()[wide.index.get_indexer(feats.month), wide.columns.get_indexer(feats.clinic_id)]
+        np.testing.assert_allclose(feats[name].to_numpy(), expected, equal_nan=True, err_msg=name)
+    jan = feats[feats.month.str.endswith("-01")]
+    assert (jan.month_of_year == 1).all() and np.allclose(jan.month_cos, 1.0)
+    assert state.last_month == 2021 * 12 + 29 and state.visits.shape == (25, 12)
+
+def test_append_equals_full_build(tmp_path):
+    df = _visits(periods=30)
+    cut = "2022-09"
+    _, state = build_features(df[df.month < cut])
+    state.save(tmp_path / "state.npz")
+    state = FeatureState.load(tmp_path / "state.npz")
+    # a clinic that first reports after the cut, and a month nobody reports
+    extra = pd.DataFrame({"clinic_id": ["NEW", "NEW"], "month": ["2022-10", "2023-06"],
+                          "total_visits": [10.0, 30.0], "rainfall_mm": [5.0, 7.0]})
+    full = pd.concat([df[df.month != "2023-02"], extra], ignore_index=True)
+    later = full[full.month >= cut]
+    parts = [append_month(state, later[later.month == m]) for m in sorted(later.month.unique())]
+    inc = pd.concat(parts).sort_values(["clinic_id", "month"]).reset_index(drop=True)
+    ref, _ = build_features(full)
+    ref = ref[ref.month >= cut].reset_index(drop=True)
+    pd.testing.assert_frame_equal(inc, ref, check_dtype=False)
+    new = inc[inc.clinic_id == "NEW"]
+    assert np.isnan(new.visits_lag1.iloc[0]) and new.visits_roll12.iloc[1] == 10.0
+
+def test_append_rejects_old_or_mixed_months():
+    df = _visits(n=3, periods=6)
+    _, state = build_features(df)
+    with pytest.raises(ValueError):
+        append_month(state, df[df.month == "2021-06"])
+    mixed = pd.DataFrame({"clinic_id": ["C000", "C001"], "month": ["2021-07", "2021-08"], "total_visits": [1.0, 2.0]})
+    with pytest.raises(ValueError):
+        append_month(state, mixed)
+
+def test_digest_tracks_appended_rows(tmp_path):
+    df = _visits(n=4, periods=8)
+    _, state = build_features(df[df.month < "2021-08"])
+    append_month(state, df[df.month == "2021-08"])
+    state.save(tmp_path / "state.npz")
+    assert FeatureState.load(tmp_path / "state.npz").digest == history_digest(df) == history_digest(df[::-1])
+    changed = df.copy()
+    changed.iloc[0, changed.columns.get_loc("total_visits")] += 1
+    assert history_digest(changed) != state.digest
+
+def test_script_rebuilds_when_an_old_value_changes(tmp_path, monkeypatch, capsys):
+    pytest.importorskip("pyarrow")
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+    import storage
+    import build_clinic_month_features as script
+    monkeypatch.setattr(storage, "DATA_ROOT", tmp_path)
+    monkeypatch.setattr(script, "GOLD_DIR", tmp_path / "processed" / "gold")
+    monkeypatch.setattr(script, "STATE", tmp_path / "processed" / "gold" / ".state.npz")
+    monkeypatch.setattr(sys, "argv", ["build_clinic_month_features.py"])
+    df = _visits(n=4, periods=8).sort_values(["clinic_id", "month"]).reset_index(drop=True)
+    df = df.assign(available_nurses=3, available_beds=10, power_availability_days=25)
+    storage.write_table(df[df.month < "2021-08"], "clinic_visits")
+    script.main()
+    # same row count up to the state's last month, but one old value corrected, plus a new month
+    fixed = df.copy()
+    fixed.loc[0, "total_visits"] += 100
+    storage.write_table(fixed, "clinic_visits")
+    script.main()
+    assert "changed, rebuilt" in capsys.readouterr().out
+    got = storage.read_table("clinic_month_features", layer="gold", columns=["clinic_id", "month", "visits_lag1"])
+    got = got.assign(month=got.month.astype(str).str[:7]).sort_values(["clinic_id", "month"]).reset_index(drop=True)
+    ref, _ = build_features(fixed)
+    np.testing.assert_allclose(got.visits_lag1.to_numpy(), ref.visits_lag1.to_numpy(), equal_nan=True)
+    # nothing changed since -> append path, nothing to add
+    script.main()
+    assert "unchanged" in capsys.readouterr().out
+
+def test_rows_without_clinic_or_month_are_dropped():
+    df = _visits(n=3, periods=6)
+    bad = pd.DataFrame({"clinic_id": [None, "C000"], "month": ["2021-03", None], "total_visits": [999.0, 999.0]})
+    feats, state = build_features(pd.concat([df, bad], ignore_index=True))
+    ref, ref_state = build_features(df)
+    pd.testing.assert_frame_equal(feats, ref)
+    assert state.clinics == ref_state.clinics and state.digest == ref_state.digest
+    nxt = pd.DataFrame({"clinic_id": ["C000", None], "month": ["2021-07", "2021-07"], "total_visits": [1.0, 2.0]})
+    assert append_month(state, nxt).clinic_id.tolist() == ["C000"]